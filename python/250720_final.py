@@ -1,7 +1,7 @@
 # === IMPORTS ===
-from collections import deque
 import datetime
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 
 # === PARAMETER ===
@@ -25,191 +25,271 @@ ruecknahmeabschlag = 0.002
 ter = 0.0045
 verwalter_gebuehr = 0.0119
 stueckkosten = 45
+laufende_kosten_rate = ter + verwalter_gebuehr  # jährlich auf den Depotwert
 annual_withdrawal = 20000
+# Lots eines Jahres im Dezember zu einem Lot zusammenfassen: begrenzt die Lotanzahl auf die Anzahl
+# der Jahre, FIFO und Vorabpauschale werden dann aber nur noch jahresgenau statt lotgenau gerechnet
+lots_jahresweise_zusammenfassen = False
 
 # === INITIALISIERUNG ===
 start_date = datetime.date(2025, 1, 1)
-portfolio = deque()
-log = []
-total_tax_paid = 0
-total_costs_paid = 0
-jahreswerte = []
-freistellungs_topf = freistellungsauftrag_jahr
-
-# Einmalanlage mit Ausgabeaufschlag
-aufschlag = initial_investment * ausgabeaufschlag
-nettobetrag = initial_investment - aufschlag
-portfolio.append({
-    "date": start_date,
-    "amount_invested": nettobetrag,
-    "units": nettobetrag,
-    "value": nettobetrag,
-    "start_of_prev_year_value": nettobetrag,
-    "vorabpauschalen_bereits_versteuert": 0.0
-})
 
-# === SIMULATION ===
-for month in range(total_months + entnahme_jahre * 12):
-    current_date = start_date + datetime.timedelta(days=30 * month)
-    year = current_date.year
-    is_january = current_date.month == 1
-
-    # Dynamik des Sparbetrags
-    if month > 0 and month % dynamik_turnus_monate == 0:
-        monthly_investment *= (1 + monthly_dynamik_rate)
-
-    # Sonderzahlung
-    if month == sonderzahlung_jahr * 12:
-        aufschlag = sonderzahlung_betrag * ausgabeaufschlag
-        netto = sonderzahlung_betrag - aufschlag
-        portfolio.append({
-            "date": current_date,
-            "amount_invested": netto,
-            "units": netto,
-            "value": netto,
-            "start_of_prev_year_value": netto,
-            "vorabpauschalen_bereits_versteuert": 0.0
-        })
-
-    # Monatliche Einzahlung
-    if month < total_months:
-        aufschlag = monthly_investment * ausgabeaufschlag
-        netto = monthly_investment - aufschlag
-        portfolio.append({
-            "date": current_date,
-            "amount_invested": netto,
-            "units": netto,
-            "value": netto,
-            "start_of_prev_year_value": netto,
-            "vorabpauschalen_bereits_versteuert": 0.0
-        })
-
-    # Vorabpauschale im Januar
-    if is_january:
-        freistellungs_topf = freistellungsauftrag_jahr
-        for entry in portfolio:
-            start_value = entry["start_of_prev_year_value"]
-            fiktiver_ertrag = start_value * basiszins
-            real_ertrag = entry["value"] - entry["amount_invested"]
-            steuerbarer_ertrag = min(fiktiver_ertrag, real_ertrag)
-            steuerfreibetrag = min(freistellungs_topf, steuerbarer_ertrag * teilfreistellung)
-            zu_versteuern = max(0, (steuerbarer_ertrag * teilfreistellung) - steuerfreibetrag)
-            steuer = max(0, zu_versteuern * full_tax_rate)
-            if steuer > 0:
-                entry["value"] -= steuer
-                entry["vorabpauschalen_bereits_versteuert"] += steuerbarer_ertrag
-                total_tax_paid += steuer
-                freistellungs_topf -= steuerfreibetrag
-
-    # TER, Verwaltergebühren, Stückkosten (jährlich)
-    if is_january:
-        jahreswert = sum([e["value"] for e in portfolio])
-        kosten = jahreswert * (ter + verwalter_gebuehr) + stueckkosten
-        for entry in portfolio:
-            anteil = entry["value"] / jahreswert if jahreswert > 0 else 0
-            entry["value"] -= kosten * anteil
-        total_costs_paid += kosten
-
-    # Wertentwicklung
-    for entry in portfolio:
-        entry["value"] *= (1 + monthly_return)
-
-    # Rebalancing (Umschichtung)
-    if is_january and 0 < month < total_months:
-        rebalancing_value = sum(e["value"] for e in portfolio) * rebalancing_rate
-        remaining = rebalancing_value
-        while remaining > 0 and portfolio:
-            entry = portfolio[0]
-            if entry["value"] <= 0:
-                portfolio.popleft()
-                continue
-            sell_value = min(entry["value"], remaining)
-            prop = sell_value / entry["value"]
-            cost_basis = entry["amount_invested"] * prop
-            anteilig_vorab = entry["vorabpauschalen_bereits_versteuert"] * prop
-            gain = sell_value - cost_basis - anteilig_vorab
-            steuerbarer_gewinn = gain * teilfreistellung
-            steuerfreibetrag = min(freistellungs_topf, steuerbarer_gewinn)
-            steuer = max(0, (steuerbarer_gewinn - steuerfreibetrag) * full_tax_rate)
-            freistellungs_topf -= steuerfreibetrag
-            sell_value_netto = sell_value - steuer - (sell_value * ruecknahmeabschlag)
+
+# === SIMULATIONSKERN ===
+# FIFO-Verkauf eines Betrags ab dem ältesten Lot, gemeinsam für Rebalancing und Entnahme.
+# Ändert die Lot-Arrays direkt und gibt neuen head, Freibetrag und gezahlte Steuer zurück.
+def verkaufe_fifo(remaining, anteile, amount_invested, vorab_versteuert, head, tail,
+                  anteilswert, freistellungs_topf, teilfreistellung, full_tax_rate):
+    if remaining <= 0 or head >= tail:
+        return head, freistellungs_topf, 0.0
+
+    # FIFO: Lots ab head vollständig verkaufen, bis ihre kumulierte Summe den
+    # Betrag erreicht; das Lot an dieser Stelle wird anteilig verkauft
+    lot_werte = anteile[head:tail] * anteilswert
+    kumuliert = np.cumsum(np.maximum(lot_werte, 0))
+    k = int(np.searchsorted(kumuliert, remaining))
+    ende = min(k + 1, tail - head)
+    sell_value = np.maximum(lot_werte[:ende], 0)
+    if k < tail - head:
+        sell_value[k] = remaining - (kumuliert[k - 1] if k > 0 else 0.0)
+    prop = np.divide(sell_value, lot_werte[:ende], out=np.zeros(ende), where=lot_werte[:ende] > 0)
+    cost_basis = amount_invested[head:head + ende] * prop
+    anteilig_vorab = vorab_versteuert[head:head + ende] * prop
+    gain = sell_value - cost_basis - anteilig_vorab
+    steuerbarer_gewinn = gain * teilfreistellung
+    # Freibetrag je Lot: topf_i = max(topf_(i-1) - gewinn_i, 0), Verluste füllen ihn wieder auf.
+    # Geschlossen mit G = kumulierte Gewinne: topf_i = max(topf_0, max(G_1..G_i)) - G_i
+    gewinn_kumuliert = np.cumsum(steuerbarer_gewinn)
+    topf_nach = np.maximum(np.maximum.accumulate(gewinn_kumuliert), freistellungs_topf) - gewinn_kumuliert
+    topf_vor = np.concatenate(([freistellungs_topf], topf_nach[:-1]))
+    steuer = np.maximum(steuerbarer_gewinn - topf_vor, 0) * full_tax_rate
+    freistellungs_topf = topf_nach[-1]
+    anteile[head:head + ende] -= sell_value / anteilswert
+    amount_invested[head:head + ende] -= cost_basis
+    vorab_versteuert[head:head + ende] -= anteilig_vorab
+    # head rückt über alle vollständig verkauften Lots vor; das zuletzt angefasste Lot
+    # (anteilig verkauft, oder letztes Lot wenn alles verkauft wurde) nur wenn es leer ist
+    head += ende - 1 + int(lot_werte[ende - 1] - sell_value[ende - 1] < 1e-4)
+    return head, freistellungs_topf, steuer.sum()
+
+
+# Vorabpauschale im Januar für alle gehaltenen Lots. Der Freibetrag wird in FIFO-Reihenfolge
+# vom steuerpflichtigen Ertrag jedes Lots verbraucht, auch wenn das Lot darunter bleibt;
+# die Vorabpauschale gilt dann trotzdem als versteuert und mindert den späteren Verkaufsgewinn.
+# Ändert die Lot-Arrays direkt und gibt verbleibenden Freibetrag und gezahlte Steuer zurück.
+def versteuere_vorabpauschale(anteile, amount_invested, start_value, vorab_versteuert, head, tail,
+                              anteilswert, freistellungs_topf, basiszins, teilfreistellung, full_tax_rate):
+    if head >= tail:
+        return freistellungs_topf, 0.0
+
+    fiktiver_ertrag = start_value[head:tail] * basiszins
+    real_ertrag = anteile[head:tail] * anteilswert - amount_invested[head:tail]
+    # Verluste ergeben keine Vorabpauschale und füllen den Topf nicht wieder auf
+    steuerbarer_ertrag = np.maximum(np.minimum(fiktiver_ertrag, real_ertrag), 0)
+    teilfreier_ertrag = steuerbarer_ertrag * teilfreistellung
+    # Kumulierte Erträge, am Topf gekappt
+    verbraucht = np.minimum(np.cumsum(teilfreier_ertrag), freistellungs_topf)
+    steuerfreibetrag = np.diff(verbraucht, prepend=0.0)
+    steuer = (teilfreier_ertrag - steuerfreibetrag) * full_tax_rate
+    anteile[head:tail] -= steuer / anteilswert
+    vorab_versteuert[head:tail] += steuerbarer_ertrag
+    return freistellungs_topf - verbraucht[-1], steuer.sum()
+
+
+# Das Depot wird als Ringpuffer aus parallelen Arrays geführt (ein Index pro Kauf-Lot):
+# head = ältestes noch gehaltenes Lot (FIFO), tail = nächster freier Platz.
+# Lots halten Anteile; Wertentwicklung und anteilige Kosten treffen alle Lots gleich
+# und werden nur im gemeinsamen Anteilswert fortgeschrieben (Lotwert = Anteile * Anteilswert).
+def simuliere_depot(initial_investment, monthly_investment, monthly_dynamik_rate,
+                    freistellungsauftrag_jahr, sonderzahlung_jahr, sonderzahlung_betrag,
+                    dynamik_turnus_monate, monatsrenditen, total_months, entnahme_jahre,
+                    rebalancing_rate, basiszins, teilfreistellung, full_tax_rate,
+                    ausgabeaufschlag, ruecknahmeabschlag, laufende_kosten_rate,
+                    stueckkosten, annual_withdrawal, lots_jahresweise_zusammenfassen,
+                    kalendermonate):
+    n_monate = total_months + entnahme_jahre * 12
+    is_january = kalendermonate == 1
+    is_december = kalendermonate == 12
+    monate = np.arange(n_monate)
+    is_rebalancing = is_january & (monate > 0) & (monate < total_months)
+
+    # Wachstumsfaktoren je Monat aus dem Renditepfad (konstant oder z. B. ein Monte-Carlo-Pfad)
+    wachstum = 1 + np.asarray(monatsrenditen, dtype=float)
+
+    # Über die gesamte Laufzeit konstante Faktoren nur einmal berechnen
+    reinvest_faktor = 1 - ruecknahmeabschlag - ausgabeaufschlag
+    entnahme_monatlich = annual_withdrawal / 12
+
+    # Ringpuffer-Kapazität = Anzahl aller angelegten Lots: Einmalanlage, Sonderzahlung,
+    # eine Einzahlung pro Ansparmonat und eine Wiederanlage pro Rebalancing-Januar
+    kapazitaet = 2 + total_months + int(np.count_nonzero(is_rebalancing))
+    # Bewusst float64: Beträge werden centgenau ausgewiesen, mit float32 weichen Depotwert
+    # und Steuern über 30 Jahre bereits um bis zu ~0,10 € ab; bei wenigen hundert Lots
+    # spart float32 ohnehin keine nennenswerte Speicherbandbreite
+    amount_invested = np.zeros(kapazitaet, dtype=np.float64)
+    anteile = np.zeros(kapazitaet, dtype=np.float64)            # units
+    start_value = np.zeros(kapazitaet, dtype=np.float64)        # start_of_prev_year_value
+    vorab_versteuert = np.zeros(kapazitaet, dtype=np.float64)   # vorabpauschalen_bereits_versteuert
+    head = 0
+    tail = 0
+    anteilswert = 1.0
+    erstes_lot_des_jahres = 0
+
+    depotwert_log = np.empty(n_monate)
+    steuern_log = np.empty(n_monate)
+    kosten_log = np.empty(n_monate)
+    freibetrag_log = np.empty(n_monate)
+
+    total_tax_paid = 0.0
+    total_costs_paid = 0.0
+    freistellungs_topf = freistellungsauftrag_jahr
+
+    # Einmalanlage mit Ausgabeaufschlag
+    aufschlag = initial_investment * ausgabeaufschlag
+    nettobetrag = initial_investment - aufschlag
+    amount_invested[tail] = nettobetrag
+    anteile[tail] = nettobetrag / anteilswert
+    start_value[tail] = nettobetrag
+    vorab_versteuert[tail] = 0.0
+    tail += 1
+
+    for month in range(n_monate):
+        # Dynamik des Sparbetrags
+        if month > 0 and month % dynamik_turnus_monate == 0:
+            monthly_investment *= (1 + monthly_dynamik_rate)
+
+        # Sonderzahlung und monatliche Einzahlung desselben Monats bilden ein gemeinsames Lot
+        netto = 0.0
+        einzahlung = False
+        if month == sonderzahlung_jahr * 12:
+            aufschlag = sonderzahlung_betrag * ausgabeaufschlag
+            netto += sonderzahlung_betrag - aufschlag
+            einzahlung = True
+        if month < total_months:
+            aufschlag = monthly_investment * ausgabeaufschlag
+            netto += monthly_investment - aufschlag
+            einzahlung = True
+        if einzahlung:
+            amount_invested[tail] = netto
+            anteile[tail] = netto / anteilswert
+            start_value[tail] = netto
+            vorab_versteuert[tail] = 0.0
+            tail += 1
+
+        # Vorabpauschale im Januar
+        if is_january[month]:
+            freistellungs_topf, steuer = versteuere_vorabpauschale(
+                anteile, amount_invested, start_value, vorab_versteuert, head, tail, anteilswert,
+                freistellungsauftrag_jahr, basiszins, teilfreistellung, full_tax_rate)
+            total_tax_paid += steuer
+
+        # TER, Verwaltergebühren, Stückkosten (jährlich) und Wertentwicklung:
+        # die anteilige Kostenbelastung ist ein gemeinsamer Faktor für alle Lots
+        # und wird zusammen mit dem Wachstum nur auf den Anteilswert angewendet
+        faktor = wachstum[month]
+        if is_january[month]:
+            jahreswert = anteile[head:tail].sum() * anteilswert
+            kosten = jahreswert * laufende_kosten_rate + stueckkosten
+            if jahreswert > 0:
+                faktor *= 1 - kosten / jahreswert
+            total_costs_paid += kosten
+        anteilswert *= faktor
+        # Totalverlust (Monatsrendite -100 % oder Kosten in Höhe des Depotwerts): alle Lots stehen
+        # auf 0. Anteile nullen und den Anteilswert neu bei 1 beginnen, damit spätere Käufe und
+        # Verkäufe nicht durch 0 teilen; die Lots bleiben mit Wert 0 und ihrer Kostenbasis erhalten
+        if anteilswert == 0:
+            anteile[head:tail] = 0.0
+            anteilswert = 1.0
+
+        # Rebalancing (Umschichtung)
+        if is_rebalancing[month]:
+            rebalancing_value = anteile[head:tail].sum() * anteilswert * rebalancing_rate
+            head, freistellungs_topf, steuer = verkaufe_fifo(
+                rebalancing_value, anteile, amount_invested, vorab_versteuert, head, tail,
+                anteilswert, freistellungs_topf, teilfreistellung, full_tax_rate)
             total_tax_paid += steuer
-            entry["value"] -= sell_value
-            entry["amount_invested"] -= cost_basis
-            entry["vorabpauschalen_bereits_versteuert"] -= anteilig_vorab
-            remaining -= sell_value
-            if entry["value"] < 1e-4:
-                portfolio.popleft()
-        # Wiederanlage nach Ausgabeaufschlag
-        reinvest_netto = rebalancing_value * (1 - ruecknahmeabschlag - ausgabeaufschlag)
-        portfolio.append({
-            "date": current_date,
-            "amount_invested": reinvest_netto,
-            "units": reinvest_netto,
-            "value": reinvest_netto,
-            "start_of_prev_year_value": reinvest_netto,
-            "vorabpauschalen_bereits_versteuert": 0.0
-        })
-
-    # Entnahmephase
-    if month >= total_months:
-        entnahme_monatlich = annual_withdrawal / 12
-        remaining = entnahme_monatlich
-        while remaining > 0 and portfolio:
-            entry = portfolio[0]
-            if entry["value"] <= 0:
-                portfolio.popleft()
-                continue
-            sell_value = min(entry["value"], remaining)
-            prop = sell_value / entry["value"]
-            cost_basis = entry["amount_invested"] * prop
-            anteilig_vorab = entry["vorabpauschalen_bereits_versteuert"] * prop
-            gain = sell_value - cost_basis - anteilig_vorab
-            steuerbarer_gewinn = gain * teilfreistellung
-            steuerfreibetrag = min(freistellungs_topf, steuerbarer_gewinn)
-            steuer = max(0, (steuerbarer_gewinn - steuerfreibetrag) * full_tax_rate)
-            freistellungs_topf -= steuerfreibetrag
-            sell_value_netto = sell_value - steuer
+            # Wiederanlage nach Ausgabeaufschlag (eigenes Lot, da nach der Wertentwicklung
+            # zu anderem Anteilswert gekauft als die Einzahlung des Monats)
+            reinvest_netto = rebalancing_value * reinvest_faktor
+            amount_invested[tail] = reinvest_netto
+            anteile[tail] = reinvest_netto / anteilswert
+            start_value[tail] = reinvest_netto
+            vorab_versteuert[tail] = 0.0
+            tail += 1
+
+        # Entnahmephase
+        if month >= total_months:
+            head, freistellungs_topf, steuer = verkaufe_fifo(
+                entnahme_monatlich, anteile, amount_invested, vorab_versteuert, head, tail,
+                anteilswert, freistellungs_topf, teilfreistellung, full_tax_rate)
             total_tax_paid += steuer
-            entry["value"] -= sell_value
-            entry["amount_invested"] -= cost_basis
-            entry["vorabpauschalen_bereits_versteuert"] -= anteilig_vorab
-            remaining -= sell_value
-            if entry["value"] < 1e-4:
-                portfolio.popleft()
-
-    # Logging
-    depotwert = sum([e["value"] for e in portfolio])
-    log.append({
-        "Datum": current_date,
-        "Depotwert": depotwert,
-        "Steuern kumuliert": total_tax_paid,
-        "Kosten kumuliert": total_costs_paid,
-        "Freibetrag verbleibend": freistellungs_topf
-    })
-
-    # Jahresanfangswert aktualisieren für Vorabpauschale im Folgejahr
-    if current_date.month == 12:
-        for entry in portfolio:
-            entry["start_of_prev_year_value"] = entry["value"]
-
-# === AUSGABE ===
-df = pd.DataFrame(log)
-print(df.tail(12))
-df['Datum'] = pd.to_datetime(df['Datum'])
-
-plt.figure(figsize=(14, 8))
-plt.plot(df['Datum'], df['Depotwert'], label='Depotwert', linewidth=2)
-plt.plot(df['Datum'], df['Steuern kumuliert'], label='Kumulierte Steuern', linestyle='--')
-plt.plot(df['Datum'], df['Kosten kumuliert'], label='Kumulierte Kosten', linestyle=':')
-plt.title('Verlauf von Depotwert, Steuern und Kosten')
-plt.xlabel('Datum')
-plt.ylabel('Euro')
-plt.legend()
-plt.grid(True)
-plt.tight_layout()
-#plt.show()
-
-print(f"Endwert: {df['Depotwert'].iloc[-1]:,.2f} €")
-print(f"Summe gezahlter Steuern: {total_tax_paid:,.2f} €")
-print(f"Summe gezahlter Kosten: {total_costs_paid:,.2f} €")
+
+        # Logging
+        depotwert = anteile[head:tail].sum() * anteilswert
+        depotwert_log[month] = depotwert
+        steuern_log[month] = total_tax_paid
+        kosten_log[month] = total_costs_paid
+        freibetrag_log[month] = freistellungs_topf
+
+        # Jahresanfangswert aktualisieren für Vorabpauschale im Folgejahr
+        if is_december[month]:
+            np.multiply(anteile[head:tail], anteilswert, out=start_value[head:tail])
+            if lots_jahresweise_zusammenfassen:
+                erstes = max(head, erstes_lot_des_jahres)
+                if tail - erstes > 1:
+                    for spalte in (amount_invested, anteile, start_value, vorab_versteuert):
+                        spalte[erstes] = spalte[erstes:tail].sum()
+                    tail = erstes + 1
+                erstes_lot_des_jahres = tail
+
+    return depotwert_log, steuern_log, kosten_log, freibetrag_log
+
+
+# === SIMULATION ===
+# Nur beim direkten Aufruf; simuliere_depot() lässt sich so auch für wiederholte Läufe
+# mit geänderten Parametern importieren, ohne Ausgabe und Diagramm zu erzeugen
+if __name__ == "__main__":
+    # Datumsraster in 30-Tage-Schritten, einmalig vorab berechnet
+    n_monate = total_months + entnahme_jahre * 12
+    daten = np.datetime64(start_date) + 30 * np.arange(n_monate)
+    kalendermonate = daten.astype("datetime64[M]").astype(int) % 12 + 1
+    # Deterministischer Lauf: konstante Monatsrendite in jedem Monat
+    monatsrenditen = np.full(n_monate, monthly_return)
+
+    depotwert_log, steuern_log, kosten_log, freibetrag_log = simuliere_depot(
+        initial_investment, monthly_investment, monthly_dynamik_rate,
+        freistellungsauftrag_jahr, sonderzahlung_jahr, sonderzahlung_betrag,
+        dynamik_turnus_monate, monatsrenditen, total_months, entnahme_jahre,
+        rebalancing_rate, basiszins, teilfreistellung, full_tax_rate,
+        ausgabeaufschlag, ruecknahmeabschlag, laufende_kosten_rate,
+        stueckkosten, annual_withdrawal, lots_jahresweise_zusammenfassen,
+        kalendermonate)
+    total_tax_paid = steuern_log[-1]
+    total_costs_paid = kosten_log[-1]
+
+    # === AUSGABE ===
+    # Datum liegt bereits als datetime64 vor, eine nachträgliche Umwandlung entfällt
+    df = pd.DataFrame({
+        "Datum": daten,
+        "Depotwert": depotwert_log,
+        "Steuern kumuliert": steuern_log,
+        "Kosten kumuliert": kosten_log,
+        "Freibetrag verbleibend": freibetrag_log
+    }, copy=False)
+    print(df.tail(12))
+
+    plt.figure(figsize=(14, 8))
+    plt.plot(df['Datum'], df['Depotwert'], label='Depotwert', linewidth=2)
+    plt.plot(df['Datum'], df['Steuern kumuliert'], label='Kumulierte Steuern', linestyle='--')
+    plt.plot(df['Datum'], df['Kosten kumuliert'], label='Kumulierte Kosten', linestyle=':')
+    plt.title('Verlauf von Depotwert, Steuern und Kosten')
+    plt.xlabel('Datum')
+    plt.ylabel('Euro')
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    #plt.show()
+
+    print(f"Endwert: {df['Depotwert'].iloc[-1]:,.2f} €")
+    print(f"Summe gezahlter Steuern: {total_tax_paid:,.2f} €")
+    print(f"Summe gezahlter Kosten: {total_costs_paid:,.2f} €")
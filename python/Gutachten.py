@@ -1,8 +1,6 @@
 # Sparplan Simulator
 
 # Imports
-from collections import deque
-from dateutil.relativedelta import relativedelta
 import datetime
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -12,6 +10,8 @@ from typing import List, Dict, Any, Optional
 import pyxirr
 import warnings
 import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 
 # Unterdrückt RuntimeWarnings und FutureWarnings
 warnings.filterwarnings("ignore", category=RuntimeWarning)
@@ -44,6 +44,7 @@ class BasisParameter: #allgemeine Paraeter für alle Simulationen
     freistellungs_pauschbetrag_anpassung_rate: Optional[float] = 0.02
     start_date: Optional[datetime.date] = datetime.date.today().replace(day=1)
     death_year: Optional[int] = None
+    inflation_seed: Optional[int] = None #fester Seed macht die Inflationspfade reproduzierbar und Ergebnisse cachebar
 
 
 @dataclasses.dataclass
@@ -90,17 +91,54 @@ class VersicherungParameter(BasisParameter): #spezifische Parameter für Versich
     versicherung_modus: bool = True
 
 
+# Spalten des monatlichen Kosten-Logs (ohne Datum)
+LOG_SPALTEN = [
+    "Depotwert", "Depotwert real",
+    "Ausgabeaufschlag kum", "Ausgabeaufschlag kum real",
+    "Rücknahmeabschlag kum", "Rücknahmeabschlag kum real",
+    "Stückkosten kum", "Stückkosten kum real",
+    "Gesamtfondkosten kum", "Gesamtfondkosten kum real",
+    "Serviceentgelt kum", "Serviceentgelt kum real",
+    "Guthabenkosten kum", "Guthabenkosten kum real",
+    "Abschlusskosten kum", "Abschlusskosten kum real",
+    "Verwaltungskosten kum", "Verwaltungskosten kum real",
+    "Steuern kumuliert", "Steuern kumuliert real",
+    "Steuern aus Entnahme", "Steuern aus Entnahme real",
+    "Kumulierte Entnahmen", "Kumulierte Entnahmen real"
+]
+
+# Anzahl Jahre am Anfang und Ende der Kostentabelle, die im Markdown-Report gezeigt werden
+REPORT_AUSZUG_JAHRE = 5
+
+# LRU-Cache für SparplanSimulator.run_simulation_cached, älteste Einträge werden ab SIMULATION_CACHE_SIZE verdrängt
+SIMULATION_CACHE_SIZE = 64
+_simulation_cache = OrderedDict()
+
 # Hauptsimulationsklasse, verwaltet Portfolio monatsweise, berechnet Kosten, Steuern, Entnahmen und verwaltet Wertentwicklung
 class SparplanSimulator:
     def __init__(self, params: Any, annual_return: float): #initialisiert Variablen für Simulation
         self.params = params
         self.annual_return = annual_return
-        self.portfolio = deque() #deque um auf älteste Element zuzugreifen für FIFO
+        #Portfolio als parallele Arrays (ein Index pro Posten, ältester Posten vorne für FIFO)
+        #bewusst float64: mit float32 weichen Depotwert und Steuern über 50 Jahre um bis zu einige hundert Euro ab
+        anzahl_monate = self.params.laufzeit * 12
+        turnus_monate = self.params.regel_sonderzahlung_turnus_jahre * 12
+        anzahl_sonderzahlungen = 1 + ((anzahl_monate - 1) // turnus_monate if turnus_monate > 0 else 0)
+        #Anfangsposten + Todesfall + monatliche Einzahlungen + Sonderzahlungen + ein Umschichtungsposten pro Jahr
+        max_posten = 2 + anzahl_monate + anzahl_sonderzahlungen + self.params.laufzeit + 1
+        self.pf_value = np.empty(max_posten, dtype=np.float64)
+        self.pf_invested = np.empty(max_posten, dtype=np.float64)
+        self.pf_startprev = np.empty(max_posten, dtype=np.float64)
+        self.pf_vap = np.empty(max_posten, dtype=np.float64)
+        self.pf_date_ord = np.empty(max_posten, dtype=np.int64)
+        self.pf_n = 0
         self.rebalancing_log = []
-        self.monatliche_kosten_logs = []
-        self.cashflows = []
-        self.cashflow_dates = []
-        self.real_cashflows = []
+        #Cashflows für XIRR als Arrays mit Schreibzeiger: Anfangszahlung + Schlusszahlung + je Monat Beitrag oder Entnahme + Sonderzahlungen
+        max_cashflows = 2 + anzahl_monate + anzahl_sonderzahlungen
+        self.cf_betrag = np.empty(max_cashflows, dtype=np.float64)
+        self.cf_datum_index = np.empty(max_cashflows, dtype=np.int64) #Index in self.dates
+        self.cf_inv_inflation = np.empty(max_cashflows, dtype=np.float64) #Kehrwert des Inflationsfaktors zum Buchungszeitpunkt
+        self.cf_n = 0
         self.start_date = params.start_date
 
         #monatlich kumulierte Kosten und Steuern
@@ -129,269 +167,356 @@ class SparplanSimulator:
         self.total_tax_paid_real = 0
         self.total_withdrawal_tax_paid_real = 0
         self.freistellungs_topf = self.params.freistellungsauftrag_jahr
-        self.monthly_investment = self.params.monthly_investment
         self.abschlusskosten_rest = 0.0
-        self.kumulierte_inflation_factor = 1.0
 
-        #generiert monatliche Inflationsraten basierend auf Normalverteilung
-        self.monthly_inflation_rates = np.random.normal(
+        #generiert monatliche Inflationsraten basierend auf Normalverteilung, mit eigenem Generator falls Seed gesetzt
+        zufall = np.random if self.params.inflation_seed is None else np.random.default_rng(self.params.inflation_seed)
+        #direkt als Multiplikator (1 + Rate) abgelegt, da nur dieser weiterverwendet wird
+        self.monthly_inflation_mult = 1.0 + zufall.normal(
             loc=self.params.inflation_rate / 12,
             scale=self.params.inflation_volatility / np.sqrt(12),
             size=self.params.laufzeit * 12
         )
+        #kumulierter Inflationsfaktor zu Beginn jedes Monats (Index 0 = Start, Index m+1 = nach Monat m) und Kehrwert
+        self.inflation_factors = np.concatenate(([1.0], np.cumprod(self.monthly_inflation_mult)))
+        self.inv_inflation = 1.0 / self.inflation_factors
+        self.inv_inflation_aktuell = self.inv_inflation[0]
         self.monthly_return = (1 + self.annual_return) ** (1 / 12) - 1
+        self.wachstumsfaktor = 1 + self.monthly_return
         self.full_tax_rate = self.params.abgeltungssteuer_rate * (
                 1 + self.params.soli_zuschlag_on_abgeltungssteuer + self.params.kirchensteuer_on_abgeltungssteuer)
         self.death_triggered = False
+
+        #optionale Parameter einmal auflösen (nicht jede Parameterklasse hat alle Felder), statt getattr in jedem Monat
+        self._ausgabeaufschlag = getattr(params, "ausgabeaufschlag", 0.0)
+        self._monthly_ausgabeaufschlag = getattr(params, "monthly_ausgabeaufschlag", 0.0)
+        self._ruecknahmeabschlag = getattr(params, "ruecknahmeabschlag", 0.0)
+        self._stueckkosten = getattr(params, "stueckkosten", 0.0)
+        self._teilfreistellung = getattr(params, "teilfreistellung", 0.0)
+        self._basiszins = getattr(params, "basiszins", 0.0)
+        self._rebalancing_rate = getattr(params, "rebalancing_rate", 0.0)
+        self._abschlusskosten_einmalig_prozent = getattr(params, "abschlusskosten_einmalig_prozent", 0.0)
+        self._abschlusskosten_monatlich_prozent = getattr(params, "abschlusskosten_monatlich_prozent", 0.0)
+        #im Monatsschritt gelesene Pflichtparameter ebenfalls einmal als Attribute des Simulators ablegen
+        self._beitragsmonate = self.params.beitragszahldauer * 12
+        self._ter = self.params.ter
+        self._serviceentgelt = self.params.serviceentgelt
+        self._guthabenkosten = getattr(params, "guthabenkosten", 0.0)
+        self._verwaltungskosten_monatlich_prozent = getattr(params, "verwaltungskosten_monatlich_prozent", 0.0)
+        self._persoenlicher_steuersatz = self.params.persoenlicher_steuersatz
+        self._entnahme_plan_jahre = sorted(self.params.entnahme_plan.keys(), reverse=True) if self.params.entnahme_plan else []
         self.verrechnungs_monate_verbleibend = 0
         self.monatliche_abschlusskosten_fix = 0
 
-    def run_simulation(self) -> (pd.DataFrame, List[Dict[str, Any]], List[float], List[datetime.date], List[float]):
+        #Modus steht für die ganze Simulation fest: Kostenschritt und nötige Teilschritte werden einmal ausgewählt
+        self._kosten_schritt = (self._monatliche_kosten_versicherung if self.params.versicherung_modus
+                                else self._monatliche_kosten_depot)
+        self._mit_vorabpauschale = not self.params.versicherung_modus
+        self._mit_rebalancing = not self.params.versicherung_modus and self._rebalancing_rate > 0
+        self._mit_todesfall = bool(self.params.death_year)
+
+    def run_simulation(self) -> (pd.DataFrame, List[Dict[str, Any]], np.ndarray, List[datetime.date], np.ndarray):
         self._initialisiere_simulation()
+        simuliere_monat = self._simuliere_monat #einmal gebunden statt Attributsuche in jedem Monat
         for month in range(self.params.laufzeit * 12):
-            self._simuliere_monat(month)
+            simuliere_monat(month)
         self._finalisiere_simulation()
-        df_kosten = pd.DataFrame(self.monatliche_kosten_logs)
-        return df_kosten, self.rebalancing_log, self.cashflows, self.cashflow_dates, self.real_cashflows
+        df_kosten = pd.DataFrame(self.log_werte, columns=LOG_SPALTEN)
+        df_kosten.insert(0, "Datum", self.dates)
+        #reale Cashflows in einem Schritt aus den nominalen und den gemerkten Inflationsfaktoren
+        cashflows = self.cf_betrag[:self.cf_n].copy()
+        real_cashflows = cashflows * self.cf_inv_inflation[:self.cf_n]
+        cashflow_dates = self.dates[self.cf_datum_index[:self.cf_n]].tolist()
+        return df_kosten, self.rebalancing_log, cashflows, cashflow_dates, real_cashflows
+
+    @classmethod
+    def run_simulation_cached(cls, params: Any, annual_return: float): #wie run_simulation, bei gesetztem inflation_seed aus dem Cache
+        if params.inflation_seed is None: #ohne Seed ist jeder Lauf zufällig, Cache wäre falsch
+            return cls(params, annual_return).run_simulation()
+        #Schlüssel aus repr, da die Dataclasses (u.a. wegen entnahme_plan) nicht hashbar sind; repr enthält Klasse und alle Felder
+        schluessel = (repr(params), annual_return)
+        if schluessel in _simulation_cache:
+            _simulation_cache.move_to_end(schluessel)
+        else:
+            _simulation_cache[schluessel] = cls(params, annual_return).run_simulation()
+            if len(_simulation_cache) > SIMULATION_CACHE_SIZE:
+                _simulation_cache.popitem(last=False)
+        df_kosten, rebalancing_log, cashflows, cashflow_dates, real_cashflows = _simulation_cache[schluessel]
+        #Kopien zurückgeben, damit Aufrufer den Cacheinhalt nicht verändern
+        return (df_kosten.copy(), [dict(e) for e in rebalancing_log], cashflows.copy(), list(cashflow_dates),
+                real_cashflows.copy())
+
+    @classmethod
+    def clear_cache(cls): #leert den Simulationscache, z.B. nach Änderungen am Modell
+        _simulation_cache.clear()
 
     def _initialisiere_simulation(self): #initiale Kosten der Anfangsinvestition
+        #Log-Arrays für alle Monate plus finalen Zustand, Spalten in Reihenfolge von LOG_SPALTEN
+        anzahl_zeilen = self.params.laufzeit * 12 + 1
+        self.log_werte = np.empty((anzahl_zeilen, len(LOG_SPALTEN)), dtype=np.float64)
+        #Kalenderdaten aller Monate plus Enddatum einmal als Monatsarithmetik mit datetime64 berechnen
+        #(wie relativedelta: Tag des Startdatums, am Monatsende auf den letzten Tag gekürzt)
+        monate_abs = np.datetime64(self.start_date, "M") + np.arange(anzahl_zeilen)
+        monatsanfang = monate_abs.astype("datetime64[D]")
+        monatslaenge = ((monate_abs + 1).astype("datetime64[D]") - monatsanfang).astype(np.int64)
+        tage = np.minimum(self.start_date.day, monatslaenge) - 1
+        self.dates = (monatsanfang + tage).astype(object)
+        monatsindex = monate_abs.astype(np.int64) #Monate seit 1970-01
+        self.month_of = (monatsindex % 12 + 1).astype(np.int8)
+        self.year_of = (monatsindex // 12 + 1970).astype(np.int16)
+
+        #Zahlungsplan: Monatsbeitrag mit Dynamik alle dynamik_turnus_monate und Sonderzahlungen je Monat
+        anzahl_monate = self.params.laufzeit * 12
+        monate = np.arange(anzahl_monate)
+        dynamik_faktoren = np.ones(anzahl_monate)
+        if self.params.dynamik_turnus_monate > 0:
+            dynamik_faktoren[(monate > 0) & (monate % self.params.dynamik_turnus_monate == 0)] = 1 + self.params.monthly_dynamik_rate
+        self.monatsbeitraege = self.params.monthly_investment * np.cumprod(dynamik_faktoren)
+        self.sonderzahlung_plan = np.zeros(anzahl_monate)
+        turnus_monate = self.params.regel_sonderzahlung_turnus_jahre * 12
+        if turnus_monate > 0:
+            self.sonderzahlung_plan[turnus_monate::turnus_monate] = self.params.regel_sonderzahlung_betrag
+        einmalig_monat = self.params.sonderzahlung_jahr * 12
+        if einmalig_monat == int(einmalig_monat) and 0 <= einmalig_monat < anzahl_monate:
+            self.sonderzahlung_plan[int(einmalig_monat)] = self.params.sonderzahlung_betrag
+
         #Abschlusskosten Versicherung
         if self.params.versicherung_modus:
-            abschlusskosten_einmalig = self.params.initial_investment * getattr(self.params,
-                                                                                "abschlusskosten_einmalig_prozent", 0.0)
-            abschlusskosten_monatlich_total = (
-                                                      self.params.monthly_investment * self.params.beitragszahldauer * 12) * getattr(
-                self.params, "abschlusskosten_monatlich_prozent", 0.0)
+            abschlusskosten_einmalig = self.params.initial_investment * self._abschlusskosten_einmalig_prozent
+            abschlusskosten_monatlich_total = (self.params.monthly_investment * self.params.beitragszahldauer * 12
+                                               * self._abschlusskosten_monatlich_prozent)
             self.abschlusskosten_rest = abschlusskosten_einmalig + abschlusskosten_monatlich_total
             if self.params.verrechnungsdauer_monate > 0:
                 self.monatliche_abschlusskosten_fix = self.abschlusskosten_rest / self.params.verrechnungsdauer_monate
                 self.verrechnungs_monate_verbleibend = self.params.verrechnungsdauer_monate
 
-        ausgabeaufschlag = getattr(self.params, "ausgabeaufschlag", 0.0)
+        ausgabeaufschlag = self._ausgabeaufschlag
         aufschlag = self.params.initial_investment * ausgabeaufschlag
         nettobetrag = self.params.initial_investment - aufschlag
         self.ausgabeaufschlag_summe += aufschlag
-        self.ausgabeaufschlag_real_summe += aufschlag / self.kumulierte_inflation_factor
+        self.ausgabeaufschlag_real_summe += aufschlag * self.inv_inflation_aktuell
         #Cashflows für XIRR Berechnung
-        self.cashflows.append(-self.params.initial_investment)
-        self.real_cashflows.append(-self.params.initial_investment)
-        self.cashflow_dates.append(self.start_date)
+        self._cashflow_buchen(-self.params.initial_investment, 0)
 
         #erster Portfolioeintrag
         if nettobetrag > 0:
-            self.portfolio.append({
-                "date": self.start_date,
-                "amount_invested": nettobetrag,
-                "value": nettobetrag,
-                "start_of_prev_year_value": nettobetrag,
-                "vorabpauschalen_bereits_versteuert": 0.0
-            })
+            self._posten_hinzufuegen(self.start_date, nettobetrag)
+
+    def _depotwert(self): #Summe aller Posten als Python-float, damit die anschließende Skalarrechnung nicht mit NumPy-Skalaren läuft
+        return float(self.pf_value[:self.pf_n].sum())
+
+    def _cashflow_buchen(self, betrag, datum_index): #hängt Cashflow mit aktuellem Inflationsstand an, reale Werte erst am Ende
+        i = self.cf_n
+        self.cf_betrag[i] = betrag
+        self.cf_datum_index[i] = datum_index
+        self.cf_inv_inflation[i] = self.inv_inflation_aktuell
+        self.cf_n = i + 1
+
+    def _posten_hinzufuegen(self, datum, betrag): #hängt neuen Posten hinten an das Portfolio an
+        i = self.pf_n
+        self.pf_value[i] = betrag
+        self.pf_invested[i] = betrag
+        self.pf_startprev[i] = betrag
+        self.pf_vap[i] = 0.0
+        self.pf_date_ord[i] = datum.toordinal()
+        self.pf_n = i + 1
+
+    def _fifo_verkaufsmengen(self, betrag): #Anzahl betroffener Posten, Verkaufsbetrag und verkaufter Anteil je Posten nach FIFO
+        werte = np.maximum(self.pf_value[:self.pf_n], 0.0) #Posten ohne Wert werden übersprungen
+        kumuliert = np.cumsum(werte)
+        #erster Posten, bei dem die kumulierte Summe den Betrag erreicht; alle davor werden vollständig verkauft
+        k = int(np.searchsorted(kumuliert, betrag))
+        m = k
+        if k < self.pf_n:
+            rest = betrag - (kumuliert[k - 1] if k > 0 else 0.0)
+            if rest > 1e-9: #nur der Grenzposten wird teilweise verkauft
+                m = k + 1
+        sell_value = werte[:m].copy()
+        if m > k:
+            sell_value[k] = rest
+        anteil = np.divide(sell_value, werte[:m], out=np.zeros(m), where=werte[:m] > 0)
+        return m, sell_value, anteil
+
+    def _freibetrag_verbrauchen(self, betraege): #verbraucht Freistellungsauftrag in FIFO-Reihenfolge, gibt genutzten Betrag je Posten zurück
+        if len(betraege) == 0:
+            return betraege
+        verbraucht_kum = np.minimum(np.cumsum(betraege), self.freistellungs_topf) #gedeckelte kumulierte Summe
+        self.freistellungs_topf -= verbraucht_kum[-1]
+        return np.diff(verbraucht_kum, prepend=0.0)
+
+    def _portfolio_verdichten(self, verkauft): #entfernt leere Posten unter den ersten 'verkauft' Posten nach FIFO-Verkauf
+        spalten = (self.pf_value, self.pf_invested, self.pf_startprev, self.pf_vap, self.pf_date_ord)
+        #verbleibende Restposten werden mit Schreibcursor w nach vorne geschoben, ohne neue Arrays anzulegen
+        w = 0
+        for i in range(verkauft):
+            if self.pf_value[i] > 1e-9:
+                if w != i:
+                    for arr in spalten:
+                        arr[w] = arr[i]
+                w += 1
+        if w != verkauft:
+            rest = self.pf_n - verkauft
+            for arr in spalten:
+                arr[w:w + rest] = arr[verkauft:self.pf_n]
+            self.pf_n = w + rest
 
     def _simuliere_monat(self, month: int):  # simuliert Abläufe für jeden einzelnen Monat
-        current_date = self.start_date + relativedelta(months=month)
-        current_year = current_date.year - self.start_date.year
+        current_date = self.dates[month]
+        current_year = int(self.year_of[month]) - self.start_date.year
 
         # überprüft ob Todesfall in dem Jahr eingetreten ist
-        if self.params.death_year and current_year == self.params.death_year and not self.death_triggered:
+        if self._mit_todesfall and current_year == self.params.death_year and not self.death_triggered:
             self._handle_death(current_date)
             self.death_triggered = True
 
         # Freistellungsauftrag wird zu Beginn jedes Jahres angepasst
-        is_january = current_date.month == 1
+        is_january = self.month_of[month] == 1
         if is_january:
             self.freistellungs_topf = self.params.freistellungsauftrag_jahr * (
-                    1 + self.params.freistellungs_pauschbetrag_anpassung_rate) ** (
-                                              current_date.year - self.start_date.year)
+                    1 + self.params.freistellungs_pauschbetrag_anpassung_rate) ** current_year
 
         self._handle_monthly_investment(month, current_date)
 
         # monatliche Kosten auf Depotwert
-        depotwert_brutto = sum(e["value"] for e in self.portfolio)
-        self._monatliche_kosten_abziehen(current_date, depotwert_brutto, month)
+        depotwert_brutto = self._depotwert()
+        kostenfaktor = self._kosten_schritt(current_date, depotwert_brutto, month)
 
-        # monatliche Rendite auf den Depotwert
-        for entry in self.portfolio:
-            entry["value"] *= (1 + self.monthly_return)
+        # monatliche Rendite auf den Depotwert, zusammen mit dem Kostenabzug in einem Durchlauf über die Posten
+        # (bewusst zusammengefasst: beide Faktoren gelten für alle Posten gleich, so wird pf_value nur einmal gelesen/geschrieben)
+        self.pf_value[:self.pf_n] *= self.wachstumsfaktor * kostenfaktor
 
         # aktualisiert Inflationsfaktor
-        self.kumulierte_inflation_factor *= (1 + self.monthly_inflation_rates[month])
+        self.inv_inflation_aktuell = self.inv_inflation[month + 1]
 
         # führte Steuerberechnung aus
-        self._handle_taxes(current_date)
+        if self._mit_vorabpauschale and is_january:
+            self._handle_taxes(current_date)
 
         # führt Umschichtung aus
-        self._handle_rebalancing(current_date)
+        if self._mit_rebalancing and self.month_of[month] == 12:
+            self._handle_rebalancing(current_date)
 
         # führt Entnahmen aus
         self._handle_withdrawals(month, current_date)
 
-        depotwert = sum(e["value"] for e in self.portfolio)
-        depotwert_real = depotwert / self.kumulierte_inflation_factor
+        depotwert = self._depotwert()
+        depotwert_real = depotwert * self.inv_inflation_aktuell
 
         # Loggt monatliche Kosten und Depotwerte
-        self.monatliche_kosten_logs.append({
-            "Datum": current_date,
-            "Depotwert": depotwert,
-            "Depotwert real": depotwert_real,
-            "Ausgabeaufschlag kum": self.ausgabeaufschlag_summe,
-            "Ausgabeaufschlag kum real": self.ausgabeaufschlag_real_summe,
-            "Rücknahmeabschlag kum": self.ruecknahmeabschlag_summe,
-            "Rücknahmeabschlag kum real": self.ruecknahmeabschlag_real_summe,
-            "Stückkosten kum": self.stueckkosten_summe,
-            "Stückkosten kum real": self.stueckkosten_real_summe,
-            "Gesamtfondkosten kum": self.ter_summe,
-            "Gesamtfondkosten kum real": self.ter_real_summe,
-            "Serviceentgelt kum": self.serviceentgelt_summe,
-            "Serviceentgelt kum real": self.serviceentgelt_real_summe,
-            "Guthabenkosten kum": self.guthabenkosten_summe,
-            "Guthabenkosten kum real": self.guthabenkosten_real_summe,
-            "Abschlusskosten kum": self.abschlusskosten_summe,
-            "Abschlusskosten kum real": self.abschlusskosten_real_summe,
-            "Verwaltungskosten kum": self.verwaltungskosten_summe,
-            "Verwaltungskosten kum real": self.verwaltungskosten_real_summe,
-            "Steuern kumuliert": self.total_tax_paid,
-            "Steuern kumuliert real": self.total_tax_paid_real,
-            "Steuern aus Entnahme": self.total_withdrawal_tax_paid,
-            "Steuern aus Entnahme real": self.total_withdrawal_tax_paid_real,
-            "Kumulierte Entnahmen": self.kumulierte_entnahmen,
-            "Kumulierte Entnahmen real": self.kumulierte_entnahmen_real
-        })
-
-        if current_date.month == 12:  # speichert Wert zum Jahresende für Vorabpauschalenberechnung im Folgejahr
-            for entry in self.portfolio:
-                entry["start_of_prev_year_value"] = entry["value"]
+        self._log_schreiben(month, depotwert, depotwert_real)
+
+        if self.month_of[month] == 12:  # speichert Wert zum Jahresende für Vorabpauschalenberechnung im Folgejahr
+            self.pf_startprev[:self.pf_n] = self.pf_value[:self.pf_n]
 
     def _handle_death(self, current_date): #Simuliert Todesfall im Versicherungsfall, Portfolio wird steuerfrei ausgezahlt und neu investiert
         if not self.params.versicherung_modus or self.death_triggered:
             return
         self.death_triggered = True
-        depotwert_brutto = sum(e["value"] for e in self.portfolio)
+        depotwert_brutto = self._depotwert()
         print(f"Todesfall simuliert in Jahr {self.params.death_year}. Depotwert (Brutto): {depotwert_brutto:,.2f} €")
-        ruecknahmeabschlag = getattr(self.params, "ruecknahmeabschlag", 0.0)
+        ruecknahmeabschlag = self._ruecknahmeabschlag
         ruecknahmeabschlag_val = depotwert_brutto * ruecknahmeabschlag
         total_netto_entnahme = depotwert_brutto - ruecknahmeabschlag_val
         #altes Portfolio wird komplett geleert
-        self.portfolio.clear()
+        self.pf_n = 0
 
         #Netto Betrag wird als neuer Posten wieder hinzufegüt
         if total_netto_entnahme > 0:
-            self.portfolio.append({
-                "date": current_date,
-                "amount_invested": total_netto_entnahme,
-                "value": total_netto_entnahme,
-                "start_of_prev_year_value": total_netto_entnahme,
-                "vorabpauschalen_bereits_versteuert": 0.0
-            })
+            self._posten_hinzufuegen(current_date, total_netto_entnahme)
         print(f"Kapital nach Auszahlung und Re-Investment: {total_netto_entnahme:,.2f} €")
 
     def _handle_monthly_investment(self, month, current_date): #monatliche und einalige Einzahlungen
-        #Dynamik
-        if month > 0 and month % self.params.dynamik_turnus_monate == 0:
-            self.monthly_investment *= (1 + self.params.monthly_dynamik_rate)
-
-        #Sonderzahlungen einmalig oder regelmässig
-        is_einmalig = month == self.params.sonderzahlung_jahr * 12
-        is_regelmaessig = (self.params.regel_sonderzahlung_turnus_jahre > 0 and month > 0 and month % (
-                self.params.regel_sonderzahlung_turnus_jahre * 12) == 0)
-        if is_einmalig or is_regelmaessig:
-            betrag = (self.params.sonderzahlung_betrag if is_einmalig else self.params.regel_sonderzahlung_betrag)
-            if betrag > 0:
-                self.cashflows.append(-betrag)
-                self.real_cashflows.append(-betrag / self.kumulierte_inflation_factor)
-                self.cashflow_dates.append(current_date)
-                ausgabeaufschlag = getattr(self.params, "ausgabeaufschlag", 0.0)
-                aufschlag = betrag * ausgabeaufschlag
-                netto = betrag - aufschlag
-                self.ausgabeaufschlag_summe += aufschlag
-                self.ausgabeaufschlag_real_summe += aufschlag / self.kumulierte_inflation_factor
-                self.portfolio.append(
-                    {"date": current_date, "amount_invested": netto, "value": netto, "start_of_prev_year_value": netto,
-                     "vorabpauschalen_bereits_versteuert": 0.0})
+        #Sonderzahlungen einmalig oder regelmässig, Beträge aus vorberechnetem Zahlungsplan
+        betrag = self.sonderzahlung_plan[month]
+        if betrag > 0:
+            self._cashflow_buchen(-betrag, month)
+            ausgabeaufschlag = self._ausgabeaufschlag
+            aufschlag = betrag * ausgabeaufschlag
+            netto = betrag - aufschlag
+            self.ausgabeaufschlag_summe += aufschlag
+            self.ausgabeaufschlag_real_summe += aufschlag * self.inv_inflation_aktuell
+            self._posten_hinzufuegen(current_date, netto)
 
         #reguläre monatliche Einazhlungen
-        if month < self.params.beitragszahldauer * 12:
-            monthly_ausgabeaufschlag = getattr(self.params, "monthly_ausgabeaufschlag", 0.0)
-            aufschlag = self.monthly_investment * monthly_ausgabeaufschlag
-            netto = self.monthly_investment - aufschlag
+        if month < self._beitragsmonate:
+            monthly_investment = self.monatsbeitraege[month]
+            monthly_ausgabeaufschlag = self._monthly_ausgabeaufschlag
+            aufschlag = monthly_investment * monthly_ausgabeaufschlag
+            netto = monthly_investment - aufschlag
             self.ausgabeaufschlag_summe += aufschlag
-            self.ausgabeaufschlag_real_summe += aufschlag / self.kumulierte_inflation_factor
-            self.cashflows.append(-self.monthly_investment)
-            self.real_cashflows.append(-self.monthly_investment / self.kumulierte_inflation_factor)
-            self.cashflow_dates.append(current_date)
-            self.portfolio.append(
-                {"date": current_date, "amount_invested": netto, "value": netto, "start_of_prev_year_value": netto,
-                 "vorabpauschalen_bereits_versteuert": 0.0})
-
-    def _monatliche_kosten_abziehen(self, current_date, depotwert_brutto,
-                                    month):  # berechnet monatliche Kosten und zieht die vom Depot ab
+            self.ausgabeaufschlag_real_summe += aufschlag * self.inv_inflation_aktuell
+            self._cashflow_buchen(-monthly_investment, month)
+            self._posten_hinzufuegen(current_date, netto)
 
+    def _monatliche_kosten_versicherung(self, current_date, depotwert_brutto, month):  # berechnet monatliche Kosten der Versicherung, gibt Faktor für den anteiligen Abzug je Posten zurück
         if depotwert_brutto <= 1e-9:
-            return 0.0
+            return 1.0
 
-        ter_kosten = depotwert_brutto * self.params.ter / 12
+        inv = self.inv_inflation_aktuell
+        ter_kosten = depotwert_brutto * self._ter / 12
         self.ter_summe += ter_kosten
-        self.ter_real_summe += ter_kosten / self.kumulierte_inflation_factor
+        self.ter_real_summe += ter_kosten * inv
+
+        abschlusskosten_monatlich = 0
+        if self.verrechnungs_monate_verbleibend > 0:
+            abschlusskosten_monatlich = self.monatliche_abschlusskosten_fix
+            self.verrechnungs_monate_verbleibend -= 1
+
+        verwaltungskosten_monatlich = 0.0
+        if month < self._beitragsmonate:
+            verwaltungskosten_monatlich = self.monatsbeitraege[month] * self._verwaltungskosten_monatlich_prozent
+
+        guthabenkosten_monatlich = depotwert_brutto * self._guthabenkosten / 12
+        serviceentgelt_monatlich = depotwert_brutto * self._serviceentgelt / 12
+        self.abschlusskosten_summe += abschlusskosten_monatlich
+        self.verwaltungskosten_summe += verwaltungskosten_monatlich
+        self.guthabenkosten_summe += guthabenkosten_monatlich
+        self.serviceentgelt_summe += serviceentgelt_monatlich
+        self.abschlusskosten_real_summe += abschlusskosten_monatlich * inv
+        self.verwaltungskosten_real_summe += verwaltungskosten_monatlich * inv
+        self.guthabenkosten_real_summe += guthabenkosten_monatlich * inv
+        self.serviceentgelt_real_summe += serviceentgelt_monatlich * inv
+        gesamtkosten_monatlich = (
+                ter_kosten + abschlusskosten_monatlich + verwaltungskosten_monatlich + guthabenkosten_monatlich + serviceentgelt_monatlich
+        )
 
-        monatlicher_index = month + 1
+        # Kosten werden anteilig von jedem Posten im portfolio abgezogen (Anwendung zusammen mit der Rendite)
+        return 1 - gesamtkosten_monatlich / depotwert_brutto
 
-        # Kosten Versicherung
-        if self.params.versicherung_modus:
-            abschlusskosten_monatlich = 0
-            if self.verrechnungs_monate_verbleibend > 0:
-                abschlusskosten_monatlich = self.monatliche_abschlusskosten_fix
-                self.verrechnungs_monate_verbleibend -= 1
-
-            verwaltungskosten_monatlich = 0.0
-            if monatlicher_index <= self.params.beitragszahldauer * 12:
-                verwaltungskosten_monatlich = self.monthly_investment * self.params.verwaltungskosten_monatlich_prozent
-
-            guthabenkosten_monatlich = depotwert_brutto * self.params.guthabenkosten / 12
-            serviceentgelt_monatlich = depotwert_brutto * self.params.serviceentgelt / 12
-            self.abschlusskosten_summe += abschlusskosten_monatlich
-            self.verwaltungskosten_summe += verwaltungskosten_monatlich
-            self.guthabenkosten_summe += guthabenkosten_monatlich
-            self.serviceentgelt_summe += serviceentgelt_monatlich
-            self.abschlusskosten_real_summe += abschlusskosten_monatlich / self.kumulierte_inflation_factor
-            self.verwaltungskosten_real_summe += verwaltungskosten_monatlich / self.kumulierte_inflation_factor
-            self.guthabenkosten_real_summe += guthabenkosten_monatlich / self.kumulierte_inflation_factor
-            self.serviceentgelt_real_summe += serviceentgelt_monatlich / self.kumulierte_inflation_factor
-            gesamtkosten_monatlich = (
-                    ter_kosten + abschlusskosten_monatlich + verwaltungskosten_monatlich + guthabenkosten_monatlich + serviceentgelt_monatlich
-            )
-        # Kosten Depot
-        else:
-            ausgabeaufschlag_monatlich = 0.0
-            # Kosten fallen nur an, wenn noch Beiträge gezahlt werden
-            if monatlicher_index <= self.params.beitragszahldauer * 12:
-                ausgabeaufschlag_monatlich = self.params.monthly_investment * getattr(self.params,
-                                                                                      "monthly_ausgabeaufschlag", 0.0)
-
-            stueckkosten_monatlich = getattr(self.params, "stueckkosten", 0.0) / 12
-            serviceentgelt_monatlich = depotwert_brutto * self.params.serviceentgelt / 12
-            self.ausgabeaufschlag_summe += ausgabeaufschlag_monatlich
-            self.stueckkosten_summe += stueckkosten_monatlich
-            self.serviceentgelt_summe += serviceentgelt_monatlich
-            self.ausgabeaufschlag_real_summe += ausgabeaufschlag_monatlich / self.kumulierte_inflation_factor
-            self.stueckkosten_real_summe += stueckkosten_monatlich / self.kumulierte_inflation_factor
-            self.serviceentgelt_real_summe += serviceentgelt_monatlich / self.kumulierte_inflation_factor
-            gesamtkosten_monatlich = (
-                    ter_kosten + ausgabeaufschlag_monatlich + stueckkosten_monatlich + serviceentgelt_monatlich
-            )
-
-        # Kosten werden von jedem Posten im portfolio abgezogen
-        if depotwert_brutto > 1e-9:
-            anteil_kosten = gesamtkosten_monatlich / depotwert_brutto
-            for entry in self.portfolio:
-                entry["value"] -= entry["value"] * anteil_kosten
-        else:
-            gesamtkosten_monatlich = 0.0
-        return depotwert_brutto - gesamtkosten_monatlich
+    def _monatliche_kosten_depot(self, current_date, depotwert_brutto, month):  # berechnet monatliche Kosten des Depots, gibt Faktor für den anteiligen Abzug je Posten zurück
+        if depotwert_brutto <= 1e-9:
+            return 1.0
+
+        inv = self.inv_inflation_aktuell
+        ter_kosten = depotwert_brutto * self._ter / 12
+        self.ter_summe += ter_kosten
+        self.ter_real_summe += ter_kosten * inv
+
+        ausgabeaufschlag_monatlich = 0.0
+        # Kosten fallen nur an, wenn noch Beiträge gezahlt werden
+        if month < self._beitragsmonate:
+            ausgabeaufschlag_monatlich = self.params.monthly_investment * self._monthly_ausgabeaufschlag
+
+        stueckkosten_monatlich = self._stueckkosten / 12
+        serviceentgelt_monatlich = depotwert_brutto * self._serviceentgelt / 12
+        self.ausgabeaufschlag_summe += ausgabeaufschlag_monatlich
+        self.stueckkosten_summe += stueckkosten_monatlich
+        self.serviceentgelt_summe += serviceentgelt_monatlich
+        self.ausgabeaufschlag_real_summe += ausgabeaufschlag_monatlich * inv
+        self.stueckkosten_real_summe += stueckkosten_monatlich * inv
+        self.serviceentgelt_real_summe += serviceentgelt_monatlich * inv
+        gesamtkosten_monatlich = (
+                ter_kosten + ausgabeaufschlag_monatlich + stueckkosten_monatlich + serviceentgelt_monatlich
+        )
+
+        # Kosten werden anteilig von jedem Posten im portfolio abgezogen (Anwendung zusammen mit der Rendite)
+        return 1 - gesamtkosten_monatlich / depotwert_brutto
 
     def _finalisiere_simulation(self):  # Berechnung am Ende der Laufzeit für Besteuerung
-        depotwert_final = sum(e["value"] for e in self.portfolio)
-        depotwert_final_real = depotwert_final / self.kumulierte_inflation_factor
+        depotwert_final = self._depotwert()
+        depotwert_final_real = depotwert_final * self.inv_inflation_aktuell
         restwert = depotwert_final
-        investiert = sum(e["amount_invested"] for e in self.portfolio)
+        investiert = float(self.pf_invested[:self.pf_n].sum())
         gewinn = max(0.0, restwert - investiert)
         steuer = 0
         ruecknahmeabschlag_val = 0.0
@@ -401,149 +526,116 @@ class SparplanSimulator:
                 aktuelle_laufzeit = self.params.laufzeit
                 aktuelle_alter = self.params.eintrittsalter + aktuelle_laufzeit
                 if aktuelle_alter >= 62 and aktuelle_laufzeit >= 12:
-                    steuer = gewinn * 0.5 * self.params.persoenlicher_steuersatz
+                    steuer = gewinn * 0.5 * self._persoenlicher_steuersatz
                 else:
-                    steuer = gewinn * 0.85 * self.params.persoenlicher_steuersatz
+                    steuer = gewinn * 0.85 * self._persoenlicher_steuersatz
             # Besteuerung Depot mit Teilfreistellung/Freistellungsauftrag
             else:
-                teilfreistellung = getattr(self.params, "teilfreistellung", 0.0)
+                teilfreistellung = self._teilfreistellung
                 steuerbar = gewinn * (1 - teilfreistellung)
-                bereits_versteuert = sum(e.get("vorabpauschalen_bereits_versteuert", 0.0) for e in self.portfolio)
+                bereits_versteuert = float(self.pf_vap[:self.pf_n].sum())
                 steuerbar = max(0.0, steuerbar - bereits_versteuert)
                 steuerfreibetrag_used = min(self.freistellungs_topf, steuerbar)
                 self.freistellungs_topf -= steuerfreibetrag_used
                 zu_versteuern = max(0, steuerbar - steuerfreibetrag_used)
                 steuer = zu_versteuern * self.full_tax_rate
             self.total_tax_paid += steuer
-            self.total_tax_paid_real += steuer / self.kumulierte_inflation_factor
+            self.total_tax_paid_real += steuer * self.inv_inflation_aktuell
             self.total_withdrawal_tax_paid += steuer
-            self.total_withdrawal_tax_paid_real += steuer / self.kumulierte_inflation_factor
+            self.total_withdrawal_tax_paid_real += steuer * self.inv_inflation_aktuell
         if not self.params.versicherung_modus:
-            ruecknahmeabschlag = getattr(self.params, "ruecknahmeabschlag", 0.0)
+            ruecknahmeabschlag = self._ruecknahmeabschlag
             ruecknahmeabschlag_val = restwert * ruecknahmeabschlag
             self.ruecknahmeabschlag_summe += ruecknahmeabschlag_val
-            self.ruecknahmeabschlag_real_summe += ruecknahmeabschlag_val / self.kumulierte_inflation_factor
+            self.ruecknahmeabschlag_real_summe += ruecknahmeabschlag_val * self.inv_inflation_aktuell
         restwert_net = restwert - steuer - ruecknahmeabschlag_val
 
         # Finaler Auszahlungsbetrag zu Cashflow für Renditeberechnung
-        self.cashflows.append(restwert_net)
-        self.real_cashflows.append(restwert_net / self.kumulierte_inflation_factor)
-        self.cashflow_dates.append(self.start_date + relativedelta(months=self.params.laufzeit * 12))
+        self._cashflow_buchen(restwert_net, self.params.laufzeit * 12)
         self.kumulierte_entnahmen += restwert_net
-        self.kumulierte_entnahmen_real += restwert_net / self.kumulierte_inflation_factor
+        self.kumulierte_entnahmen_real += restwert_net * self.inv_inflation_aktuell
 
         # Letzter Log Eintrag für finalen Zustand
-        self.monatliche_kosten_logs.append({
-            "Datum": self.start_date + relativedelta(months=self.params.laufzeit * 12),
-            "Depotwert": restwert_net,  # *** HIER WURDE DIE KORREKTUR EINGEFÜHRT ***
-            "Depotwert real": restwert_net / self.kumulierte_inflation_factor,
-            # *** HIER WURDE DIE KORREKTUR EINGEFÜHRT ***
-            "Ausgabeaufschlag kum": self.ausgabeaufschlag_summe,
-            "Ausgabeaufschlag kum real": self.ausgabeaufschlag_real_summe,
-            "Rücknahmeabschlag kum": self.ruecknahmeabschlag_summe,
-            "Rücknahmeabschlag kum real": self.ruecknahmeabschlag_real_summe,
-            "Stückkosten kum": self.stueckkosten_summe,
-            "Stückkosten kum real": self.stueckkosten_real_summe,
-            "Gesamtfondkosten kum": self.ter_summe,
-            "Gesamtfondkosten kum real": self.ter_real_summe,
-            "Serviceentgelt kum": self.serviceentgelt_summe,
-            "Serviceentgelt kum real": self.serviceentgelt_real_summe,
-            "Guthabenkosten kum": self.guthabenkosten_summe,
-            "Guthabenkosten kum real": self.guthabenkosten_real_summe,
-            "Abschlusskosten kum": self.abschlusskosten_summe,
-            "Abschlusskosten kum real": self.abschlusskosten_real_summe,
-            "Verwaltungskosten kum": self.verwaltungskosten_summe,
-            "Verwaltungskosten kum real": self.verwaltungskosten_real_summe,
-            "Steuern kumuliert": self.total_tax_paid,
-            "Steuern kumuliert real": self.total_tax_paid_real,
-            "Steuern aus Entnahme": self.total_withdrawal_tax_paid,
-            "Steuern aus Entnahme real": self.total_withdrawal_tax_paid_real,
-            "Kumulierte Entnahmen": self.kumulierte_entnahmen,
-            "Kumulierte Entnahmen real": self.kumulierte_entnahmen_real
-        })
+        self._log_schreiben(self.params.laufzeit * 12, restwert_net, restwert_net * self.inv_inflation_aktuell)
+
+    def _log_schreiben(self, index, depotwert, depotwert_real): #schreibt eine Zeile in die vorab angelegten Log-Arrays, Datum steht in self.dates
+        self.log_werte[index] = (
+            depotwert, depotwert_real,
+            self.ausgabeaufschlag_summe, self.ausgabeaufschlag_real_summe,
+            self.ruecknahmeabschlag_summe, self.ruecknahmeabschlag_real_summe,
+            self.stueckkosten_summe, self.stueckkosten_real_summe,
+            self.ter_summe, self.ter_real_summe,
+            self.serviceentgelt_summe, self.serviceentgelt_real_summe,
+            self.guthabenkosten_summe, self.guthabenkosten_real_summe,
+            self.abschlusskosten_summe, self.abschlusskosten_real_summe,
+            self.verwaltungskosten_summe, self.verwaltungskosten_real_summe,
+            self.total_tax_paid, self.total_tax_paid_real,
+            self.total_withdrawal_tax_paid, self.total_withdrawal_tax_paid_real,
+            self.kumulierte_entnahmen, self.kumulierte_entnahmen_real
+        )
 
     def _handle_taxes(self, current_date): #Vorabpauschale für Depot
         is_january = current_date.month == 1
-        teilfreistellung = getattr(self.params, "teilfreistellung", 0.0)
-        basiszins = getattr(self.params, "basiszins", 0.0)
+        teilfreistellung = self._teilfreistellung
+        basiszins = self._basiszins
         if not self.params.versicherung_modus and is_january:
-            for entry in self.portfolio:
-                start_value = entry.get("start_of_prev_year_value", 0.0)
-                fiktiver_ertrag = start_value * basiszins
-                real_ertrag = entry["value"] - start_value
-                steuerbarer_ertrag = min(fiktiver_ertrag, real_ertrag)
-                zu_versteuern_temp = steuerbarer_ertrag * (1 - teilfreistellung)
-                #Freistellungsauftrag, falls noch was vorhanden
-                steuerfreibetrag_used = min(self.freistellungs_topf, max(0, zu_versteuern_temp))
-                self.freistellungs_topf -= steuerfreibetrag_used
-                zu_versteuern = max(0, zu_versteuern_temp - steuerfreibetrag_used)
-                steuer = zu_versteuern * self.full_tax_rate
-
-                if steuer > 0:
-                    entry["value"] -= steuer
-                    self.total_tax_paid += steuer
-                    self.total_tax_paid_real += steuer / self.kumulierte_inflation_factor
-                    #bereits versteuerte Vorabpauschale wird gespeichert, um bei späteren Verkauf nicht doppelt zu versteuern
-                    entry["vorabpauschalen_bereits_versteuert"] += zu_versteuern
+            n = self.pf_n
+            if n == 0:
+                return
+            start_value = self.pf_startprev[:n]
+            fiktiver_ertrag = start_value * basiszins
+            real_ertrag = self.pf_value[:n] - start_value
+            zu_versteuern_temp = np.maximum(np.minimum(fiktiver_ertrag, real_ertrag) * (1 - teilfreistellung), 0.0)
+            #Freistellungsauftrag, falls noch was vorhanden
+            steuerfreibetrag_used = self._freibetrag_verbrauchen(zu_versteuern_temp)
+            zu_versteuern = np.maximum(zu_versteuern_temp - steuerfreibetrag_used, 0.0)
+            steuer = zu_versteuern * self.full_tax_rate
+            steuer_summe = float(steuer.sum())
+
+            if steuer_summe > 0:
+                self.pf_value[:n] -= steuer
+                self.total_tax_paid += steuer_summe
+                self.total_tax_paid_real += steuer_summe * self.inv_inflation_aktuell
+                #bereits versteuerte Vorabpauschale wird gespeichert, um bei späteren Verkauf nicht doppelt zu versteuern
+                self.pf_vap[:n] += zu_versteuern
 
     def _handle_rebalancing(self, current_date): #Rebalancing am Jahresende
-        rebalancing_rate = getattr(self.params, "rebalancing_rate", 0.0)
-        ruecknahmeabschlag = getattr(self.params, "ruecknahmeabschlag", 0.0)
-        teilfreistellung = getattr(self.params, "teilfreistellung", 0.0)
+        rebalancing_rate = self._rebalancing_rate
+        ruecknahmeabschlag = self._ruecknahmeabschlag
+        teilfreistellung = self._teilfreistellung
         if not self.params.versicherung_modus and current_date.month == 12 and rebalancing_rate > 0:
-            depotwert = sum(e["value"] for e in self.portfolio)
+            depotwert = self._depotwert()
             umzuschichten = depotwert * rebalancing_rate
             if umzuschichten > 0:
-                remaining = umzuschichten
-                temp_queue = deque()
-                total_verkauf = 0.0
-                total_steuer = 0.0
-                total_netto = 0.0
-
                 #Verkauft älteste Posten zuerst nach FIFO
-                while remaining > 1e-9 and self.portfolio:
-                    entry = self.portfolio.popleft()
-                    if entry["value"] <= 0:
-                        continue
-
-                    sell_value = min(entry["value"], remaining)
-                    prop = sell_value / entry["value"]
-                    cost_basis = entry["amount_invested"] * prop
-                    gain = sell_value - cost_basis
-
-                    #Steuer auf Gewinn bei Umschichtung
-                    steuerbarer_gewinn = gain * (1 - teilfreistellung)
-                    vorab_used = min(entry.get("vorabpauschalen_bereits_versteuert", 0.0) * prop, steuerbarer_gewinn)
-                    steuerbarer_gewinn_nach_vp = max(0.0, steuerbarer_gewinn - vorab_used)
-                    steuerfreibetrag = min(self.freistellungs_topf, steuerbarer_gewinn_nach_vp)
-                    self.freistellungs_topf -= steuerfreibetrag
-                    zu_versteuern = max(0.0, steuerbarer_gewinn_nach_vp - steuerfreibetrag)
-                    steuer = zu_versteuern * self.full_tax_rate
-                    ruecknahmeabschlag_val = sell_value * ruecknahmeabschlag
-                    netto_reinvest = sell_value - steuer - ruecknahmeabschlag_val
-                    self.total_tax_paid += steuer
-                    self.total_tax_paid_real += steuer / self.kumulierte_inflation_factor
-                    self.ruecknahmeabschlag_summe += ruecknahmeabschlag_val
-                    self.ruecknahmeabschlag_real_summe += ruecknahmeabschlag_val / self.kumulierte_inflation_factor
-                    total_verkauf += sell_value
-                    total_steuer += steuer
-                    total_netto += netto_reinvest
-
-                    #Depotwert wird um Umschichtung reduziert
-                    entry["value"] -= sell_value
-                    entry["amount_invested"] -= cost_basis
-                    entry["vorabpauschalen_bereits_versteuert"] = max(0.0,
-                                                                      entry.get("vorabpauschalen_bereits_versteuert",
-                                                                                0.0) - vorab_used)
-                    if entry["value"] > 1e-9:
-                        temp_queue.append(entry)
-                    remaining -= sell_value
-                self.portfolio = deque(list(temp_queue) + list(self.portfolio))
+                m, sell_value, prop = self._fifo_verkaufsmengen(umzuschichten)
+                cost_basis = self.pf_invested[:m] * prop
+                gain = sell_value - cost_basis
+
+                #Steuer auf Gewinn bei Umschichtung
+                steuerbarer_gewinn = gain * (1 - teilfreistellung)
+                vorab_used = np.minimum(self.pf_vap[:m] * prop, steuerbarer_gewinn)
+                steuerbarer_gewinn_nach_vp = np.maximum(steuerbarer_gewinn - vorab_used, 0.0)
+                steuerfreibetrag = self._freibetrag_verbrauchen(steuerbarer_gewinn_nach_vp)
+                zu_versteuern = np.maximum(steuerbarer_gewinn_nach_vp - steuerfreibetrag, 0.0)
+                steuer = zu_versteuern * self.full_tax_rate
+                total_verkauf = float(sell_value.sum())
+                total_steuer = float(steuer.sum())
+                ruecknahmeabschlag_val = total_verkauf * ruecknahmeabschlag
+                total_netto = total_verkauf - total_steuer - ruecknahmeabschlag_val
+                self.total_tax_paid += total_steuer
+                self.total_tax_paid_real += total_steuer * self.inv_inflation_aktuell
+                self.ruecknahmeabschlag_summe += ruecknahmeabschlag_val
+                self.ruecknahmeabschlag_real_summe += ruecknahmeabschlag_val * self.inv_inflation_aktuell
+
+                #Depotwert wird um Umschichtung reduziert
+                self.pf_value[:m] -= sell_value
+                self.pf_invested[:m] -= cost_basis
+                self.pf_vap[:m] = np.maximum(self.pf_vap[:m] - vorab_used, 0.0)
+                self._portfolio_verdichten(m)
                 #Nettobetrag wird als neuer Posten im Portfolio angelegt
                 if total_netto > 1e-9:
-                    self.portfolio.append({"date": current_date, "amount_invested": total_netto, "value": total_netto,
-                                           "start_of_prev_year_value": total_netto,
-                                           "vorabpauschalen_bereits_versteuert": 0.0})
+                    self._posten_hinzufuegen(current_date, total_netto)
                 #Loggt Rebalancing für Überprüfung ob Vorabpauschale / FIFO korrekt
                 self.rebalancing_log.append(
                     {"Datum": current_date, "Bruttoverkauf": total_verkauf, "Steuer": total_steuer,
@@ -551,16 +643,15 @@ class SparplanSimulator:
 
     def _handle_withdrawals(self, month, current_date): #monatliche oder Jährliche Entnahmen
         #Entnahmen beginnen nach Beitragszahldauer
-        if month < self.params.beitragszahldauer * 12:
+        if month < self._beitragsmonate:
             return
-        depotwert = sum(e["value"] for e in self.portfolio)
+        depotwert = self._depotwert()
         entnahmebetrag_jahr = 0
 
         #bestimmt Entnahmebetrag aus Entnahmeplan
         withdrawal_year = (current_date.year - self.start_date.year) - self.params.beitragszahldauer + 1
         if self.params.entnahme_plan:
-            sorted_years = sorted(self.params.entnahme_plan.keys(), reverse=True)
-            for plan_year in sorted_years:
+            for plan_year in self._entnahme_plan_jahre:
                 if withdrawal_year >= plan_year:
                     entnahmebetrag_jahr = self.params.entnahme_plan[plan_year]
                     break
@@ -575,69 +666,82 @@ class SparplanSimulator:
         entnahmebetrag_effektiv = min(entnahmebetrag, depotwert)
         if entnahmebetrag_effektiv <= 0:
             return
-        remaining_to_withdraw = entnahmebetrag_effektiv
-        netto_entnahme_summe = 0
-        total_withdrawal_tax_this_year = 0
-        temp_queue = deque()
+        teilfreistellung = self._teilfreistellung
+        ruecknahmeabschlag = self._ruecknahmeabschlag
 
         #Verkauft älteste Tranchen nach FIFO zuerst für Entnahme
-        while remaining_to_withdraw > 1e-9 and self.portfolio:
-            oldest_entry = self.portfolio.popleft()
-            if oldest_entry["value"] <= 0: continue
-            sell_value = min(oldest_entry["value"], remaining_to_withdraw)
-            anteil = sell_value / oldest_entry["value"]
-            gewinn_anteil = (oldest_entry["value"] - oldest_entry["amount_invested"]) * anteil
-            investiert_anteil = oldest_entry["amount_invested"] * anteil
-            steuer = 0
-            if self.params.versicherung_modus: #Besteuerung bei Entnahme Versicherung
-                aktuelle_laufzeit = (current_date - oldest_entry["date"]).days / 365.25
-                aktuelle_alter = self.params.eintrittsalter + (current_date - self.start_date).days / 365.25
-                if aktuelle_alter >= 62 and aktuelle_laufzeit >= 12:
-                    steuer = gewinn_anteil * 0.5 * self.params.persoenlicher_steuersatz
-                else:
-                    steuer = gewinn_anteil * 0.85 * self.params.persoenlicher_steuersatz
-            else: #Besteuerung bei Entnahme Depot
-                vorabpauschalen_anteil = oldest_entry["vorabpauschalen_bereits_versteuert"] * anteil
-                teilfreistellung = getattr(self.params, "teilfreistellung", 0.0)
-                steuerbarer_gewinn = gewinn_anteil * (1 - teilfreistellung)
-                steuerbarer_gewinn_nach_vp = max(0.0, steuerbarer_gewinn - vorabpauschalen_anteil)
-                steuerfreibetrag_used = min(self.freistellungs_topf, steuerbarer_gewinn_nach_vp)
-                self.freistellungs_topf -= steuerfreibetrag_used
-                zu_versteuern = max(0, steuerbarer_gewinn_nach_vp - steuerfreibetrag_used)
-                steuer = zu_versteuern * self.full_tax_rate
-                oldest_entry["vorabpauschalen_bereits_versteuert"] -= vorabpauschalen_anteil
-            ruecknahmeabschlag = getattr(self.params, "ruecknahmeabschlag", 0.0)
-            ruecknahmeabschlag_val = sell_value * ruecknahmeabschlag
-            netto_entnahme = sell_value - steuer - ruecknahmeabschlag_val
-            netto_entnahme_summe += netto_entnahme
-            total_withdrawal_tax_this_year += steuer
-            oldest_entry["value"] -= sell_value
-            oldest_entry["amount_invested"] -= investiert_anteil
-            if oldest_entry["value"] > 1e-9:
-                temp_queue.append(oldest_entry)
-            remaining_to_withdraw -= sell_value
-        self.portfolio = deque(list(temp_queue) + list(self.portfolio))
+        m, sell_value, anteil = self._fifo_verkaufsmengen(entnahmebetrag_effektiv)
+        gewinn_anteil = (self.pf_value[:m] - self.pf_invested[:m]) * anteil
+        investiert_anteil = self.pf_invested[:m] * anteil
+        if self.params.versicherung_modus: #Besteuerung bei Entnahme Versicherung
+            aktuelle_alter = self.params.eintrittsalter + (current_date - self.start_date).days / 365.25
+            aktuelle_laufzeit = (current_date.toordinal() - self.pf_date_ord[:m]) / 365.25
+            ertragsanteil = np.where((aktuelle_alter >= 62) & (aktuelle_laufzeit >= 12), 0.5, 0.85)
+            steuer = gewinn_anteil * ertragsanteil * self._persoenlicher_steuersatz
+        else: #Besteuerung bei Entnahme Depot
+            vorabpauschalen_anteil = self.pf_vap[:m] * anteil
+            steuerbarer_gewinn = gewinn_anteil * (1 - teilfreistellung)
+            steuerbarer_gewinn_nach_vp = np.maximum(steuerbarer_gewinn - vorabpauschalen_anteil, 0.0)
+            steuerfreibetrag_used = self._freibetrag_verbrauchen(steuerbarer_gewinn_nach_vp)
+            zu_versteuern = np.maximum(steuerbarer_gewinn_nach_vp - steuerfreibetrag_used, 0.0)
+            steuer = zu_versteuern * self.full_tax_rate
+            self.pf_vap[:m] -= vorabpauschalen_anteil
+        verkauf_summe = float(sell_value.sum())
+        total_withdrawal_tax_this_year = float(steuer.sum())
+        netto_entnahme_summe = verkauf_summe - total_withdrawal_tax_this_year - verkauf_summe * ruecknahmeabschlag
+        self.pf_value[:m] -= sell_value
+        self.pf_invested[:m] -= investiert_anteil
+        self._portfolio_verdichten(m)
         self.total_tax_paid += total_withdrawal_tax_this_year
-        self.total_tax_paid_real += total_withdrawal_tax_this_year / self.kumulierte_inflation_factor
+        self.total_tax_paid_real += total_withdrawal_tax_this_year * self.inv_inflation_aktuell
         self.total_withdrawal_tax_paid += total_withdrawal_tax_this_year
-        self.total_withdrawal_tax_paid_real += total_withdrawal_tax_this_year / self.kumulierte_inflation_factor
+        self.total_withdrawal_tax_paid_real += total_withdrawal_tax_this_year * self.inv_inflation_aktuell
         self.ruecknahmeabschlag_summe += entnahmebetrag_effektiv * ruecknahmeabschlag
         self.ruecknahmeabschlag_real_summe += (
-                                                      entnahmebetrag_effektiv * ruecknahmeabschlag) / self.kumulierte_inflation_factor
+                                                      entnahmebetrag_effektiv * ruecknahmeabschlag) * self.inv_inflation_aktuell
         self.kumulierte_entnahmen += netto_entnahme_summe
-        self.kumulierte_entnahmen_real += netto_entnahme_summe / self.kumulierte_inflation_factor
+        self.kumulierte_entnahmen_real += netto_entnahme_summe * self.inv_inflation_aktuell
         #Nettoentnahme als Cashflow
-        self.cashflows.append(netto_entnahme_summe)
-        self.real_cashflows.append(netto_entnahme_summe / self.kumulierte_inflation_factor)
-        self.cashflow_dates.append(current_date)
+        self._cashflow_buchen(netto_entnahme_summe, month)
+
+
+# Mehrfachsimulation (z.B. Monte-Carlo über Renditen und Inflationspfade), Läufe sind unabhängig und laufen parallel
+
+def _simuliere_einzeln(args): #ein Lauf für simuliere_viele, gibt nur die benötigten Zeitreihen zurück
+    params, annual_return = args
+    df_kosten = SparplanSimulator(params, annual_return).run_simulation()[0]
+    return df_kosten["Depotwert"].to_numpy(), df_kosten["Kumulierte Entnahmen"].to_numpy()
+
+def simuliere_viele(params: Any, annual_returns, seeds=None, max_workers: Optional[int] = None) -> Dict[str, np.ndarray]: #führt M Simulationen in Prozessen aus, Ergebnis als (M, Monate+1)-Arrays
+    annual_returns = np.asarray(annual_returns, dtype=np.float64)
+    if seeds is None:
+        seeds = np.arange(len(annual_returns))
+    laeufe = [(dataclasses.replace(params, inflation_seed=int(seed)), float(rendite))
+              for rendite, seed in zip(annual_returns, seeds)]
+    anzahl_zeilen = params.laufzeit * 12 + 1
+    depotwerte = np.empty((len(laeufe), anzahl_zeilen))
+    entnahmen = np.empty((len(laeufe), anzahl_zeilen))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        #jeder Lauf schreibt in seine eigene Zeile
+        for i, (depotwert, entnahme) in enumerate(executor.map(_simuliere_einzeln, laeufe, chunksize=max(1, len(laeufe) // 64))):
+            depotwerte[i] = depotwert
+            entnahmen[i] = entnahme
+    return {"Depotwert": depotwerte, "Kumulierte Entnahmen": entnahmen}
 
 
 # Hilfsfunktionen für Analyse
 
-def berechne_xirr_und_print(cashflows, cashflow_dates, real_cashflows, label): #berechnet effektive jährliche Nettorendite XIRR für nominal und reale Cashflows
+def xirr_tagesabstaende(cashflow_dates) -> np.ndarray: #Tage seit erstem Cashflow als float, bei gleicher Laufzeit für alle Läufe wiederverwendbar
+    daten = np.asarray(cashflow_dates, dtype="datetime64[D]")
+    return (daten - daten[0]).astype(np.float64)
+
+def berechne_xirr_und_print(cashflows, cashflow_dates, real_cashflows, label, tage=None): #berechnet effektive jährliche Nettorendite XIRR für nominal und reale Cashflows
     try:
-        xirr_nominal = pyxirr.xirr(cashflow_dates, cashflows)
-        xirr_real = pyxirr.xirr(cashflow_dates, real_cashflows)
+        # Termine einmal in Tagesabstände umrechnen (oder vorberechnete übernehmen), nominal und real teilen sich die Termine
+        if tage is None:
+            tage = xirr_tagesabstaende(cashflow_dates)
+        xirr_nominal = pyxirr.xirr(tage, np.asarray(cashflows, dtype=float))
+        xirr_real = pyxirr.xirr(tage, np.asarray(real_cashflows, dtype=float))
         print(f"XIRR/effektive Jahresrendite nach Steuern und Kosten (nominal) für {label}: {xirr_nominal:,.2%}")
         print(f"XIRR/effektive Jahresrendite nach Steuern und Kosten (real) für {label}: {xirr_real:,.2%}")
         return xirr_nominal, xirr_real
@@ -645,40 +749,65 @@ def berechne_xirr_und_print(cashflows, cashflow_dates, real_cashflows, label): #
         print(f"Fehler bei der XIRR-Berechnung für {label}: {e}")
         return 0, 0
 
+def _spalten_summe(df: pd.DataFrame, spalten: List[str]) -> np.ndarray: #zeilenweise Summe mehrerer Spalten als eine NumPy-Reduktion ohne pandas-Zwischenobjekte
+    return np.add.reduce(df[spalten].to_numpy(), axis=1)
+
+def _log_jahre(df: pd.DataFrame) -> np.ndarray: #Jahr je Logzeile: vorhandene Spalte "Jahr", sonst aus dem Datum abgeleitet
+    if "Jahr" in df:
+        return df["Jahr"].to_numpy()
+    return pd.DatetimeIndex(df["Datum"]).year.to_numpy()
+
 def auswerten_kosten(df_monatlich: pd.DataFrame, params: Any, label: str) -> pd.DataFrame: #gruppiert monatliche Kosten nach Jahr und Kostenart
-    df_monatlich["Jahr"] = pd.to_datetime(df_monatlich["Datum"]).dt.year
-    df_jaehrlich = df_monatlich.groupby("Jahr").last().reset_index()
-    df_jaehrlich["Kosten_Kapitalanlage_nominal"] = df_jaehrlich["Gesamtfondkosten kum"]
-    df_jaehrlich["Kosten_Kapitalanlage_real"] = df_jaehrlich["Gesamtfondkosten kum real"]
+    #letzte Zeile je Jahr: Log ist monatlich sortiert, also jede Zeile vor einem Jahreswechsel plus die finale Zeile
+    jahre = _log_jahre(df_monatlich)
+    jahresende = np.diff(jahre, append=jahre[-1] + 1) != 0
+    df_jaehrlich = df_monatlich.loc[jahresende].drop(columns="Jahr", errors="ignore").reset_index(drop=True)
+    df_jaehrlich.insert(0, "Jahr", jahre[jahresende])
+    #abgeleitete Kostenspalten gesammelt aufbauen und in einem Schritt anhängen statt Spalte für Spalte einzufügen
     if params.versicherung_modus:
-        df_jaehrlich["Kosten_Depot_nominal"] = 0
-        df_jaehrlich["Kosten_Depot_real"] = 0
-        df_jaehrlich["Kosten_Versicherung_nominal"] = df_jaehrlich["Guthabenkosten kum"] + \
-                                                      df_jaehrlich["Verwaltungskosten kum"] + \
-                                                      df_jaehrlich["Abschlusskosten kum"]
-        df_jaehrlich["Kosten_Versicherung_real"] = df_jaehrlich["Guthabenkosten kum real"] + \
-                                                   df_jaehrlich["Verwaltungskosten kum real"] + \
-                                                   df_jaehrlich["Abschlusskosten kum real"]
+        kosten_depot_nominal, kosten_depot_real = 0, 0
+        kosten_versicherung_nominal = _spalten_summe(
+            df_jaehrlich, ["Guthabenkosten kum", "Verwaltungskosten kum", "Abschlusskosten kum"])
+        kosten_versicherung_real = _spalten_summe(
+            df_jaehrlich, ["Guthabenkosten kum real", "Verwaltungskosten kum real", "Abschlusskosten kum real"])
     else:
-        df_jaehrlich["Kosten_Depot_nominal"] = df_jaehrlich["Ausgabeaufschlag kum"] + \
-                                               df_jaehrlich["Rücknahmeabschlag kum"] + \
-                                               df_jaehrlich["Stückkosten kum"]
-        df_jaehrlich["Kosten_Depot_real"] = df_jaehrlich["Ausgabeaufschlag kum real"] + \
-                                            df_jaehrlich["Rücknahmeabschlag kum real"] + \
-                                            df_jaehrlich["Stückkosten kum real"]
-        df_jaehrlich["Kosten_Versicherung_nominal"] = 0
-        df_jaehrlich["Kosten_Versicherung_real"] = 0
-    df_jaehrlich["Kosten_Service_nominal"] = df_jaehrlich["Serviceentgelt kum"]
-    df_jaehrlich["Kosten_Service_real"] = df_jaehrlich["Serviceentgelt kum real"]
-    df_jaehrlich["Steuern_nominal"] = df_jaehrlich["Steuern kumuliert"]
-    df_jaehrlich["Steuern_real"] = df_jaehrlich["Steuern kumuliert real"]
+        kosten_depot_nominal = _spalten_summe(
+            df_jaehrlich, ["Ausgabeaufschlag kum", "Rücknahmeabschlag kum", "Stückkosten kum"])
+        kosten_depot_real = _spalten_summe(
+            df_jaehrlich, ["Ausgabeaufschlag kum real", "Rücknahmeabschlag kum real", "Stückkosten kum real"])
+        kosten_versicherung_nominal, kosten_versicherung_real = 0, 0
+    df_kostenarten = pd.DataFrame({
+        "Kosten_Kapitalanlage_nominal": df_jaehrlich["Gesamtfondkosten kum"].to_numpy(),
+        "Kosten_Kapitalanlage_real": df_jaehrlich["Gesamtfondkosten kum real"].to_numpy(),
+        "Kosten_Depot_nominal": kosten_depot_nominal,
+        "Kosten_Depot_real": kosten_depot_real,
+        "Kosten_Versicherung_nominal": kosten_versicherung_nominal,
+        "Kosten_Versicherung_real": kosten_versicherung_real,
+        "Kosten_Service_nominal": df_jaehrlich["Serviceentgelt kum"].to_numpy(),
+        "Kosten_Service_real": df_jaehrlich["Serviceentgelt kum real"].to_numpy(),
+        "Steuern_nominal": df_jaehrlich["Steuern kumuliert"].to_numpy(),
+        "Steuern_real": df_jaehrlich["Steuern kumuliert real"].to_numpy(),
+    }, index=df_jaehrlich.index)
+    df_jaehrlich = pd.concat([df_jaehrlich, df_kostenarten], axis=1)
     df_jaehrlich = df_jaehrlich.round(2)
     df_jaehrlich.to_csv(f"{label}_Kostenarten_Jahr.csv", index=False)
     print(f"Kostenaufschlüsselung für '{label}' in '{label}_Kostenarten_Jahr.csv' exportiert.")
     return df_jaehrlich
 
 
-def plotten_kosten(df_kosten_jaehrlich, params): #Diagramm für kumulierte Kosten pro Jahr
+def _plot_achse(ax=None): #liefert Zeichenachse: übergebene Achse wird geleert und wiederverwendet, sonst neue Figure
+    if ax is None:
+        return plt.subplots(figsize=(14, 8))[1], True
+    ax.clear()
+    return ax, False
+
+def _plot_speichern(ax, dateiname, eigene_figure): #speichert die Figure der Achse, schließt sie nur wenn sie nicht wiederverwendet wird
+    ax.figure.tight_layout()
+    ax.figure.savefig(dateiname)
+    if eigene_figure:
+        plt.close(ax.figure)
+
+def plotten_kosten(df_kosten_jaehrlich, params, ax=None): #Diagramm für kumulierte Kosten pro Jahr
     if params.versicherung_modus:
         kosten_spalten = [
             "Abschlusskosten kum",
@@ -697,12 +826,11 @@ def plotten_kosten(df_kosten_jaehrlich, params): #Diagramm für kumulierte Koste
             "Serviceentgelt kum",
             "Steuern kumuliert"
         ]
-    df_plot = df_kosten_jaehrlich[[col for col in kosten_spalten if col in df_kosten_jaehrlich.columns] + ["Jahr"]]
-    df_plot.index = df_plot["Jahr"]
-    df_plot = df_plot.drop(columns="Jahr")
-    plt.figure(figsize=(14, 8))
-    ax = plt.gca()
-    df_plot.plot(kind="area", stacked=True, ax=ax, legend=False)
+    kosten_spalten = [col for col in kosten_spalten if col in df_kosten_jaehrlich.columns]
+    jahre = df_kosten_jaehrlich["Jahr"].to_numpy()
+    ax, eigene_figure = _plot_achse(ax)
+    #gestapelte Flächen direkt aus den Arrays, ohne den pandas-Plotting-Umweg
+    ax.stackplot(jahre, df_kosten_jaehrlich[kosten_spalten].to_numpy().T, labels=kosten_spalten)
     handles, labels = ax.get_legend_handles_labels()
     new_labels_map = {
         "Abschlusskosten kum": "Abschlusskosten",
@@ -753,28 +881,24 @@ def plotten_kosten(df_kosten_jaehrlich, params): #Diagramm für kumulierte Koste
             handles[4],
             handles[5]
         ]
-    plt.legend(legend_handles, legend_labels, title="Kostenarten", bbox_to_anchor=(1.05, 1), loc='upper left')
-    plt.title(f"Kumulierte Kostenaufschlüsselung für {params.label}")
-    plt.xlabel("Jahr")
-    plt.ylabel("Kumulierte Kosten in Euro")
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(f"{params.label}_kosten_aufschluesselung.png")
-    plt.close()
-
-
-def plotten_entnahmen(df_kosten_jaehrlich, params): #Diagramm für kumulierte Entnahmen
-    plt.figure(figsize=(14, 8))
-    plt.plot(df_kosten_jaehrlich["Jahr"], df_kosten_jaehrlich["Kumulierte Entnahmen"], label="Kumulierte Entnahmen",
-             linewidth=2)
-    plt.xlabel("Jahr")
-    plt.ylabel("Kumulierte Entnahmen in Euro")
-    plt.title(f"Entwicklung der kumulierten Entnahmen für {params.label}")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(f"{params.label}_entnahmen_aufschluesselung.png")
-    plt.close()
+    ax.legend(legend_handles, legend_labels, title="Kostenarten", bbox_to_anchor=(1.05, 1), loc='upper left')
+    ax.set_title(f"Kumulierte Kostenaufschlüsselung für {params.label}")
+    ax.set_xlabel("Jahr")
+    ax.set_ylabel("Kumulierte Kosten in Euro")
+    ax.grid(True)
+    _plot_speichern(ax, f"{params.label}_kosten_aufschluesselung.png", eigene_figure)
+
+
+def plotten_entnahmen(df_kosten_jaehrlich, params, ax=None): #Diagramm für kumulierte Entnahmen
+    ax, eigene_figure = _plot_achse(ax)
+    ax.plot(df_kosten_jaehrlich["Jahr"], df_kosten_jaehrlich["Kumulierte Entnahmen"], label="Kumulierte Entnahmen",
+            linewidth=2)
+    ax.set_xlabel("Jahr")
+    ax.set_ylabel("Kumulierte Entnahmen in Euro")
+    ax.set_title(f"Entwicklung der kumulierten Entnahmen für {params.label}")
+    ax.legend()
+    ax.grid(True)
+    _plot_speichern(ax, f"{params.label}_entnahmen_aufschluesselung.png", eigene_figure)
 
 def exportiere_rebalancing_daten(rebalancing_log, label): #Export Rebalancing Daten in CSV um FIFO/Vorabsteuer zu kontrollieren
     if rebalancing_log:
@@ -783,13 +907,22 @@ def exportiere_rebalancing_daten(rebalancing_log, label): #Export Rebalancing Da
         return df_rebal
     return None
 
+def _markdown_tabelle_schreiben(f, df: pd.DataFrame): #schreibt DataFrame Zeile für Zeile als Markdown-Tabelle in offene Datei, Kommazahlen mit 2 Nachkommastellen
+    f.write("| " + " | ".join(map(str, df.columns)) + " |\n")
+    f.write("|" + "|".join("---:" if pd.api.types.is_numeric_dtype(df[spalte]) else ":---" for spalte in df.columns) + "|\n")
+    for zeile in df.itertuples(index=False):
+        f.write("| " + " | ".join(f"{wert:.2f}" if isinstance(wert, float) else str(wert) for wert in zeile) + " |\n")
+
 def erzeuge_report(df_kosten_det, df_rebal, xirr_nominal, xirr_real, params, market_params): #erzeugt Report mit allen wichtigen Ergebnissen und Diagrammen
     xirr_nominal_formatted = f"{xirr_nominal:.2%}" if xirr_nominal is not None else "Berechnung fehlgeschlagen"
     xirr_real_formatted = f"{xirr_real:.2%}" if xirr_real is not None else "Berechnung fehlgeschlagen"
     end_beitragsdauer_index = min(params.beitragszahldauer - 1, len(df_kosten_det) - 1)
-    depotwert_ende_beitrags = df_kosten_det['Depotwert'].iloc[end_beitragsdauer_index]
-    depotwert_ende_beitrags_real = df_kosten_det['Depotwert real'].iloc[end_beitragsdauer_index]
-    report_text = f"""
+    #Spalten einmal als Arrays holen statt mehrfach über .iloc zu indizieren
+    depotwert = df_kosten_det['Depotwert'].to_numpy()
+    depotwert_real = df_kosten_det['Depotwert real'].to_numpy()
+    depotwert_ende_beitrags = depotwert[end_beitragsdauer_index]
+    depotwert_ende_beitrags_real = depotwert_real[end_beitragsdauer_index]
+    report_kopf = f"""
 # Report für {params.label}
 --- 
 ## Eingabeparameter
@@ -804,8 +937,8 @@ def erzeuge_report(df_kosten_det, df_rebal, xirr_nominal, xirr_real, params, mar
 ### Deterministische Simulation
 * **Depotwert am Ende der Einzahlungsphase (nominal):** {depotwert_ende_beitrags:,.2f} €
 * **Depotwert am Ende der Einzahlungsphase (real):** {depotwert_ende_beitrags_real:,.2f} €
-* **Finaler Depotwert am Ende der Laufzeit (nominal):** {df_kosten_det['Depotwert'].iloc[-1]:,.2f} €
-* **Finaler Depotwert am Ende der Laufzeit (real):** {df_kosten_det['Depotwert real'].iloc[-1]:,.2f} €
+* **Finaler Depotwert am Ende der Laufzeit (nominal):** {depotwert[-1]:,.2f} €
+* **Finaler Depotwert am Ende der Laufzeit (real):** {depotwert_real[-1]:,.2f} €
 * **Effektive Nettorendite (XIRR) nominal:** {xirr_nominal_formatted}
 * **Effektive Nettorendite (XIRR) real:** {xirr_real_formatted}
 ---
@@ -816,32 +949,69 @@ def erzeuge_report(df_kosten_det, df_rebal, xirr_nominal, xirr_real, params, mar
 ---
 ## Detailierte Kosten- und Rebalancing-Daten
 ### Jährliche Kostenaufschlüsselung
-{df_kosten_det.to_markdown(index=False)}
----
-    """
+Vollständige Tabelle: [{params.label}_Kostenarten_Jahr.csv]({params.label}_Kostenarten_Jahr.csv)
+
+"""
+    #im Report nur ein Auszug (erste und letzte Jahre), die vollständige Tabelle steht in der CSV-Datei
+    if len(df_kosten_det) > 2 * REPORT_AUSZUG_JAHRE:
+        report_kopf += f"Auszug: erste und letzte {REPORT_AUSZUG_JAHRE} Jahre\n\n"
+        df_auszug = pd.concat([df_kosten_det.head(REPORT_AUSZUG_JAHRE), df_kosten_det.tail(REPORT_AUSZUG_JAHRE)])
+    else:
+        df_auszug = df_kosten_det
     md_filename = f"{params.label}_Report.md"
+    #Tabelle wird zeilenweise in die Datei geschrieben statt als kompletter String im Report-Text
     with open(md_filename, "w") as f:
-        f.write(report_text)
+        f.write(report_kopf)
+        _markdown_tabelle_schreiben(f, df_auszug)
+        f.write("---\n    ")
     print(f"Report für '{params.label}' in '{md_filename}' erstellt.")
 
-def plotten_vergleich(df_list, params_list): #Diagramm zum Vergleich Depotentwicklung in allen Szenarien
-    plt.figure(figsize=(14, 8))
+def plotten_vergleich(df_list, params_list, ax=None): #Diagramm zum Vergleich Depotentwicklung in allen Szenarien
+    ax, eigene_figure = _plot_achse(ax)
     for df, params in zip(df_list, params_list):
-        df["Jahr"] = pd.to_datetime(df["Datum"]).dt.year
-        df_vergleich = df.groupby("Jahr").last().reset_index()
-        plt.plot(df_vergleich['Jahr'], df_vergleich['Depotwert'], label=f"{params.label} (nominal)", linewidth=2)
-        plt.plot(df_vergleich['Jahr'], df_vergleich['Depotwert real'], label=f"{params.label} (real)", linewidth=2,
-                 linestyle="--")
-    plt.xlabel("Jahr")
-    plt.ylabel("Depotwert in Euro")
-    plt.title("Vergleich der Depotentwicklung")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig("vergleich_depotentwicklung.png")
-    plt.close()
+        #letzte Zeile je Jahr über Jahreswechsel im chronologisch sortierten Log statt groupby
+        jahre = _log_jahre(df)
+        letzte = np.flatnonzero(np.diff(jahre, append=jahre[-1] + 1))
+        ax.plot(jahre[letzte], df['Depotwert'].to_numpy()[letzte], label=f"{params.label} (nominal)", linewidth=2)
+        ax.plot(jahre[letzte], df['Depotwert real'].to_numpy()[letzte], label=f"{params.label} (real)", linewidth=2,
+                linestyle="--")
+    ax.set_xlabel("Jahr")
+    ax.set_ylabel("Depotwert in Euro")
+    ax.set_title("Vergleich der Depotentwicklung")
+    ax.legend()
+    ax.grid(True)
+    _plot_speichern(ax, "vergleich_depotentwicklung.png", eigene_figure)
 
 # Hauptprogramm
+def _szenario_ausfuehren(params: Any, market_params: Dict[str, float]) -> pd.DataFrame: #deterministische Simulation, Auswertung, Plots und Report eines Szenarios, läuft im eigenen Prozess
+    print(f"\n--- Simulation für {params.label} gestartet ---")
+
+    # 1. Deterministische Simulation ausführen mit fester Rendite
+    simulator = SparplanSimulator(params, annual_return=market_params["annual_return"])
+    df_monatlich_log, rebalancing_log, cashflows, cashflow_dates, real_cashflows = simulator.run_simulation()
+    #Jahr einmal aus dem Datum ableiten, Auswertung und Vergleichsplot verwenden dann diese Spalte
+    df_monatlich_log["Jahr"] = pd.DatetimeIndex(df_monatlich_log["Datum"]).year.astype(np.int16)
+
+    # 2. Ergebnisse der deterministischen Simulation verarbeiten
+    xirr_nominal, xirr_real = berechne_xirr_und_print(cashflows, cashflow_dates, real_cashflows, params.label)
+    df_kosten_jaehrlich = auswerten_kosten(df_monatlich_log, params, params.label) #liest nur und wählt Zeilen aus, daher keine Kopie nötig
+    rebal_df = exportiere_rebalancing_daten(rebalancing_log, params.label)
+    #eine Figure je Szenario für beide Diagramme, wird zwischen den Plots nur geleert
+    fig, ax = plt.subplots(figsize=(14, 8))
+    plotten_kosten(df_kosten_jaehrlich, params, ax)
+    plotten_entnahmen(df_kosten_jaehrlich, params, ax)
+    plt.close(fig)
+
+    # 3. Report und Plots erstellen
+    erzeuge_report(
+        df_kosten_jaehrlich, rebal_df, xirr_nominal, xirr_real,
+        params,
+        market_params
+    )
+
+    print(f"--- Simulation für {params.label} beendet ---")
+    return df_monatlich_log
+
 def run_all_scenarios():
     output_path = "output/"
     if not os.path.exists(output_path):
@@ -879,6 +1049,7 @@ def run_all_scenarios():
     #Annahmen für Marktentwicklung
     market_params = {
         "annual_return": 0.08,
+        "seed": None, #fester Wert macht die Inflationspfade aller Szenarien reproduzierbar
     }
 
     #Definition spezifischer Parameter für Depot/Versihcerung
@@ -927,31 +1098,16 @@ def run_all_scenarios():
     )
     all_scenarios.append(params_depot_diy)
 
-    df_results_all = []
-
-    for params in all_scenarios:
-        print(f"\n--- Simulation für {params.label} gestartet ---")
-
-        # 1. Deterministische Simulation ausführen mit fester Rendite
-        simulator = SparplanSimulator(params, annual_return=market_params["annual_return"])
-        df_monatlich_log, rebalancing_log, cashflows, cashflow_dates, real_cashflows = simulator.run_simulation()
-
-        # 2. Ergebnisse der deterministischen Simulation verarbeiten
-        xirr_nominal, xirr_real = berechne_xirr_und_print(cashflows, cashflow_dates, real_cashflows, params.label)
-        df_results_all.append(df_monatlich_log)
-        df_kosten_jaehrlich = auswerten_kosten(df_monatlich_log.copy(), params, params.label)
-        rebal_df = exportiere_rebalancing_daten(rebalancing_log, params.label)
-        plotten_kosten(df_kosten_jaehrlich, params)
-        plotten_entnahmen(df_kosten_jaehrlich, params)
-
-        # 3. Report und Plots erstellen
-        erzeuge_report(
-            df_kosten_jaehrlich, rebal_df, xirr_nominal, xirr_real,
-            params,
-            market_params
-        )
-
-        print(f"--- Simulation für {params.label} beendet ---")
+    #Szenarien sind unabhängig und laufen in eigenen Prozessen; Inflationsseeds werden vorab aus einem gemeinsamen
+    #Generator gezogen, damit nicht alle Prozesse denselben Zufallszustand erben und ein fester Seed alle Läufe reproduzierbar macht
+    plt.switch_backend("Agg") #nur Dateiausgabe, kein GUI-Backend in den Prozessen nötig
+    rng = np.random.default_rng(market_params["seed"])
+    seeds = rng.integers(0, 2**31 - 1, size=len(all_scenarios))
+    all_scenarios = [p if p.inflation_seed is not None else dataclasses.replace(p, inflation_seed=int(seed))
+                     for p, seed in zip(all_scenarios, seeds)]
+    with ProcessPoolExecutor(max_workers=min(len(all_scenarios), os.cpu_count() or 1)) as executor:
+        df_results_all = list(executor.map(_szenario_ausfuehren, all_scenarios,
+                                           [market_params] * len(all_scenarios)))
 
     # Vergleichsplots für alle Szenarien
     plotten_vergleich(df_results_all, all_scenarios)
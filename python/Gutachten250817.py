@@ -1,7 +1,6 @@
 # === IMPORTS ===
-from collections import deque
-from dateutil.relativedelta import relativedelta
 import datetime
+import functools
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy_financial as npf
@@ -54,6 +53,19 @@ class SparplanParameter:
     annual_std_dev: float = 0.15  # Hinzugefügt für Monte-Carlo
 
 
+# Spalten des monatlichen Kosten-Logs (ohne Datum)
+LOG_SPALTEN = [
+    "Depotwert", "Ausgabeaufschlag kum", "Rücknahmeabschlag kum", "Stückkosten kum", "Gesamtfondkosten kum",
+    "Serviceentgelt kum", "Abschlusskosten kum", "Verwaltungskosten kum", "Steuern kumuliert", "Kumulierte Entnahmen",
+]
+
+
+@functools.lru_cache(maxsize=8)
+def _monatsanfaenge(anzahl_monate: int) -> tuple:
+    # Monatserste ab 01.01.2025, Index = Simulationsmonat; wird von allen Läufen gleicher Laufzeit geteilt
+    return tuple(datetime.date(2025 + m // 12, m % 12 + 1, 1) for m in range(anzahl_monate + 1))
+
+
 class SparplanSimulator:
     """
     Simulation eines Sparplans auf Basis der übergebenen Parameter.
@@ -62,10 +74,22 @@ class SparplanSimulator:
 
     def __init__(self, params: SparplanParameter):
         self.params = params
-        self.portfolio = deque()
+
+        # Depot als parallele Arrays (FIFO): gültige Posten liegen in [depot_start, depot_ende)
+        anzahl_monate = params.laufzeit * 12
+        max_posten = 2 + 2 * anzahl_monate + params.laufzeit
+        self._depot_anlegen(max_posten)
+        self.p_date_ordinal = np.zeros(max_posten, dtype=np.int64)
+        self.depot_start = 0
+        self.depot_ende = 0
+
         self.rebalancing_log = []
-        self.monatliche_kosten_logs = []
-        self.cashflows = []
+        # Log-Array für alle Monate plus finalen Zustand, Spalten in Reihenfolge von LOG_SPALTEN
+        self.log_werte = np.empty((params.laufzeit * 12 + 1, len(LOG_SPALTEN)), dtype=np.float64)
+        # Cashflows in einem vorab angelegten Array: Startbetrag, je Monat höchstens Sonderzahlung und
+        # Einzahlung bzw. Entnahme, am Ende der Restwert
+        self.cf_betrag = np.empty(2 + 2 * anzahl_monate, dtype=np.float64)
+        self.cf_n = 0
 
         self.ausgabeaufschlag_summe = 0
         self.ruecknahmeabschlag_summe = 0
@@ -78,16 +102,38 @@ class SparplanSimulator:
         self.total_tax_paid = 0
         self.freistellungs_topf = params.freistellungsauftrag_jahr
         self.monthly_investment = params.monthly_investment
+        self.monatsanfaenge = _monatsanfaenge(params.laufzeit * 12)
+        # Monatsablauf einmal je Modus festlegen; Steuern und Rebalancing gibt es nur im Depot
+        self._simuliere_monat = (
+            self._simuliere_monat_versicherung if params.versicherung_modus else self._simuliere_monat_depot)
         self.abschlusskosten_monatlich_rest = [0.0] * (params.laufzeit * 12)
         self.abschlusskosten_einmalig_rest = [0.0] * (params.laufzeit * 12)
 
-    def run_simulation(self) -> (pd.DataFrame, List[Dict[str, Any]], List[float]):
+    def _depot_anlegen(self, max_posten):
+        self.p_value = np.zeros(max_posten)
+        self.p_amount_invested = np.zeros(max_posten)
+        self.p_start_of_prev_year_value = np.zeros(max_posten)
+        self.p_vorab_versteuert = np.zeros(max_posten)
+        # Laufende Summe aller Posten; wird zum Jahreswechsel gegen die Array-Summe abgeglichen
+        self.depotwert = 0.0
+
+    def run_simulation(self) -> (pd.DataFrame, List[Dict[str, Any]], np.ndarray):
         self._initialisiere_simulation()
+        simuliere_monat = self._simuliere_monat
         for month in range(self.params.laufzeit * 12):
-            self._simuliere_monat(month)
+            simuliere_monat(month)
         self._finalisiere_simulation()
-        df_kosten = pd.DataFrame(self.monatliche_kosten_logs)
-        return df_kosten, self.rebalancing_log, self.cashflows
+        df_kosten = pd.DataFrame(self.log_werte, columns=LOG_SPALTEN)
+        df_kosten.insert(0, "Datum", list(self.monatsanfaenge))
+        return df_kosten, self.rebalancing_log, self.cf_betrag[:self.cf_n].copy()
+
+    def depotwert_nach_monat(self, monat: int) -> float:
+        # Simuliert nur bis einschließlich `monat` und liefert den Depotwert ohne DataFrame (Monte-Carlo)
+        self._initialisiere_simulation()
+        simuliere_monat = self._simuliere_monat
+        for month in range(monat + 1):
+            simuliere_monat(month)
+        return self.depotwert
 
     def _initialisiere_simulation(self):
         self.params.monthly_return = (1 + self.params.annual_return) ** (1 / 12) - 1
@@ -103,230 +149,260 @@ class SparplanSimulator:
             self.params.abschlusskosten_monatlich_prozent = 0.0
             self.params.verwaltungskosten_monatlich_prozent = 0.0
 
+        # Zahlungspläne je Monat einmalig vorberechnen statt Modulo-Tests in jedem Monat
+        anzahl_monate = self.params.laufzeit * 12
+        self.beitrags_ende = self.params.beitragszahldauer * 12
+        # Dynamik als fortlaufendes Produkt; der erste Faktor ist der Startbeitrag, damit jede Erhöhung
+        # wie bisher auf den Vormonatsbeitrag gerechnet wird
+        faktoren = np.ones(anzahl_monate)
+        faktoren[self.params.dynamik_turnus_monate::self.params.dynamik_turnus_monate] = (
+                1 + self.params.monthly_dynamik_rate)
+        faktoren[0] = self.monthly_investment
+        self.einzahlung_plan = np.cumprod(faktoren).tolist()
+        # Sonderzahlungen: regelmäßige ab dem ersten Turnus, die einmalige hat im selben Monat Vorrang
+        sonderzahlungen = np.zeros(anzahl_monate)
+        turnus = self.params.regel_sonderzahlung_turnus_jahre * 12
+        if turnus > 0:
+            sonderzahlungen[turnus::turnus] = self.params.regel_sonderzahlung_betrag
+        if 0 <= self.params.sonderzahlung_jahr * 12 < anzahl_monate:
+            sonderzahlungen[self.params.sonderzahlung_jahr * 12] = self.params.sonderzahlung_betrag
+        self.sonderzahlung_plan = sonderzahlungen.tolist()
+
         aufschlag = self.params.initial_investment * self.params.ausgabeaufschlag
         nettobetrag = self.params.initial_investment - aufschlag
         self.ausgabeaufschlag_summe += aufschlag
-        self.cashflows.append(-self.params.initial_investment)
+        self._cashflow_buchen(-self.params.initial_investment)
 
         if nettobetrag > 0:
-            self.portfolio.append({
-                "date": datetime.date(2025, 1, 1),
-                "amount_invested": nettobetrag,
-                "units": nettobetrag,
-                "value": nettobetrag,
-                "start_of_prev_year_value": nettobetrag,
-                "vorabpauschalen_bereits_versteuert": 0.0
-            })
-
-    def _simuliere_monat(self, month: int):
-        current_date = datetime.date(2025, 1, 1) + relativedelta(months=month)
-        is_january = current_date.month == 1
+            self._posten_anhaengen(datetime.date(2025, 1, 1), nettobetrag)
+
+    def _posten_anhaengen(self, datum, netto):
+        # Neuer Depot-Posten am Ende der FIFO-Arrays
+        i = self.depot_ende
+        self.p_value[i] = netto
+        self.p_amount_invested[i] = netto
+        self.p_start_of_prev_year_value[i] = netto
+        self.p_vorab_versteuert[i] = 0.0
+        self.p_date_ordinal[i] = datum.toordinal()
+        self.depot_ende = i + 1
+        self.depotwert += netto
+
+    def _cashflow_buchen(self, betrag):
+        self.cf_betrag[self.cf_n] = betrag
+        self.cf_n += 1
+
+    def _depotwert(self):
+        return float(np.add.reduce(self.p_value[self.depot_start:self.depot_ende]))
+
+    def _simuliere_monat_depot(self, month: int):
+        current_date = self.monatsanfaenge[month]
+        monat_im_jahr = month % 12
+        is_january = monat_im_jahr == 0
 
         if is_january:
             self.freistellungs_topf = self.params.freistellungsauftrag_jahr
 
         self._handle_monthly_investment(month, current_date)
-        self._handle_costs(month, current_date)
-        self._handle_taxes(current_date)
-        self._handle_rebalancing(current_date)
-
+        self._handle_costs(month, is_january)
+        self._handle_taxes(is_january)
+        self._handle_rebalancing(current_date, monat_im_jahr == 11)
+        self._monat_abschliessen(month, monat_im_jahr)
+
+        # Stand zum Jahresende als Basis der Vorabpauschale im Januar
+        if monat_im_jahr == 11:
+            a, e = self.depot_start, self.depot_ende
+            self.p_start_of_prev_year_value[a:e] = self.p_value[a:e]
+
+    def _simuliere_monat_versicherung(self, month: int):
+        monat_im_jahr = month % 12
+        self._handle_monthly_investment(month, self.monatsanfaenge[month])
+        self._handle_costs(month, monat_im_jahr == 0)
+        self._monat_abschliessen(month, monat_im_jahr)
+
+    def _monat_abschliessen(self, month, monat_im_jahr):
         # Wertentwicklung des Portfolios im aktuellen Monat
-        for entry in self.portfolio:
-            entry["value"] *= (1 + self.params.monthly_return)
+        self.p_value[self.depot_start:self.depot_ende] *= (1 + self.params.monthly_return)
+        self.depotwert *= (1 + self.params.monthly_return)
 
-        self._handle_withdrawals(month, current_date)
+        self._handle_withdrawals(month, monat_im_jahr == 0)
 
-        depotwert = sum(e["value"] for e in self.portfolio)
-        self.monatliche_kosten_logs.append({
-            "Datum": current_date, "Depotwert": depotwert, "Ausgabeaufschlag kum": self.ausgabeaufschlag_summe,
-            "Rücknahmeabschlag kum": self.ruecknahmeabschlag_summe, "Stückkosten kum": self.stueckkosten_summe,
-            "Gesamtfondkosten kum": self.ter_summe, "Serviceentgelt kum": self.serviceentgelt_summe,
-            "Abschlusskosten kum": self.abschlusskosten_summe, "Verwaltungskosten kum": self.verwaltungskosten_summe,
-            "Steuern kumuliert": self.total_tax_paid, "Kumulierte Entnahmen": self.kumulierte_entnahmen
-        })
+        self._log_schreiben(month, self.depotwert)
 
-        if current_date.month == 12:
-            for entry in self.portfolio:
-                entry["start_of_prev_year_value"] = entry["value"]
+        if monat_im_jahr == 11:
+            self.depotwert = self._depotwert()
 
     def _handle_monthly_investment(self, month, current_date):
-        if month > 0 and month % self.params.dynamik_turnus_monate == 0:
-            self.monthly_investment *= (1 + self.params.monthly_dynamik_rate)
-
-        is_einmalig = month == self.params.sonderzahlung_jahr * 12
-        is_regelmaessig = (self.params.regel_sonderzahlung_turnus_jahre > 0 and month > 0 and month % (
-                self.params.regel_sonderzahlung_turnus_jahre * 12) == 0)
+        self.monthly_investment = self.einzahlung_plan[month]
 
         # Verarbeitung von Sonderzahlungen
-        if is_einmalig or is_regelmaessig:
-            betrag = (self.params.sonderzahlung_betrag if is_einmalig else self.params.regel_sonderzahlung_betrag)
-            if betrag > 0:
-                self.cashflows.append(-betrag)
-                if not self.params.versicherung_modus:
-                    aufschlag = betrag * self.params.ausgabeaufschlag
-                    netto = betrag - aufschlag
-                    self.ausgabeaufschlag_summe += aufschlag
-                else:
-                    netto = betrag
-                self.portfolio.append(
-                    {"date": current_date, "amount_invested": netto, "value": netto, "start_of_prev_year_value": netto,
-                     "vorabpauschalen_bereits_versteuert": 0.0})
+        betrag = self.sonderzahlung_plan[month]
+        if betrag > 0:
+            self._cashflow_buchen(-betrag)
+            if not self.params.versicherung_modus:
+                aufschlag = betrag * self.params.ausgabeaufschlag
+                netto = betrag - aufschlag
+                self.ausgabeaufschlag_summe += aufschlag
+            else:
+                netto = betrag
+            self._posten_anhaengen(current_date, netto)
 
         # Monatliche Einzahlung
-        if month < self.params.beitragszahldauer * 12:
+        if month < self.beitrags_ende:
             aufschlag = self.monthly_investment * self.params.ausgabeaufschlag
             netto = self.monthly_investment - aufschlag
             self.ausgabeaufschlag_summe += aufschlag
-            self.cashflows.append(-self.monthly_investment)
-            self.portfolio.append(
-                {"date": current_date, "amount_invested": netto, "value": netto, "start_of_prev_year_value": netto,
-                 "vorabpauschalen_bereits_versteuert": 0.0})
-
-    def _handle_costs(self, month, current_date):
-        depotwert = sum(e["value"] for e in self.portfolio) if self.portfolio else 0
-        if self.params.versicherung_modus and month < self.params.beitragszahldauer * 12:
+            self._cashflow_buchen(-self.monthly_investment)
+            self._posten_anhaengen(current_date, netto)
+
+    def _handle_costs(self, month, is_january):
+        # Alle Kosten werden anteilig zum Depotwert vom Monatsbeginn verteilt, d.h. jeder Posten
+        # wird mit (1 - kosten / depotwert) skaliert; die Faktoren werden zu einem Produkt zusammengefasst
+        depotwert = self.depotwert
+        faktor = 1.0
+        if self.params.versicherung_modus and month < self.beitrags_ende:
             verwaltungskosten = self.monthly_investment * self.params.verwaltungskosten_monatlich_prozent
-            for entry in self.portfolio:
-                anteil = entry["value"] / depotwert if depotwert > 0 else 0
-                entry["value"] -= verwaltungskosten * anteil
+            if depotwert > 0:
+                faktor *= 1 - verwaltungskosten / depotwert
             self.verwaltungskosten_summe += verwaltungskosten
 
             if month < self.params.verrechnungsdauer_monate:
                 abschluss_kosten = (
                         self.abschlusskosten_einmalig_rest[month] + self.abschlusskosten_monatlich_rest[month])
-                for entry in self.portfolio:
-                    anteil = entry["value"] / depotwert if depotwert > 0 else 0
-                    entry["value"] -= abschluss_kosten * anteil
+                if depotwert > 0:
+                    faktor *= 1 - abschluss_kosten / depotwert
                 self.abschlusskosten_summe += abschluss_kosten
 
-        if current_date.month == 1:
+        if is_january:
             if depotwert > 0:
                 fond_kosten = depotwert * self.params.ter
                 service_kosten = depotwert * self.params.serviceentgelt
                 stueck_kosten = self.params.stueckkosten
 
                 total_kosten = fond_kosten + service_kosten + stueck_kosten
-
-                for entry in self.portfolio:
-                    anteil = entry["value"] / depotwert if depotwert > 0 else 0
-                    entry["value"] -= total_kosten * anteil
+                faktor *= 1 - total_kosten / depotwert
 
                 self.ter_summe += fond_kosten
                 self.serviceentgelt_summe += service_kosten
                 self.stueckkosten_summe += stueck_kosten
 
-    def _handle_taxes(self, current_date):
-        is_january = current_date.month == 1
-        if not self.params.versicherung_modus and is_january:
-            for entry in self.portfolio:
-                start_value = entry["start_of_prev_year_value"]
-                fiktiver_ertrag = start_value * self.params.basiszins
-                real_ertrag = entry["value"] - start_value
-                steuerbarer_ertrag = min(fiktiver_ertrag, real_ertrag)
-                steuerfreibetrag = min(self.freistellungs_topf, steuerbarer_ertrag * (1 - self.params.teilfreistellung))
-                zu_versteuern = max(0, (steuerbarer_ertrag * (1 - self.params.teilfreistellung)) - steuerfreibetrag)
-                steuer = max(0, zu_versteuern * self.params.full_tax_rate)
-
-                if steuer > 0:
-                    entry["value"] -= steuer
-                    entry["vorabpauschalen_bereits_versteuert"] += zu_versteuern
-                    self.total_tax_paid += steuer
-                    self.freistellungs_topf -= steuerfreibetrag
-
-    def _handle_rebalancing(self, current_date):
-        if not self.params.versicherung_modus and current_date.month == 12 and self.params.rebalancing_rate > 0:
-            depotwert = sum(e["value"] for e in self.portfolio)
+        if faktor != 1.0:
+            self.p_value[self.depot_start:self.depot_ende] *= faktor
+            self.depotwert *= faktor
+
+    def _handle_taxes(self, is_january):
+        if is_january:
+            a, e = self.depot_start, self.depot_ende
+            if a == e:
+                return
+            start_value = self.p_start_of_prev_year_value[a:e]
+            fiktiver_ertrag = start_value * self.params.basiszins
+            real_ertrag = self.p_value[a:e] - start_value
+            steuerbarer_ertrag = np.minimum(fiktiver_ertrag, real_ertrag) * (1 - self.params.teilfreistellung)
+
+            # Der Freistellungstopf wird in FIFO-Reihenfolge vom Ertrag jedes Postens verbraucht,
+            # auch wenn der Posten selbst darunter bleibt; Verluste füllen ihn nicht wieder auf.
+            # Auch die vom Topf gedeckte Vorabpauschale gilt als versteuert und mindert den Verkaufsgewinn
+            verbraucht = np.minimum(np.cumsum(np.maximum(steuerbarer_ertrag, 0)), self.freistellungs_topf)
+            steuerfreibetrag = np.diff(verbraucht, prepend=0.0)
+            self.freistellungs_topf -= float(verbraucht[-1])
+
+            zu_versteuern = np.maximum(0, steuerbarer_ertrag - steuerfreibetrag)
+            steuer = zu_versteuern * self.params.full_tax_rate
+            self.p_vorab_versteuert[a:e] += np.maximum(steuerbarer_ertrag, 0)
+
+            mit_steuer = steuer > 0
+            if mit_steuer.any():
+                self.p_value[a:e][mit_steuer] -= steuer[mit_steuer]
+                steuer_summe = float(steuer[mit_steuer].sum())
+                self.total_tax_paid += steuer_summe
+                self.depotwert -= steuer_summe
+
+    def _handle_rebalancing(self, current_date, is_december):
+        if is_december and self.params.rebalancing_rate > 0:
+            depotwert = self.depotwert
             umzuschichten = depotwert * self.params.rebalancing_rate
             if umzuschichten > 0:
-                remaining = umzuschichten
-                temp_queue = deque()
-                total_verkauf = 0.0
-                total_steuer = 0.0
-                total_netto = 0.0
-                while remaining > 1e-9 and self.portfolio:
-                    entry = self.portfolio.popleft()
-                    if entry["value"] <= 0: continue
-                    sell_value = min(entry["value"], remaining)
-                    prop = sell_value / entry["value"]
-                    cost_basis = entry["amount_invested"] * prop
-                    gain = sell_value - cost_basis
-                    steuerbarer_gewinn = gain * (1 - self.params.teilfreistellung)
-                    vorab_used = min(entry.get("vorabpauschalen_bereits_versteuert", 0.0) * prop, steuerbarer_gewinn)
-                    steuerbarer_gewinn = max(0.0, steuerbarer_gewinn - vorab_used)
-                    steuerfreibetrag = min(self.freistellungs_topf, steuerbarer_gewinn)
-                    self.freistellungs_topf -= steuerfreibetrag
-                    effektiver_steuersatz = min(self.params.full_tax_rate, self.params.persoenlicher_steuersatz)
-                    steuer = max(0.0, (steuerbarer_gewinn - steuerfreibetrag) * effektiver_steuersatz)
-                    ruecknahmeabschlag = sell_value * self.params.ruecknahmeabschlag
-                    netto_reinvest = sell_value - steuer - ruecknahmeabschlag
-
-                    self.total_tax_paid += steuer
-                    self.ruecknahmeabschlag_summe += ruecknahmeabschlag
-                    total_verkauf += sell_value
-                    total_steuer += steuer
-                    total_netto += netto_reinvest
-
-                    entry["value"] -= sell_value
-                    entry["amount_invested"] -= cost_basis
-                    entry["vorabpauschalen_bereits_versteuert"] = max(0.0,
-                                                                      entry.get("vorabpauschalen_bereits_versteuert",
-                                                                                0.0) - vorab_used)
-                    if entry["value"] > 1e-9:
-                        temp_queue.append(entry)
-                    remaining -= sell_value
-
-                self.portfolio = deque(list(temp_queue) + list(self.portfolio))
+                # FIFO-Schnittpunkt: verkauft wird, solange nach den älteren Posten noch mehr als 1e-9 offen ist
+                a, e = self.depot_start, self.depot_ende
+                positive_werte = np.maximum(self.p_value[a:e], 0.0)
+                offen = umzuschichten - (np.cumsum(positive_werte) - positive_werte)
+                k = int(np.count_nonzero(offen > 1e-9))
+                b = a + k
+
+                werte = self.p_value[a:b]
+                sell_value = np.minimum(positive_werte[:k], offen[:k])
+                prop = np.divide(sell_value, werte, out=np.zeros(k), where=sell_value > 0)
+                cost_basis = self.p_amount_invested[a:b] * prop
+                gain = sell_value - cost_basis
+                steuerbarer_gewinn = gain * (1 - self.params.teilfreistellung)
+                vorab_used = np.minimum(self.p_vorab_versteuert[a:b] * prop, steuerbarer_gewinn)
+                steuerbarer_gewinn = np.maximum(0.0, steuerbarer_gewinn - vorab_used)
+
+                # Freistellungstopf in FIFO-Reihenfolge aufbrauchen
+                verbraucht = np.minimum(np.cumsum(steuerbarer_gewinn), self.freistellungs_topf)
+                steuerfreibetrag = np.diff(verbraucht, prepend=0.0)
+                if k:
+                    self.freistellungs_topf -= float(verbraucht[-1])
+
+                effektiver_steuersatz = min(self.params.full_tax_rate, self.params.persoenlicher_steuersatz)
+                steuer = np.maximum(0.0, (steuerbarer_gewinn - steuerfreibetrag) * effektiver_steuersatz)
+                total_verkauf = float(np.add.reduce(sell_value))
+                total_steuer = float(np.add.reduce(steuer))
+                ruecknahmeabschlag = total_verkauf * self.params.ruecknahmeabschlag
+                total_netto = total_verkauf - total_steuer - ruecknahmeabschlag
+
+                self.total_tax_paid += total_steuer
+                self.ruecknahmeabschlag_summe += ruecknahmeabschlag
+                self.depotwert -= total_verkauf
+
+                werte -= sell_value
+                self.p_amount_invested[a:b] -= cost_basis
+                self.p_vorab_versteuert[a:b] = np.maximum(0.0, self.p_vorab_versteuert[a:b] - vorab_used)
+                # Alle angefassten Posten außer dem letzten sind vollständig verkauft; der letzte bleibt nur mit Rest
+                self.depot_start = b - 1 if k and werte[-1] > 1e-9 else b
                 if total_netto > 1e-9:
-                    self.portfolio.append({"date": current_date, "amount_invested": total_netto, "value": total_netto,
-                                           "start_of_prev_year_value": total_netto,
-                                           "vorabpauschalen_bereits_versteuert": 0.0})
+                    self._posten_anhaengen(current_date, total_netto)
                 self.rebalancing_log.append(
                     {"Datum": current_date, "Bruttoverkauf": total_verkauf, "Steuer": total_steuer,
                      "Netto reinvestiert": total_netto})
 
-    def _handle_withdrawals(self, month, current_date):
-        if month >= self.params.beitragszahldauer * 12:
-            depotwert = sum(e["value"] for e in self.portfolio)
+    def _handle_withdrawals(self, month, is_january):
+        if month >= self.beitrags_ende:
+            depotwert = self.depotwert
             entnahme_betrag = 0
-            if self.params.entnahme_modus == "jährlich" and current_date.month == 1:
+            if self.params.entnahme_modus == "jährlich" and is_january:
                 entnahme_betrag = min(self.params.annual_withdrawal, depotwert)
             elif self.params.entnahme_modus == "monatlich":
                 entnahme_betrag = min(self.params.annual_withdrawal / 12, depotwert)
 
             if entnahme_betrag >= 0:
-                self.cashflows.append(entnahme_betrag)
+                self._cashflow_buchen(entnahme_betrag)
 
+                # Entnahme FIFO ab dem ältesten Depot-Posten
                 remaining_entnahme = entnahme_betrag
-
-                # Entnahme aus dem ältesten Depot-Eintrag
-                if self.portfolio:
-                    oldest_entry = self.portfolio.popleft()
-
-                    if oldest_entry["value"] >= remaining_entnahme:
-                        oldest_entry["value"] -= remaining_entnahme
-                        self.kumulierte_entnahmen += remaining_entnahme
-                        if oldest_entry["value"] > 1e-9:
-                            self.portfolio.appendleft(oldest_entry)
-                    else:
-                        remaining_entnahme -= oldest_entry["value"]
-                        self.kumulierte_entnahmen += oldest_entry["value"]
-
-                        while remaining_entnahme > 1e-9 and self.portfolio:
-                            current_entry = self.portfolio.popleft()
-                            if current_entry["value"] >= remaining_entnahme:
-                                current_entry["value"] -= remaining_entnahme
-                                self.kumulierte_entnahmen += remaining_entnahme
-                                if current_entry["value"] > 1e-9:
-                                    self.portfolio.appendleft(current_entry)
-                                remaining_entnahme = 0
-                            else:
-                                remaining_entnahme -= current_entry["value"]
-                                self.kumulierte_entnahmen += current_entry["value"]
+                entnommen = 0.0
+                i = self.depot_start
+                while i < self.depot_ende:
+                    value = self.p_value[i]
+                    if value >= remaining_entnahme:
+                        self.p_value[i] = value - remaining_entnahme
+                        entnommen += remaining_entnahme
+                        if self.p_value[i] <= 1e-9:
+                            i += 1
+                        break
+                    remaining_entnahme -= value
+                    entnommen += value
+                    i += 1
+                    if remaining_entnahme <= 1e-9:
+                        break
+                self.depot_start = i
+                self.kumulierte_entnahmen += entnommen
+                self.depotwert = self.depotwert - entnommen if i < self.depot_ende else 0.0
 
     def _finalisiere_simulation(self):
-        restwert = sum(e["value"] for e in self.portfolio)
-        investiert = sum(e["amount_invested"] for e in self.portfolio)
-        end_datum = datetime.date(2025, 1, 1) + relativedelta(months=self.params.laufzeit * 12)
+        a, e = self.depot_start, self.depot_ende
+        restwert = float(self.p_value[a:e].sum())
+        investiert = float(self.p_amount_invested[a:e].sum())
 
         if restwert > 1e-9:
             gewinn = max(0.0, restwert - investiert)
@@ -338,7 +414,7 @@ class SparplanSimulator:
                     0.5 if aktuelle_alter >= 62 and aktuelle_laufzeit >= 12 else 0.85) * self.params.persoenlicher_steuersatz
             else:
                 steuerbar = gewinn * (1 - self.params.teilfreistellung)
-                bereits_versteuert = sum(e.get("vorabpauschalen_bereits_versteuert", 0.0) for e in self.portfolio)
+                bereits_versteuert = float(self.p_vorab_versteuert[a:e].sum())
                 steuerbar = max(0.0, steuerbar - bereits_versteuert)
                 effektiver_steuersatz = min(self.params.full_tax_rate, self.params.persoenlicher_steuersatz)
                 steuer = steuerbar * effektiver_steuersatz
@@ -347,24 +423,182 @@ class SparplanSimulator:
             self.total_tax_paid += steuer
             self.ruecknahmeabschlag_summe += ruecknahmeabschlag
             restwert_net = restwert - steuer - ruecknahmeabschlag
-            self.cashflows.append(restwert_net)
+            self._cashflow_buchen(restwert_net)
             self.kumulierte_entnahmen += restwert_net
 
-        self.monatliche_kosten_logs.append({
-            "Datum": end_datum, "Depotwert": 0, "Ausgabeaufschlag kum": self.ausgabeaufschlag_summe,
-            "Rücknahmeabschlag kum": self.ruecknahmeabschlag_summe, "Stückkosten kum": self.stueckkosten_summe,
-            "Gesamtfondkosten kum": self.ter_summe, "Serviceentgelt kum": self.serviceentgelt_summe,
-            "Abschlusskosten kum": self.abschlusskosten_summe, "Verwaltungskosten kum": self.verwaltungskosten_summe,
-            "Steuern kumuliert": self.total_tax_paid, "Kumulierte Entnahmen": self.kumulierte_entnahmen
-        })
+        self._log_schreiben(self.params.laufzeit * 12, 0.0)
+
+    def _log_schreiben(self, index, depotwert):
+        # Eine Zeile in das vorab angelegte Log-Array, das Datum steht in self.monatsanfaenge
+        self.log_werte[index] = (
+            depotwert, self.ausgabeaufschlag_summe, self.ruecknahmeabschlag_summe, self.stueckkosten_summe,
+            self.ter_summe, self.serviceentgelt_summe, self.abschlusskosten_summe, self.verwaltungskosten_summe,
+            self.total_tax_paid, self.kumulierte_entnahmen
+        )
+
+
+class SparplanSimulatorMC(SparplanSimulator):
+    """
+    Monte-Carlo-Variante des Simulators: alle Läufe werden gemeinsam simuliert.
+    params.annual_return ist ein Array mit einer Rendite je Lauf; die Depot-Arrays haben die Form
+    (Posten, Läufe), sodass Einzahlungen, Wertentwicklung und Jahreswechsel aus der Basisklasse
+    unverändert für alle Läufe gelten. Kosten, Steuern, Rebalancing und Entnahmen rechnen spaltenweise.
+    Es wird kein Kosten-Log und kein Rebalancing-Log geführt.
+    """
+
+    def _depot_anlegen(self, max_posten):
+        anzahl_laeufe = len(self.params.annual_return)
+        self.p_value = np.zeros((max_posten, anzahl_laeufe))
+        self.p_amount_invested = np.zeros((max_posten, anzahl_laeufe))
+        self.p_start_of_prev_year_value = np.zeros((max_posten, anzahl_laeufe))
+        self.p_vorab_versteuert = np.zeros((max_posten, anzahl_laeufe))
+        self.depotwert = np.zeros(anzahl_laeufe)
+
+    def _depotwert(self):
+        return self.p_value[self.depot_start:self.depot_ende].sum(axis=0)
+
+    def _log_schreiben(self, index, depotwert):
+        pass
+
+    def _kopf_nachziehen(self):
+        # Vollständig verkaufte Posten stehen auf 0; führende Posten, die in allen Läufen leer sind, fallen weg
+        while self.depot_start < self.depot_ende and not self.p_value[self.depot_start].any():
+            self.depot_start += 1
+
+    def _handle_costs(self, month, is_january):
+        depotwert = self.depotwert
+        positiv = depotwert > 0
+        teiler = np.where(positiv, depotwert, 1.0)
+        faktor = np.ones_like(depotwert)
+        if self.params.versicherung_modus and month < self.beitrags_ende:
+            verwaltungskosten = self.monthly_investment * self.params.verwaltungskosten_monatlich_prozent
+            faktor = np.where(positiv, faktor * (1 - verwaltungskosten / teiler), faktor)
+            self.verwaltungskosten_summe += verwaltungskosten
+
+            if month < self.params.verrechnungsdauer_monate:
+                abschluss_kosten = (
+                        self.abschlusskosten_einmalig_rest[month] + self.abschlusskosten_monatlich_rest[month])
+                faktor = np.where(positiv, faktor * (1 - abschluss_kosten / teiler), faktor)
+                self.abschlusskosten_summe += abschluss_kosten
+
+        if is_january:
+            fond_kosten = np.where(positiv, depotwert * self.params.ter, 0.0)
+            service_kosten = np.where(positiv, depotwert * self.params.serviceentgelt, 0.0)
+            stueck_kosten = np.where(positiv, self.params.stueckkosten, 0.0)
+            total_kosten = fond_kosten + service_kosten + stueck_kosten
+            faktor = np.where(positiv, faktor * (1 - total_kosten / teiler), faktor)
+
+            self.ter_summe += fond_kosten
+            self.serviceentgelt_summe += service_kosten
+            self.stueckkosten_summe += stueck_kosten
+
+        self.p_value[self.depot_start:self.depot_ende] *= faktor
+        self.depotwert = depotwert * faktor
+
+    def _handle_taxes(self, is_january):
+        if is_january:
+            a, e = self.depot_start, self.depot_ende
+            if a == e:
+                return
+            start_value = self.p_start_of_prev_year_value[a:e]
+            fiktiver_ertrag = start_value * self.params.basiszins
+            real_ertrag = self.p_value[a:e] - start_value
+            steuerbarer_ertrag = np.minimum(fiktiver_ertrag, real_ertrag) * (1 - self.params.teilfreistellung)
+
+            # Wie in der Basisklasse: Topf in FIFO-Reihenfolge verbrauchen, je Durchlauf getrennt
+            verbraucht = np.minimum(np.cumsum(np.maximum(steuerbarer_ertrag, 0), axis=0), self.freistellungs_topf)
+            steuerfreibetrag = np.diff(verbraucht, axis=0, prepend=0.0)
+            self.freistellungs_topf = self.freistellungs_topf - verbraucht[-1]
+
+            zu_versteuern = np.maximum(0, steuerbarer_ertrag - steuerfreibetrag)
+            steuer = zu_versteuern * self.params.full_tax_rate
+
+            self.p_value[a:e] -= steuer
+            self.p_vorab_versteuert[a:e] += np.maximum(steuerbarer_ertrag, 0)
+            steuer_summe = steuer.sum(axis=0)
+            self.total_tax_paid += steuer_summe
+            self.depotwert = self.depotwert - steuer_summe
+
+    def _handle_rebalancing(self, current_date, is_december):
+        if is_december and self.params.rebalancing_rate > 0:
+            a, e = self.depot_start, self.depot_ende
+            if a == e:
+                return
+            umzuschichten = self.depotwert * self.params.rebalancing_rate
+            werte = self.p_value[a:e]
+
+            # FIFO: jeder Posten wird mit dem Rest verkauft, der nach allen älteren Posten noch offen ist
+            positive_werte = np.maximum(werte, 0.0)
+            offen = umzuschichten - (np.cumsum(positive_werte, axis=0) - positive_werte)
+            besucht = offen > 1e-9
+            sell_value = np.where(besucht, np.minimum(positive_werte, offen), 0.0)
+            prop = np.divide(sell_value, werte, out=np.zeros_like(werte), where=sell_value > 0)
+            cost_basis = self.p_amount_invested[a:e] * prop
+            gain = sell_value - cost_basis
+            steuerbarer_gewinn = gain * (1 - self.params.teilfreistellung)
+            vorab_used = np.minimum(self.p_vorab_versteuert[a:e] * prop, steuerbarer_gewinn)
+            steuerbarer_gewinn = np.maximum(0.0, steuerbarer_gewinn - vorab_used)
+
+            # Freistellungstopf in FIFO-Reihenfolge aufbrauchen
+            verbraucht = np.minimum(np.cumsum(steuerbarer_gewinn, axis=0), self.freistellungs_topf)
+            steuerfreibetrag = np.diff(verbraucht, axis=0, prepend=0.0)
+            self.freistellungs_topf = self.freistellungs_topf - verbraucht[-1]
+
+            effektiver_steuersatz = min(self.params.full_tax_rate, self.params.persoenlicher_steuersatz)
+            steuer = np.maximum(0.0, (steuerbarer_gewinn - steuerfreibetrag) * effektiver_steuersatz)
+            ruecknahmeabschlag = sell_value * self.params.ruecknahmeabschlag
+            total_verkauf = sell_value.sum(axis=0)
+            total_steuer = steuer.sum(axis=0)
+            total_netto = total_verkauf - total_steuer - ruecknahmeabschlag.sum(axis=0)
+
+            self.total_tax_paid += total_steuer
+            self.ruecknahmeabschlag_summe += ruecknahmeabschlag.sum(axis=0)
+            werte -= sell_value
+            self.p_amount_invested[a:e] -= cost_basis
+            self.p_vorab_versteuert[a:e] = np.maximum(0.0, self.p_vorab_versteuert[a:e] - vorab_used)
+            # Verkaufte Posten ohne nennenswerten Rest (oder ohne Wert) werden geleert
+            werte[besucht & (werte <= 1e-9)] = 0.0
+            self.depotwert = self.depotwert - total_verkauf
+
+            self._kopf_nachziehen()
+            self._posten_anhaengen(current_date, np.where(total_netto > 1e-9, total_netto, 0.0))
+
+    def _handle_withdrawals(self, month, is_january):
+        if month >= self.beitrags_ende:
+            if self.params.entnahme_modus == "jährlich" and is_january:
+                entnahme_betrag = np.minimum(self.params.annual_withdrawal, self.depotwert)
+            elif self.params.entnahme_modus == "monatlich":
+                entnahme_betrag = np.minimum(self.params.annual_withdrawal / 12, self.depotwert)
+            else:
+                return
+
+            a, e = self.depot_start, self.depot_ende
+            werte = self.p_value[a:e]
+            offen = entnahme_betrag - (np.cumsum(werte, axis=0) - werte)
+            entnahme = np.where(offen > 1e-9, np.minimum(werte, offen), 0.0)
+            werte -= entnahme
+            werte[(entnahme > 0) & (werte <= 1e-9)] = 0.0
+            entnommen = entnahme.sum(axis=0)
+            self.kumulierte_entnahmen += entnommen
+            self.depotwert = np.where(werte.any(axis=0), self.depotwert - entnommen, 0.0)
+            self._kopf_nachziehen()
 
 
 # === HILFSFUNKTIONEN SIND NICHT TEIL DER KLASSEN ===
+def _jahresende_maske(df_kosten: pd.DataFrame) -> np.ndarray:
+    # Legt die Spalte "Jahr" an und markiert die letzte Zeile je Jahr. Das Log hat eine Zeile je Monat ab
+    # Januar 2025 plus die finale Zeile, das Jahr folgt also direkt aus der Zeilennummer; letzte Zeile
+    # eines Jahres ist jede Zeile vor einem Jahreswechsel (entspricht groupby("Jahr").last())
+    jahre = 2025 + np.arange(len(df_kosten)) // 12
+    df_kosten["Jahr"] = jahre
+    return np.diff(jahre, append=jahre[-1] + 1) != 0
+
+
 def auswerten_kosten(df_kosten: pd.DataFrame, params: SparplanParameter, label: str,
                      mc_results: Optional[List[float]] = None) -> pd.DataFrame:
-    df_kosten["Jahr"] = pd.to_datetime(df_kosten["Datum"]).dt.year
+    jahresende = _jahresende_maske(df_kosten)
     numerische_spalten = df_kosten.drop(columns=["Datum", "Jahr"]).select_dtypes(include="number").columns
-    kosten_jahr_detail = df_kosten.groupby("Jahr")[numerische_spalten].last().reset_index()
+    kosten_jahr_detail = df_kosten.loc[jahresende, ["Jahr", *numerische_spalten]].reset_index(drop=True)
 
     for spalte in ["Ausgabeaufschlag kum", "Rücknahmeabschlag kum", "Stückkosten kum", "Serviceentgelt kum",
                    "Gesamtfondkosten kum", "Abschlusskosten kum", "Verwaltungskosten kum"]:
@@ -384,10 +618,7 @@ def auswerten_kosten(df_kosten: pd.DataFrame, params: SparplanParameter, label:
         kosten_jahr_detail["Kosten Versicherung"] = kosten_jahr_detail["Serviceentgelt kum"]
 
     if mc_results is not None:
-        mean_value = np.mean(mc_results)
-        median_value = np.median(mc_results)
-        ci_lower = np.percentile(mc_results, 2.5)
-        ci_upper = np.percentile(mc_results, 97.5)
+        mean_value, median_value, ci_lower, ci_upper = mc_kennzahlen(mc_results)
 
         mc_row = pd.DataFrame([{
             "Jahr": "Monte-Carlo",
@@ -403,23 +634,39 @@ def auswerten_kosten(df_kosten: pd.DataFrame, params: SparplanParameter, label:
     return kosten_jahr_detail
 
 
-def plotten_vergleich(df_list, params_list):
-    plt.figure(figsize=(14, 8))
+def _plot_achse(fig=None):
+    # Zeichenachse: eine übergebene Figure wird geleert und mit frischer Achse wiederverwendet, sonst neue Figure.
+    # Bewusst nicht ax.clear(): das pandas-Flächendiagramm hinterließe Zustand wie Achsengrenzen
+    if fig is None:
+        return plt.subplots(figsize=(14, 8))[1], True
+    fig.clear()
+    fig.subplots_adjust(**{k: plt.rcParams[f"figure.subplot.{k}"]
+                           for k in ("left", "right", "bottom", "top", "wspace", "hspace")})
+    return fig.add_subplot(), False
+
+
+def _plot_speichern(ax, dateiname, eigene_figure):
+    # Speichert die Figure der Achse und schließt sie nur, wenn sie nicht wiederverwendet wird
+    ax.figure.tight_layout()
+    ax.figure.savefig(dateiname)
+    if eigene_figure:
+        plt.close(ax.figure)
+
+
+def plotten_vergleich(df_list, params_list, fig=None):
+    ax, eigene_figure = _plot_achse(fig)
     for df, params in zip(df_list, params_list):
-        plt.plot(df['Datum'], df['Depotwert'], label=params.label, linewidth=2)
-    plt.xlabel("Datum")
-    plt.ylabel("Depotwert in Euro")
-    plt.title("Vergleich der Depotentwicklung")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig("vergleich_depotentwicklung.png")
-    plt.close()
+        ax.plot(df['Datum'], df['Depotwert'], label=params.label, linewidth=2)
+    ax.set_xlabel("Datum")
+    ax.set_ylabel("Depotwert in Euro")
+    ax.set_title("Vergleich der Depotentwicklung")
+    ax.legend()
+    ax.grid(True)
+    _plot_speichern(ax, "vergleich_depotentwicklung.png", eigene_figure)
 
 
-def plotten_kosten(df_kosten, params):
-    df_kosten["Jahr"] = pd.to_datetime(df_kosten["Datum"]).dt.year
-    df_kum_kosten = df_kosten.groupby("Jahr").last().reset_index()
+def plotten_kosten(df_kosten, params, fig=None):
+    df_kum_kosten = df_kosten.loc[_jahresende_maske(df_kosten)]
 
     kosten_spalten = []
     if params.versicherung_modus:
@@ -432,10 +679,10 @@ def plotten_kosten(df_kosten, params):
     df_kosten_plot = df_kum_kosten[kosten_spalten + ["Jahr"]]
     df_kosten_plot.index = df_kosten_plot["Jahr"]
 
-    plt.figure(figsize=(14, 8))
-    df_kosten_plot[kosten_spalten].plot(kind="area", stacked=True, ax=plt.gca(), legend=False)
+    ax, eigene_figure = _plot_achse(fig)
+    df_kosten_plot[kosten_spalten].plot(kind="area", stacked=True, ax=ax, legend=False)
 
-    handles, labels = plt.gca().get_legend_handles_labels()
+    handles, labels = ax.get_legend_handles_labels()
 
     labels_ger = {
         "Abschlusskosten kum": "Abschlusskosten",
@@ -449,36 +696,56 @@ def plotten_kosten(df_kosten, params):
 
     new_labels = [labels_ger.get(label, label) for label in labels]
 
-    plt.legend(handles, new_labels, title="Kostenarten", bbox_to_anchor=(1.05, 1), loc='upper left')
-    plt.title(f"Kumulierte Kostenaufschlüsselung für {params.label}")
-    plt.xlabel("Jahr")
-    plt.ylabel("Kumulierte Kosten in Euro")
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(f"{params.label}_kosten_aufschluesselung.png")
-    plt.close()
-
-
-def plotten_entnahmen(df_kosten, params):
-    df_kosten["Jahr"] = pd.to_datetime(df_kosten["Datum"]).dt.year
-    df_kum_entnahmen = df_kosten.groupby("Jahr").last().reset_index()
-
-    plt.figure(figsize=(14, 8))
-    plt.plot(df_kum_entnahmen["Jahr"], df_kum_entnahmen["Kumulierte Entnahmen"], label="Kumulierte Entnahmen",
-             linewidth=2)
-    plt.xlabel("Jahr")
-    plt.ylabel("Kumulierte Entnahmen in Euro")
-    plt.title(f"Entwicklung der kumulierten Entnahmen für {params.label}")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(f"{params.label}_entnahmen_aufschluesselung.png")
-    plt.close()
+    ax.legend(handles, new_labels, title="Kostenarten", bbox_to_anchor=(1.05, 1), loc='upper left')
+    ax.set_title(f"Kumulierte Kostenaufschlüsselung für {params.label}")
+    ax.set_xlabel("Jahr")
+    ax.set_ylabel("Kumulierte Kosten in Euro")
+    ax.grid(True)
+    _plot_speichern(ax, f"{params.label}_kosten_aufschluesselung.png", eigene_figure)
+
+
+def plotten_entnahmen(df_kosten, params, fig=None):
+    df_kum_entnahmen = df_kosten.loc[_jahresende_maske(df_kosten)]
+
+    ax, eigene_figure = _plot_achse(fig)
+    ax.plot(df_kum_entnahmen["Jahr"], df_kum_entnahmen["Kumulierte Entnahmen"], label="Kumulierte Entnahmen",
+            linewidth=2)
+    ax.set_xlabel("Jahr")
+    ax.set_ylabel("Kumulierte Entnahmen in Euro")
+    ax.set_title(f"Entwicklung der kumulierten Entnahmen für {params.label}")
+    ax.legend()
+    ax.grid(True)
+    _plot_speichern(ax, f"{params.label}_entnahmen_aufschluesselung.png", eigene_figure)
+
+
+def irr_newton(cashflows, guess=0.0, tol=1e-12, max_iter=50):
+    # Periodischer IRR per Newton-Verfahren auf dem Barwert, O(n) je Schritt statt Eigenwertsuche in npf.irr.
+    # Gerechnet wird in x = ln(1 + r), damit kein Schritt unter r = -100 % führen kann.
+    # Eindeutig ist die Lösung nur bei genau einem Vorzeichenwechsel, sonst (oder ohne Konvergenz) None.
+    werte = np.asarray(cashflows, dtype=float)
+    vorzeichen = np.sign(werte[werte != 0])
+    if vorzeichen.size < 2 or np.count_nonzero(vorzeichen[1:] != vorzeichen[:-1]) != 1:
+        return None
+    perioden = np.arange(werte.size)
+    x = np.log1p(guess)
+    for _ in range(max_iter):
+        abgezinst = werte * np.exp(-perioden * x)
+        barwert = abgezinst.sum()
+        ableitung = -(perioden * abgezinst).sum()
+        if ableitung == 0 or not np.isfinite(barwert):
+            return None
+        schritt = barwert / ableitung
+        x -= schritt
+        if abs(schritt) < tol:
+            return float(np.expm1(x))
+    return None
 
 
 def berechne_irr_und_print(cashflows, label):
     try:
-        irr_monthly = npf.irr(cashflows)
+        irr_monthly = irr_newton(cashflows)
+        if irr_monthly is None:
+            irr_monthly = npf.irr(cashflows)
         irr_annual = (1 + irr_monthly) ** 12 - 1
         return irr_annual
     except (ValueError, IndexError) as e:
@@ -494,39 +761,38 @@ def exportiere_rebalancing_daten(rebalancing_log, label):
     return None
 
 
-def run_monte_carlo(params, num_runs):
-    print(f"\nStarte Monte-Carlo-Simulation für '{params.label}' mit {num_runs} Durchläufen...")
-    final_values = []
+def mc_kennzahlen(werte):
+    # Mittelwert, Median und 95%-Konfidenzintervall; Median und Intervallgrenzen aus einem einzigen Quantil-Aufruf
+    werte = np.asarray(werte, dtype=float)
+    ci_lower, median_value, ci_upper = np.quantile(werte, [0.025, 0.5, 0.975])
+    return werte.mean(), median_value, ci_lower, ci_upper
 
+
+def run_monte_carlo(params, num_runs, seed=None, fig=None):
+    print(f"\nStarte Monte-Carlo-Simulation für '{params.label}' mit {num_runs} Durchläufen...")
     end_of_beitrags_period_index = params.beitragszahldauer * 12
     if end_of_beitrags_period_index >= params.laufzeit * 12:
         end_of_beitrags_period_index = (params.laufzeit * 12) - 1
 
-    for i in range(num_runs):
-        random_annual_return = np.random.normal(params.annual_return, params.annual_std_dev)
-        mc_params = dataclasses.replace(params, annual_return=random_annual_return)
-
-        simulator = SparplanSimulator(mc_params)
-        df_kosten, _, _ = simulator.run_simulation()
-        final_values.append(df_kosten["Depotwert"].iloc[end_of_beitrags_period_index])
-
-    mean_value = np.mean(final_values)
-    median_value = np.median(final_values)
-    ci_lower = np.percentile(final_values, 2.5)
-    ci_upper = np.percentile(final_values, 97.5)
-
-    plt.figure(figsize=(14, 8))
-    plt.hist(final_values, bins=50, edgecolor='black', alpha=0.7)
-    plt.axvline(mean_value, color='red', linestyle='dashed', linewidth=2, label=f'Mittelwert: {mean_value:,.0f} €')
-    plt.axvline(median_value, color='green', linestyle='dashed', linewidth=2, label=f'Median: {median_value:,.0f} €')
-    plt.title(f"Monte-Carlo-Simulation der Depotwerte für '{params.label}' am Ende der Einzahlungsphase")
-    plt.xlabel("Endwert in Euro")
-    plt.ylabel("Anzahl der Simulationen")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(f"{params.label}_monte_carlo_histogramm.png")
-    plt.close()
+    # Alle Läufe gemeinsam: eine Jahresrendite je Lauf aus einem eigenen Generator (mit seed reproduzierbar),
+    # Depot-Arrays mit einer Spalte je Lauf
+    rng = np.random.default_rng(seed)
+    random_annual_returns = rng.normal(params.annual_return, params.annual_std_dev, num_runs)
+    mc_params = dataclasses.replace(params, annual_return=random_annual_returns)
+    final_values = SparplanSimulatorMC(mc_params).depotwert_nach_monat(end_of_beitrags_period_index).tolist()
+
+    mean_value, median_value, ci_lower, ci_upper = mc_kennzahlen(final_values)
+
+    ax, eigene_figure = _plot_achse(fig)
+    ax.hist(final_values, bins=50, edgecolor='black', alpha=0.7)
+    ax.axvline(mean_value, color='red', linestyle='dashed', linewidth=2, label=f'Mittelwert: {mean_value:,.0f} €')
+    ax.axvline(median_value, color='green', linestyle='dashed', linewidth=2, label=f'Median: {median_value:,.0f} €')
+    ax.set_title(f"Monte-Carlo-Simulation der Depotwerte für '{params.label}' am Ende der Einzahlungsphase")
+    ax.set_xlabel("Endwert in Euro")
+    ax.set_ylabel("Anzahl der Simulationen")
+    ax.legend()
+    ax.grid(True)
+    _plot_speichern(ax, f"{params.label}_monte_carlo_histogramm.png", eigene_figure)
 
     return final_values, mean_value, median_value, ci_lower, ci_upper
 
@@ -692,6 +958,10 @@ if __name__ == "__main__":
     params_list = [params_depot, params_versicherung, params_diy]
     df_list = []
 
+    # Nur Dateiausgabe: Agg-Backend ohne GUI und eine Figure, die von allen Diagrammen wiederverwendet wird
+    plt.switch_backend("Agg")
+    fig = plt.figure(figsize=(14, 8))
+
     for params in params_list:
         print(f"\n--- Simulation für {params.label} ---")
         simulator = SparplanSimulator(params)
@@ -702,11 +972,12 @@ if __name__ == "__main__":
         irr_annual = berechne_irr_und_print(cashflows, params.label)
         df_rebal = exportiere_rebalancing_daten(rebalancing_log, params.label)
 
-        plotten_kosten(df_kosten, params)
-        plotten_entnahmen(df_kosten, params)
+        plotten_kosten(df_kosten, params, fig=fig)
+        plotten_entnahmen(df_kosten, params, fig=fig)
 
-        mc_results_tuple = run_monte_carlo(params, num_runs=100)
+        mc_results_tuple = run_monte_carlo(params, num_runs=100, seed=42, fig=fig)
 
         erzeuge_report(df_kosten, df_rebal, irr_annual, mc_results_tuple, params)
 
-    plotten_vergleich(df_list, params_list)
\ No newline at end of file
+    plotten_vergleich(df_list, params_list, fig=fig)
+    plt.close(fig)
\ No newline at end of file
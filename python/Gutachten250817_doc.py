@@ -16,11 +16,11 @@
 # === IMPORTS: Erforderliche Werkzeuge importieren ===
 # Hier werden alle notwendigen "Werkzeuge" (sogenannte Bibliotheken)
 # geladen, die das Programm benötigt, um seine Aufgaben zu erfüllen.
-from collections import \
-    deque  # Hilft, Investitionen in einer chronologischen Reihenfolge zu verwalten (wie eine Warteschlange).
-from dateutil.relativedelta import relativedelta  # Erleichtert die genaue Berechnung von Zeiträumen (Monate, Jahre).
 import datetime  # Dient zur Arbeit mit Kalenderdaten.
+import functools  # Stellt unter anderem einen Zwischenspeicher (Cache) für Funktionsergebnisse bereit.
 import pandas as pd  # Das Herzstück für die Datenanalyse; erstellt und bearbeitet Tabellen (DataFrames).
+import matplotlib  # Die Grundbibliothek für Diagramme.
+matplotlib.use("Agg")  # Diagramme werden nur als Dateien gespeichert; das Agg-Backend kommt ohne Fenster aus.
 import matplotlib.pyplot as plt  # Ermöglicht das Zeichnen von Diagrammen und Grafiken.
 import \
     numpy_financial as npf  # Eine Bibliothek für finanzmathematische Berechnungen, wie z. B. den Internen Zinsfuß (IRR).
@@ -29,6 +29,7 @@ import dataclasses  # Ein Werkzeug, das es uns ermöglicht, Eingabeparameter üb
 from typing import List, Dict, Any, \
     Optional  # Dient dazu, den Code lesbarer zu machen, indem wir die Art der Daten (z.B. Liste, Wörterbuch) definieren.
 import os  # Hilft bei der Verwaltung von Dateien und Ordnern.
+from concurrent.futures import ProcessPoolExecutor  # Verteilt unabhängige Aufgaben auf mehrere Prozessorkerne.
 from fpdf import FPDF, XPos, YPos  # Dient zum Erstellen des finalen Reports im PDF-Format.
 
 
@@ -74,11 +75,36 @@ class SparplanParameter:
     teilfreistellung: float  # Prozentsatz der Erträge, der bei bestimmten Fonds steuerfrei ist.
     basiszins: float  # Basiszins für die Berechnung der Vorabpauschale.
     rebalancing_rate: float  # Prozentsatz des Depots, der jährlich angepasst wird (Rebalancing).
-    entnahme_modus: str  # Entnahme-Strategie ("jährlich" oder "monatlich").
+    entnahme_modus: str  # Entnahme-Strategie ("jährlich", "quartalsweise" oder "monatlich").
     bewertungsdauer: int  # Relevant für die Besteuerung von Versicherungen.
     annual_std_dev: float = 0.15  # Die statistische Abweichung der Rendite; wichtig für die Monte-Carlo-Simulation.
 
 
+# Abstand zwischen zwei Entnahmen in Monaten je Entnahme-Strategie. Die Entnahmen beginnen mit dem
+# ersten Monat nach der Beitragsphase (immer ein Januar) und wiederholen sich in diesem Abstand.
+ENTNAHME_INTERVALLE = {"monatlich": 1, "quartalsweise": 3, "jährlich": 12}
+
+# Spalten des Rebalancing-Logs (ohne Datum) in der Reihenfolge, in der sie im Rebalancing-Array stehen.
+REBALANCING_SPALTEN = ["Bruttoverkauf", "Steuer", "Netto reinvestiert"]
+
+# Spalten des monatlichen Kosten-Logs (ohne Datum) in der Reihenfolge, in der sie im Log-Array stehen.
+LOG_SPALTEN = [
+    "Depotwert", "Ausgabeaufschlag kum", "Rücknahmeabschlag kum", "Stückkosten kum", "Gesamtfondkosten kum",
+    "Serviceentgelt kum", "Abschlusskosten kum", "Verwaltungskosten kum", "Steuern kumuliert", "Kumulierte Entnahmen",
+]
+
+
+@functools.lru_cache(maxsize=8)
+def _monatsanfaenge(anzahl_monate: int) -> tuple:
+    """
+    Liefert die Monatsersten ab dem 01.01.2025 für alle Monate der Laufzeit plus den Monat nach
+    dem Ende; der Index entspricht der Monatsnummer der Simulation. Das Ergebnis wird zwischengespeichert,
+    sodass alle Simulationen mit derselben Laufzeit (alle Szenarien und Monte-Carlo-Läufe) dieselbe
+    Datumsliste verwenden, statt sie jeweils neu zu berechnen.
+    """
+    return tuple(datetime.date(2025 + m // 12, m % 12 + 1, 1) for m in range(anzahl_monate + 1))
+
+
 class SparplanSimulator:
     """
     Diese Klasse ist der Kern des Programms. Sie führt die eigentliche Simulation
@@ -90,10 +116,34 @@ class SparplanSimulator:
     def __init__(self, params: SparplanParameter):
         """Initialisiert die Simulation mit den übergebenen Parametern."""
         self.params = params  # Speichert die Einstellungen für die Simulation.
-        self.portfolio = deque()  # Die "Warteschlange" unserer Investitionen, in der ältere Investitionen zuerst abgearbeitet werden (FIFO).
-        self.rebalancing_log = []  # Eine Liste, die alle durchgeführten Rebalancing-Vorgänge aufzeichnet.
-        self.monatliche_kosten_logs = []  # Eine Liste, die monatlich den Depotwert und alle Kosten festhält.
-        self.cashflows = []  # Eine Liste, die alle Ein- und Auszahlungen für die IRR-Berechnung speichert.
+
+        # Das Depot wird als Satz paralleler NumPy-Arrays geführt (ein Eintrag je Investition, "Posten").
+        # Die gültigen Posten liegen im Bereich [depot_start, depot_ende); ältere Posten stehen vorne (FIFO).
+        # Mehr Posten als Startbetrag, je Monat Sonderzahlung und Sparrate und je Jahr eine Reinvestition
+        # aus dem Rebalancing kann es nicht geben, daher reicht diese feste Größe für die ganze Laufzeit.
+        anzahl_monate = params.laufzeit * 12
+        max_posten = 2 + 2 * anzahl_monate + params.laufzeit
+        self._depot_anlegen(max_posten)
+        self.p_date_ordinal = np.zeros(max_posten, dtype=np.int64)  # Kaufdatum je Posten (als Tageszahl).
+        self.depot_start = 0  # Index des ältesten noch vorhandenen Postens.
+        self.depot_ende = 0  # Index hinter dem jüngsten Posten.
+
+        # Ein Array, das alle durchgeführten Rebalancing-Vorgänge aufzeichnet. Rebalancing findet höchstens
+        # einmal im Jahr statt, daher reicht eine Zeile je Jahr; rebal_n zählt die belegten Zeilen.
+        self.rebal_werte = np.empty((params.laufzeit, len(REBALANCING_SPALTEN)), dtype=np.float64)
+        self.rebal_date_ordinal = np.empty(params.laufzeit, dtype=np.int64)  # Datum je Vorgang (als Tageszahl).
+        self.rebal_n = 0
+        # Ein vorab angelegtes Array, das monatlich den Depotwert und alle Kosten festhält: eine Zeile je Monat
+        # plus eine Zeile für den Endstand, die Spalten in der Reihenfolge von LOG_SPALTEN. So wird die Tabelle
+        # nicht Zeile für Zeile aufgebaut, sondern am Ende in einem Schritt erstellt.
+        self.log_werte = np.empty((anzahl_monate + 1, len(LOG_SPALTEN)), dtype=np.float64)
+        # Das Datum jeder Log-Zeile (jeweils der Monatserste) aus der gemeinsamen Datumsliste.
+        self.monatsanfaenge = _monatsanfaenge(anzahl_monate)
+        # Ein Array, das alle Ein- und Auszahlungen für die IRR-Berechnung speichert. Es ist groß genug für den
+        # Startbetrag, je Monat eine Sonderzahlung und eine Einzahlung bzw. Entnahme und den Restwert am Ende;
+        # cf_n zählt die tatsächlich gebuchten Cashflows.
+        self.cf_betrag = np.empty(2 + 2 * anzahl_monate, dtype=np.float64)
+        self.cf_n = 0
 
         # Initialisiert alle Zähler, um die Gesamtsumme der Kosten und Steuern zu verfolgen.
         self.ausgabeaufschlag_summe = 0
@@ -107,10 +157,26 @@ class SparplanSimulator:
         self.total_tax_paid = 0
         self.freistellungs_topf = params.freistellungsauftrag_jahr  # Der Freistellungsauftrag für das aktuelle Jahr.
         self.monthly_investment = params.monthly_investment  # Der aktuelle monatliche Sparbetrag.
+        # Die Entnahme-Strategie wird einmal in eine Zahl übersetzt (Monate zwischen zwei Entnahmen), damit
+        # nicht jeden Monat Texte verglichen werden müssen. Bei einer unbekannten Strategie (0) wird nichts entnommen.
+        self.entnahme_intervall = ENTNAHME_INTERVALLE.get(params.entnahme_modus, 0)
+        if self.entnahme_intervall:
+            # Der Betrag je Entnahme ist der Anteil der Jahresentnahme, der auf ein Intervall entfällt.
+            self.entnahme_je_intervall = params.annual_withdrawal / (12 // self.entnahme_intervall)
         self.abschlusskosten_monatlich_rest = [0.0] * (params.laufzeit * 12)
         self.abschlusskosten_einmalig_rest = [0.0] * (params.laufzeit * 12)
 
-    def run_simulation(self) -> (pd.DataFrame, List[Dict[str, Any]], List[float]):
+    def _depot_anlegen(self, max_posten):
+        """Legt die leeren Depot-Arrays an, je ein Array pro Eigenschaft eines Postens."""
+        self.p_value = np.zeros(max_posten)  # Aktueller Wert des Postens.
+        self.p_amount_invested = np.zeros(max_posten)  # Ursprünglich investierter (noch nicht verkaufter) Betrag.
+        self.p_start_of_prev_year_value = np.zeros(max_posten)  # Wert zum letzten Jahresende (für die Vorabpauschale).
+        self.p_vorab_versteuert = np.zeros(max_posten)  # Bereits versteuerte Vorabpauschalen.
+        # Laufende Summe aller Posten, damit der Depotwert nicht jeden Monat neu addiert werden muss.
+        # Zum Jahresende wird sie gegen die tatsächliche Array-Summe abgeglichen.
+        self.depotwert = 0.0
+
+    def run_simulation(self) -> (pd.DataFrame, List[Dict[str, Any]], np.ndarray):
         """
         Diese Funktion startet die komplette Simulation.
         Sie ruft alle anderen Methoden monatlich auf, bis die gesamte Laufzeit
@@ -120,8 +186,29 @@ class SparplanSimulator:
         for month in range(self.params.laufzeit * 12):  # Eine Schleife, die jeden Monat einzeln durchspielt.
             self._simuliere_monat(month)
         self._finalisiere_simulation()  # Führt die finalen Berechnungen am Ende der Laufzeit durch.
-        df_kosten = pd.DataFrame(self.monatliche_kosten_logs)  # Erstellt eine Tabelle aus den gesammelten Log-Daten.
-        return df_kosten, self.rebalancing_log, self.cashflows
+        # Erstellt eine Tabelle aus den gesammelten Log-Daten und stellt das Datum als erste Spalte voran.
+        df_kosten = pd.DataFrame(self.log_werte, columns=LOG_SPALTEN)
+        df_kosten.insert(0, "Datum", list(self.monatsanfaenge))
+        return df_kosten, self._rebalancing_log(), self.cf_betrag[:self.cf_n].copy()
+
+    def _rebalancing_log(self) -> List[Dict[str, Any]]:
+        """
+        Wandelt die belegten Zeilen des Rebalancing-Arrays in eine Liste um, mit einem Wörterbuch
+        (Datum, Bruttoverkauf, Steuer, Netto reinvestiert) je Rebalancing-Vorgang.
+        """
+        return [{"Datum": datetime.date.fromordinal(int(d)), **dict(zip(REBALANCING_SPALTEN, zeile))}
+                for d, zeile in zip(self.rebal_date_ordinal[:self.rebal_n], self.rebal_werte[:self.rebal_n].tolist())]
+
+    def depotwert_nach_monat(self, monat: int) -> float:
+        """
+        Simuliert nur bis einschließlich des angegebenen Monats und gibt den Depotwert zurück.
+        Die Monte-Carlo-Simulation braucht nur diesen einen Wert, daher entfallen die restlichen
+        Monate, die Schlussbesteuerung und das Erstellen der Tabelle.
+        """
+        self._initialisiere_simulation()
+        for month in range(monat + 1):
+            self._simuliere_monat(month)
+        return self.depotwert
 
     def _initialisiere_simulation(self):
         """
@@ -145,22 +232,66 @@ class SparplanSimulator:
             self.params.abschlusskosten_monatlich_prozent = 0.0
             self.params.verwaltungskosten_monatlich_prozent = 0.0
 
+        # Werte, die sich während der Laufzeit nicht ändern, werden hier einmal berechnet,
+        # statt sie in jedem Monat neu auszurechnen.
+        anzahl_monate = self.params.laufzeit * 12
+        self.beitrags_ende = self.params.beitragszahldauer * 12  # Erster Monat ohne Einzahlung.
+        self.wachstumsfaktor = 1 + self.params.monthly_return  # Wertentwicklung eines Monats.
+        self.steuerpflichtiger_anteil = 1 - self.params.teilfreistellung  # Anteil der Erträge nach Teilfreistellung.
+        self.effektiver_steuersatz = min(self.params.full_tax_rate, self.params.persoenlicher_steuersatz)
+
+        # Die Einzahlungen stehen schon vor dem Start für jeden Monat fest und werden als Zahlungspläne
+        # vorberechnet. Die Sparrate mit Dynamik ergibt sich als fortlaufendes Produkt: Der erste Faktor ist
+        # der Startbeitrag, danach steht in jedem Erhöhungsmonat der Faktor (1 + Dynamik), sonst 1.
+        faktoren = np.ones(anzahl_monate)
+        faktoren[self.params.dynamik_turnus_monate::self.params.dynamik_turnus_monate] = (
+                1 + self.params.monthly_dynamik_rate)
+        faktoren[0] = self.monthly_investment
+        self.einzahlung_plan = np.cumprod(faktoren).tolist()
+        # Sonderzahlungen: regelmäßige ab dem ersten Turnus; die einmalige hat im selben Monat Vorrang.
+        sonderzahlungen = np.zeros(anzahl_monate)
+        turnus = self.params.regel_sonderzahlung_turnus_jahre * 12
+        if turnus > 0:
+            sonderzahlungen[turnus::turnus] = self.params.regel_sonderzahlung_betrag
+        if 0 <= self.params.sonderzahlung_jahr * 12 < anzahl_monate:
+            sonderzahlungen[self.params.sonderzahlung_jahr * 12] = self.params.sonderzahlung_betrag
+        self.sonderzahlung_plan = sonderzahlungen.tolist()
+        # Abschlusskosten je Monat; nach der Verrechnungsdauer fallen keine mehr an.
+        verrechnung = min(self.params.verrechnungsdauer_monate, anzahl_monate)
+        abschlusskosten = np.zeros(anzahl_monate)
+        abschlusskosten[:verrechnung] = (np.add(self.abschlusskosten_einmalig_rest[:verrechnung],
+                                                self.abschlusskosten_monatlich_rest[:verrechnung]))
+        self.abschlusskosten_plan = abschlusskosten.tolist()
+
         # Verarbeitet die erste, einmalige Anfangsinvestition.
         aufschlag = self.params.initial_investment * self.params.ausgabeaufschlag
         nettobetrag = self.params.initial_investment - aufschlag
         self.ausgabeaufschlag_summe += aufschlag
-        self.cashflows.append(-self.params.initial_investment)  # Die Einzahlung wird als negativer Cashflow erfasst.
+        self._cashflow_buchen(-self.params.initial_investment)  # Die Einzahlung wird als negativer Cashflow erfasst.
 
         if nettobetrag > 0:
             # Die erste Investition wird zum Portfolio hinzugefügt.
-            self.portfolio.append({
-                "date": datetime.date(2025, 1, 1),
-                "amount_invested": nettobetrag,
-                "units": nettobetrag,
-                "value": nettobetrag,
-                "start_of_prev_year_value": nettobetrag,
-                "vorabpauschalen_bereits_versteuert": 0.0
-            })
+            self._posten_anhaengen(datetime.date(2025, 1, 1), nettobetrag)
+
+    def _posten_anhaengen(self, datum, netto):
+        """Hängt eine neue Investition als jüngsten Posten an das Ende der Depot-Arrays an."""
+        i = self.depot_ende
+        self.p_value[i] = netto
+        self.p_amount_invested[i] = netto
+        self.p_start_of_prev_year_value[i] = netto
+        self.p_vorab_versteuert[i] = 0.0
+        self.p_date_ordinal[i] = datum.toordinal()
+        self.depot_ende = i + 1
+        self.depotwert += netto
+
+    def _cashflow_buchen(self, betrag):
+        """Trägt einen Cashflow in das nächste freie Feld des Cashflow-Arrays ein."""
+        self.cf_betrag[self.cf_n] = betrag
+        self.cf_n += 1
+
+    def _depotwert(self):
+        """Summiert den Wert aller aktuell vorhandenen Posten."""
+        return float(np.add.reduce(self.p_value[self.depot_start:self.depot_ende]))
 
     def _simuliere_monat(self, month: int):
         """
@@ -168,235 +299,232 @@ class SparplanSimulator:
         Sie führt die monatlichen Aktionen in der korrekten Reihenfolge aus:
         Einzahlung -> Kosten -> Steuern -> Rebalancing -> Wertentwicklung -> Entnahmen.
         """
-        current_date = datetime.date(2025, 1, 1) + relativedelta(months=month)
-        is_january = current_date.month == 1
+        current_date = self.monatsanfaenge[month]
+        # Der Kalendermonat folgt direkt aus der Monatsnummer (0 = Januar, 11 = Dezember),
+        # dafür muss das Datum nicht ausgewertet werden.
+        monat_im_jahr = month % 12
+        is_january = monat_im_jahr == 0
+        is_december = monat_im_jahr == 11
 
         if is_january:
             # Setzt den Freistellungsauftrag zu Beginn jedes Jahres zurück.
             self.freistellungs_topf = self.params.freistellungsauftrag_jahr
 
         self._handle_monthly_investment(month, current_date)  # Verarbeitet monatliche Sparraten.
-        self._handle_costs(month, current_date)  # Berechnet und zieht die Kosten ab.
-        self._handle_taxes(current_date)  # Berechnet die Steuern (Vorabpauschale).
-        self._handle_rebalancing(current_date)  # Führt ein Rebalancing durch.
+        self._handle_costs(month, is_january)  # Berechnet und zieht die Kosten ab.
+        self._handle_taxes(is_january)  # Berechnet die Steuern (Vorabpauschale).
+        self._handle_rebalancing(current_date, is_december)  # Führt ein Rebalancing durch.
 
-        # Die Wertentwicklung des Portfolios basierend auf der monatlichen Rendite.
-        for entry in self.portfolio:
-            entry["value"] *= (1 + self.params.monthly_return)
+        # Die Wertentwicklung des Portfolios basierend auf der monatlichen Rendite
+        # (eine einzige Multiplikation für alle Posten auf einmal).
+        self.p_value[self.depot_start:self.depot_ende] *= self.wachstumsfaktor
+        self.depotwert *= self.wachstumsfaktor
 
-        self._handle_withdrawals(month, current_date)  # Verarbeitet Entnahmen in der Entnahmephase.
+        self._handle_withdrawals(month)  # Verarbeitet Entnahmen in der Entnahmephase.
 
         # Der aktuelle Stand des Depots und die Kosten werden für diesen Monat protokolliert.
-        depotwert = sum(e["value"] for e in self.portfolio)
-        self.monatliche_kosten_logs.append({
-            "Datum": current_date, "Depotwert": depotwert, "Ausgabeaufschlag kum": self.ausgabeaufschlag_summe,
-            "Rücknahmeabschlag kum": self.ruecknahmeabschlag_summe, "Stückkosten kum": self.stueckkosten_summe,
-            "Gesamtfondkosten kum": self.ter_summe, "Serviceentgelt kum": self.serviceentgelt_summe,
-            "Abschlusskosten kum": self.abschlusskosten_summe, "Verwaltungskosten kum": self.verwaltungskosten_summe,
-            "Steuern kumuliert": self.total_tax_paid, "Kumulierte Entnahmen": self.kumulierte_entnahmen
-        })
-
-        if current_date.month == 12:
+        self._log_schreiben(month, self.depotwert)
+
+        if is_december:
             # Speichert den Wert des Depots am Jahresende für die Vorabpauschale des nächsten Jahres.
-            for entry in self.portfolio:
-                entry["start_of_prev_year_value"] = entry["value"]
+            a, e = self.depot_start, self.depot_ende
+            self.p_start_of_prev_year_value[a:e] = self.p_value[a:e]
+            # Gleicht die laufende Summe mit der echten Summe ab, damit sich keine Rundungsfehler ansammeln.
+            self.depotwert = self._depotwert()
 
     def _handle_monthly_investment(self, month, current_date):
         """Verarbeitet alle Arten von Einzahlungen."""
-        # Anpassung der monatlichen Rate basierend auf der Dynamik.
-        if month > 0 and month % self.params.dynamik_turnus_monate == 0:
-            self.monthly_investment *= (1 + self.params.monthly_dynamik_rate)
-
-        is_einmalig = month == self.params.sonderzahlung_jahr * 12
-        is_regelmaessig = (self.params.regel_sonderzahlung_turnus_jahre > 0 and month > 0 and month % (
-                self.params.regel_sonderzahlung_turnus_jahre * 12) == 0)
+        # Die monatliche Rate (inklusive Dynamik) steht im vorberechneten Zahlungsplan.
+        self.monthly_investment = self.einzahlung_plan[month]
 
         # Verarbeitung von Sonderzahlungen, falls fällig.
-        if is_einmalig or is_regelmaessig:
-            betrag = (self.params.sonderzahlung_betrag if is_einmalig else self.params.regel_sonderzahlung_betrag)
-            if betrag > 0:
-                self.cashflows.append(-betrag)  # Sonderzahlung wird als negativer Cashflow erfasst.
-                if not self.params.versicherung_modus:
-                    aufschlag = betrag * self.params.ausgabeaufschlag
-                    netto = betrag - aufschlag
-                    self.ausgabeaufschlag_summe += aufschlag
-                else:
-                    netto = betrag
-                self.portfolio.append(
-                    {"date": current_date, "amount_invested": netto, "value": netto, "start_of_prev_year_value": netto,
-                     "vorabpauschalen_bereits_versteuert": 0.0})
+        betrag = self.sonderzahlung_plan[month]
+        if betrag > 0:
+            self._cashflow_buchen(-betrag)  # Sonderzahlung wird als negativer Cashflow erfasst.
+            if not self.params.versicherung_modus:
+                aufschlag = betrag * self.params.ausgabeaufschlag
+                netto = betrag - aufschlag
+                self.ausgabeaufschlag_summe += aufschlag
+            else:
+                netto = betrag
+            self._posten_anhaengen(current_date, netto)
 
         # Verarbeitung der monatlichen Einzahlung, solange die Beitragszahldauer noch läuft.
-        if month < self.params.beitragszahldauer * 12:
+        if month < self.beitrags_ende:
             aufschlag = self.monthly_investment * self.params.ausgabeaufschlag
             netto = self.monthly_investment - aufschlag
             self.ausgabeaufschlag_summe += aufschlag
-            self.cashflows.append(
-                -self.monthly_investment)  # Monatliche Einzahlung wird als negativer Cashflow erfasst.
-            self.portfolio.append(
-                {"date": current_date, "amount_invested": netto, "value": netto, "start_of_prev_year_value": netto,
-                 "vorabpauschalen_bereits_versteuert": 0.0})
+            self._cashflow_buchen(-self.monthly_investment)  # Monatliche Einzahlung wird als negativer Cashflow erfasst.
+            self._posten_anhaengen(current_date, netto)
 
-    def _handle_costs(self, month, current_date):
+    def _handle_costs(self, month, is_january):
         """Berechnet und zieht die monatlichen und jährlichen Kosten ab."""
-        depotwert = sum(e["value"] for e in self.portfolio) if self.portfolio else 0
+        # Alle Kosten werden anteilig zum Depotwert vom Monatsbeginn auf die Posten verteilt. Das heißt, jeder
+        # Posten schrumpft um den Faktor (1 - kosten / depotwert). Die Faktoren aller Kostenarten werden zu
+        # einem Produkt zusammengefasst und am Ende in einem einzigen Schritt angewendet.
+        depotwert = self.depotwert
+        faktor = 1.0
         # Kosten, die nur bei einem Versicherungs-Sparplan anfallen.
-        if self.params.versicherung_modus and month < self.params.beitragszahldauer * 12:
+        if self.params.versicherung_modus and month < self.beitrags_ende:
             verwaltungskosten = self.monthly_investment * self.params.verwaltungskosten_monatlich_prozent
-            for entry in self.portfolio:
-                anteil = entry["value"] / depotwert if depotwert > 0 else 0
-                entry["value"] -= verwaltungskosten * anteil
+            if depotwert > 0:
+                faktor *= 1 - verwaltungskosten / depotwert
             self.verwaltungskosten_summe += verwaltungskosten
 
-            if month < self.params.verrechnungsdauer_monate:
-                abschluss_kosten = (
-                        self.abschlusskosten_einmalig_rest[month] + self.abschlusskosten_monatlich_rest[month])
-                for entry in self.portfolio:
-                    anteil = entry["value"] / depotwert if depotwert > 0 else 0
-                    entry["value"] -= abschluss_kosten * anteil
-                self.abschlusskosten_summe += abschluss_kosten
+            abschluss_kosten = self.abschlusskosten_plan[month]
+            if abschluss_kosten and depotwert > 0:
+                faktor *= 1 - abschluss_kosten / depotwert
+            self.abschlusskosten_summe += abschluss_kosten
 
         # Kosten, die jährlich anfallen, wie die Gesamtkostenquote (TER) und Servicegebühren.
-        if current_date.month == 1:
+        if is_january:
             if depotwert > 0:
                 fond_kosten = depotwert * self.params.ter
                 service_kosten = depotwert * self.params.serviceentgelt
                 stueck_kosten = self.params.stueckkosten
 
                 total_kosten = fond_kosten + service_kosten + stueck_kosten
-
-                for entry in self.portfolio:
-                    anteil = entry["value"] / depotwert if depotwert > 0 else 0
-                    entry["value"] -= total_kosten * anteil
+                faktor *= 1 - total_kosten / depotwert
 
                 self.ter_summe += fond_kosten
                 self.serviceentgelt_summe += service_kosten
                 self.stueckkosten_summe += stueck_kosten
 
-    def _handle_taxes(self, current_date):
+        if faktor != 1.0:
+            self.p_value[self.depot_start:self.depot_ende] *= faktor
+            self.depotwert *= faktor
+
+    def _handle_taxes(self, is_january):
         """Berechnet und zieht die jährliche Vorabpauschale ab (nur bei Depots)."""
-        is_january = current_date.month == 1
         if not self.params.versicherung_modus and is_january:
-            for entry in self.portfolio:
-                start_value = entry["start_of_prev_year_value"]
-                fiktiver_ertrag = start_value * self.params.basiszins
-                real_ertrag = entry["value"] - start_value
-                steuerbarer_ertrag = min(fiktiver_ertrag, real_ertrag)
-                steuerfreibetrag = min(self.freistellungs_topf, steuerbarer_ertrag * (1 - self.params.teilfreistellung))
-                zu_versteuern = max(0, (steuerbarer_ertrag * (1 - self.params.teilfreistellung)) - steuerfreibetrag)
-                steuer = max(0, zu_versteuern * self.params.full_tax_rate)
-
-                if steuer > 0:
-                    entry["value"] -= steuer
-                    entry["vorabpauschalen_bereits_versteuert"] += zu_versteuern
-                    self.total_tax_paid += steuer
-                    self.freistellungs_topf -= steuerfreibetrag
-
-    def _handle_rebalancing(self, current_date):
+            a, e = self.depot_start, self.depot_ende
+            if a == e:
+                return
+            # Die Rechnung läuft für alle Posten gleichzeitig über die Arrays.
+            start_value = self.p_start_of_prev_year_value[a:e]
+            fiktiver_ertrag = start_value * self.params.basiszins
+            real_ertrag = self.p_value[a:e] - start_value
+            steuerbarer_ertrag = np.minimum(fiktiver_ertrag, real_ertrag) * self.steuerpflichtiger_anteil
+
+            # Der Freistellungstopf wird der Reihe nach (FIFO) vom Ertrag jedes Postens verbraucht,
+            # auch wenn der Posten selbst unter dem Topf bleibt und keine Steuer zahlt. Die laufende
+            # Summe der Erträge, am Topf gekappt, zeigt, wie viel Topf nach jedem Posten verbraucht ist;
+            # die Differenz zum Vorgänger ist der Freibetrag dieses Postens. Verluste füllen ihn nicht auf.
+            # Auch eine Vorabpauschale, die ganz vom Topf gedeckt ist, gilt als versteuert und wird
+            # beim späteren Verkauf vom Gewinn abgezogen.
+            verbraucht = np.minimum(np.cumsum(np.maximum(steuerbarer_ertrag, 0)), self.freistellungs_topf)
+            steuerfreibetrag = np.diff(verbraucht, prepend=0.0)
+            self.freistellungs_topf -= float(verbraucht[-1])
+
+            zu_versteuern = np.maximum(0, steuerbarer_ertrag - steuerfreibetrag)
+            steuer = zu_versteuern * self.params.full_tax_rate
+            self.p_vorab_versteuert[a:e] += np.maximum(steuerbarer_ertrag, 0)
+
+            mit_steuer = steuer > 0
+            if mit_steuer.any():
+                self.p_value[a:e][mit_steuer] -= steuer[mit_steuer]
+                steuer_summe = float(steuer[mit_steuer].sum())
+                self.total_tax_paid += steuer_summe
+                self.depotwert -= steuer_summe
+
+    def _handle_rebalancing(self, current_date, is_december):
         """
         Führt ein jährliches Rebalancing durch, um die gewünschte Verteilung im Depot zu halten.
         Dabei werden Anteile verkauft und der Erlös wieder investiert.
         """
-        if not self.params.versicherung_modus and current_date.month == 12 and self.params.rebalancing_rate > 0:
-            depotwert = sum(e["value"] for e in self.portfolio)
+        if not self.params.versicherung_modus and is_december and self.params.rebalancing_rate > 0:
+            depotwert = self.depotwert
             umzuschichten = depotwert * self.params.rebalancing_rate
             if umzuschichten > 0:
-                remaining = umzuschichten
-                temp_queue = deque()
-                total_verkauf = 0.0
-                total_steuer = 0.0
-                total_netto = 0.0
-                while remaining > 1e-9 and self.portfolio:
-                    entry = self.portfolio.popleft()  # Die ältesten Positionen werden zuerst verkauft (FIFO-Prinzip).
-                    if entry["value"] <= 0: continue
-                    sell_value = min(entry["value"], remaining)
-                    prop = sell_value / entry["value"]
-                    cost_basis = entry["amount_invested"] * prop
-                    gain = sell_value - cost_basis
-                    steuerbarer_gewinn = gain * (1 - self.params.teilfreistellung)
-                    vorab_used = min(entry.get("vorabpauschalen_bereits_versteuert", 0.0) * prop, steuerbarer_gewinn)
-                    steuerbarer_gewinn = max(0.0, steuerbarer_gewinn - vorab_used)
-                    steuerfreibetrag = min(self.freistellungs_topf, steuerbarer_gewinn)
-                    self.freistellungs_topf -= steuerfreibetrag
-                    effektiver_steuersatz = min(self.params.full_tax_rate, self.params.persoenlicher_steuersatz)
-                    steuer = max(0.0, (steuerbarer_gewinn - steuerfreibetrag) * effektiver_steuersatz)
-                    ruecknahmeabschlag = sell_value * self.params.ruecknahmeabschlag
-                    netto_reinvest = sell_value - steuer - ruecknahmeabschlag
-
-                    self.total_tax_paid += steuer
-                    self.ruecknahmeabschlag_summe += ruecknahmeabschlag
-                    total_verkauf += sell_value
-                    total_steuer += steuer
-                    total_netto += netto_reinvest
-
-                    entry["value"] -= sell_value
-                    entry["amount_invested"] -= cost_basis
-                    entry["vorabpauschalen_bereits_versteuert"] = max(0.0,
-                                                                      entry.get("vorabpauschalen_bereits_versteuert",
-                                                                                0.0) - vorab_used)
-                    if entry["value"] > 1e-9:
-                        temp_queue.append(entry)
-                    remaining -= sell_value
-
-                self.portfolio = deque(list(temp_queue) + list(self.portfolio))
+                # Die ältesten Positionen werden zuerst verkauft (FIFO-Prinzip). Über die laufende Summe der
+                # Postenwerte lässt sich für jeden Posten ablesen, wie viel nach den älteren Posten noch offen ist;
+                # verkauft wird aus allen Posten, bei denen noch mehr als 1e-9 offen ist.
+                a, e = self.depot_start, self.depot_ende
+                positive_werte = np.maximum(self.p_value[a:e], 0.0)
+                offen = umzuschichten - (np.cumsum(positive_werte) - positive_werte)
+                k = int(np.count_nonzero(offen > 1e-9))
+                b = a + k
+
+                werte = self.p_value[a:b]
+                sell_value = np.minimum(positive_werte[:k], offen[:k])
+                prop = np.divide(sell_value, werte, out=np.zeros(k), where=sell_value > 0)
+                cost_basis = self.p_amount_invested[a:b] * prop
+                gain = sell_value - cost_basis
+                steuerbarer_gewinn = gain * self.steuerpflichtiger_anteil
+                vorab_used = np.minimum(self.p_vorab_versteuert[a:b] * prop, steuerbarer_gewinn)
+                steuerbarer_gewinn = np.maximum(0.0, steuerbarer_gewinn - vorab_used)
+
+                # Der Freistellungstopf wird in derselben FIFO-Reihenfolge aufgebraucht.
+                verbraucht = np.minimum(np.cumsum(steuerbarer_gewinn), self.freistellungs_topf)
+                steuerfreibetrag = np.diff(verbraucht, prepend=0.0)
+                if k:
+                    self.freistellungs_topf -= float(verbraucht[-1])
+
+                steuer = np.maximum(0.0, (steuerbarer_gewinn - steuerfreibetrag) * self.effektiver_steuersatz)
+                total_verkauf = float(np.add.reduce(sell_value))
+                total_steuer = float(np.add.reduce(steuer))
+                ruecknahmeabschlag = total_verkauf * self.params.ruecknahmeabschlag
+                total_netto = total_verkauf - total_steuer - ruecknahmeabschlag
+
+                self.total_tax_paid += total_steuer
+                self.ruecknahmeabschlag_summe += ruecknahmeabschlag
+                self.depotwert -= total_verkauf
+
+                werte -= sell_value
+                self.p_amount_invested[a:b] -= cost_basis
+                self.p_vorab_versteuert[a:b] = np.maximum(0.0, self.p_vorab_versteuert[a:b] - vorab_used)
+                # Alle verkauften Posten außer dem letzten sind vollständig weg; der letzte bleibt nur mit Restwert.
+                self.depot_start = b - 1 if k and werte[-1] > 1e-9 else b
                 if total_netto > 1e-9:
-                    self.portfolio.append({"date": current_date, "amount_invested": total_netto, "value": total_netto,
-                                           "start_of_prev_year_value": total_netto,
-                                           "vorabpauschalen_bereits_versteuert": 0.0})
-                self.rebalancing_log.append(
-                    {"Datum": current_date, "Bruttoverkauf": total_verkauf, "Steuer": total_steuer,
-                     "Netto reinvestiert": total_netto})
-
-    def _handle_withdrawals(self, month, current_date):
+                    self._posten_anhaengen(current_date, total_netto)  # Der Erlös wird als neuer Posten reinvestiert.
+                # Der Vorgang wird in die nächste freie Zeile des Rebalancing-Arrays eingetragen.
+                self.rebal_werte[self.rebal_n] = (total_verkauf, total_steuer, total_netto)
+                self.rebal_date_ordinal[self.rebal_n] = current_date.toordinal()
+                self.rebal_n += 1
+
+    def _handle_withdrawals(self, month):
         """Verarbeitet Entnahmen in der Entnahmephase."""
         # Überprüft, ob die Entnahmephase begonnen hat.
-        if month >= self.params.beitragszahldauer * 12:
-            depotwert = sum(e["value"] for e in self.portfolio)
+        if month >= self.beitrags_ende:
+            depotwert = self.depotwert
             entnahme_betrag = 0
-            # Bestimmt, ob die Entnahme jährlich oder monatlich erfolgt.
-            if self.params.entnahme_modus == "jährlich" and current_date.month == 1:
-                entnahme_betrag = min(self.params.annual_withdrawal, depotwert)
-            elif self.params.entnahme_modus == "monatlich":
-                entnahme_betrag = min(self.params.annual_withdrawal / 12, depotwert)
+            # Entnommen wird nur in Monaten, die auf das Intervall der Entnahme-Strategie fallen.
+            if self.entnahme_intervall and month % self.entnahme_intervall == 0:
+                entnahme_betrag = min(self.entnahme_je_intervall, depotwert)
 
             if entnahme_betrag >= 0:
-                self.cashflows.append(entnahme_betrag)  # Die Entnahme wird als positiver Cashflow erfasst.
-
-                remaining_entnahme = entnahme_betrag
+                self._cashflow_buchen(entnahme_betrag)  # Die Entnahme wird als positiver Cashflow erfasst.
 
                 # Die Entnahme wird aus den ältesten Portfolio-Positionen genommen, um die Buchführung zu vereinfachen.
-                if self.portfolio:
-                    oldest_entry = self.portfolio.popleft()
-
-                    if oldest_entry["value"] >= remaining_entnahme:
-                        oldest_entry["value"] -= remaining_entnahme
-                        self.kumulierte_entnahmen += remaining_entnahme
-                        if oldest_entry["value"] > 1e-9:
-                            self.portfolio.appendleft(oldest_entry)
-                    else:
-                        remaining_entnahme -= oldest_entry["value"]
-                        self.kumulierte_entnahmen += oldest_entry["value"]
-
-                        while remaining_entnahme > 1e-9 and self.portfolio:
-                            current_entry = self.portfolio.popleft()
-                            if current_entry["value"] >= remaining_entnahme:
-                                current_entry["value"] -= remaining_entnahme
-                                self.kumulierte_entnahmen += remaining_entnahme
-                                if current_entry["value"] > 1e-9:
-                                    self.portfolio.appendleft(current_entry)
-                                remaining_entnahme = 0
-                            else:
-                                remaining_entnahme -= current_entry["value"]
-                                self.kumulierte_entnahmen += current_entry["value"]
+                # Vollständig geleerte Posten fallen vorne aus dem Depot heraus (depot_start rückt weiter).
+                remaining_entnahme = entnahme_betrag
+                entnommen = 0.0
+                i = self.depot_start
+                while i < self.depot_ende:
+                    value = self.p_value[i]
+                    if value >= remaining_entnahme:
+                        self.p_value[i] = value - remaining_entnahme
+                        entnommen += remaining_entnahme
+                        if self.p_value[i] <= 1e-9:
+                            i += 1
+                        break
+                    remaining_entnahme -= value
+                    entnommen += value
+                    i += 1
+                    if remaining_entnahme <= 1e-9:
+                        break
+                self.depot_start = i
+                self.kumulierte_entnahmen += entnommen
+                self.depotwert = self.depotwert - entnommen if i < self.depot_ende else 0.0
 
     def _finalisiere_simulation(self):
         """
         Führt die letzten Berechnungen am Ende der Laufzeit durch,
         insbesondere die Besteuerung des finalen Restwerts.
         """
-        restwert = sum(e["value"] for e in self.portfolio)
-        investiert = sum(e["amount_invested"] for e in self.portfolio)
-        end_datum = datetime.date(2025, 1, 1) + relativedelta(months=self.params.laufzeit * 12)
+        a, e = self.depot_start, self.depot_ende
+        restwert = float(self.p_value[a:e].sum())
+        investiert = float(self.p_amount_invested[a:e].sum())
 
         if restwert > 1e-9:
             gewinn = max(0.0, restwert - investiert)
@@ -408,33 +536,202 @@ class SparplanSimulator:
                 steuer = gewinn * (
                     0.5 if aktuelle_alter >= 62 and aktuelle_laufzeit >= 12 else 0.85) * self.params.persoenlicher_steuersatz
             else:
-                steuerbar = gewinn * (1 - self.params.teilfreistellung)
-                bereits_versteuert = sum(e.get("vorabpauschalen_bereits_versteuert", 0.0) for e in self.portfolio)
+                steuerbar = gewinn * self.steuerpflichtiger_anteil
+                bereits_versteuert = float(self.p_vorab_versteuert[a:e].sum())
                 steuerbar = max(0.0, steuerbar - bereits_versteuert)
-                effektiver_steuersatz = min(self.params.full_tax_rate, self.params.persoenlicher_steuersatz)
-                steuer = steuerbar * effektiver_steuersatz
+                steuer = steuerbar * self.effektiver_steuersatz
 
             ruecknahmeabschlag = restwert * self.params.ruecknahmeabschlag
             self.total_tax_paid += steuer
             self.ruecknahmeabschlag_summe += ruecknahmeabschlag
             restwert_net = restwert - steuer - ruecknahmeabschlag
-            self.cashflows.append(restwert_net)  # Der Netto-Verkauf am Ende wird als letzter Cashflow erfasst.
+            self._cashflow_buchen(restwert_net)  # Der Netto-Verkauf am Ende wird als letzter Cashflow erfasst.
             self.kumulierte_entnahmen += restwert_net
 
         # Führt den letzten Eintrag in das monatliche Log ein, der das Ende der Simulation darstellt.
-        self.monatliche_kosten_logs.append({
-            "Datum": end_datum, "Depotwert": 0, "Ausgabeaufschlag kum": self.ausgabeaufschlag_summe,
-            "Rücknahmeabschlag kum": self.ruecknahmeabschlag_summe, "Stückkosten kum": self.stueckkosten_summe,
-            "Gesamtfondkosten kum": self.ter_summe, "Serviceentgelt kum": self.serviceentgelt_summe,
-            "Abschlusskosten kum": self.abschlusskosten_summe, "Verwaltungskosten kum": self.verwaltungskosten_summe,
-            "Steuern kumuliert": self.total_tax_paid, "Kumulierte Entnahmen": self.kumulierte_entnahmen
-        })
+        self._log_schreiben(self.params.laufzeit * 12, 0.0)
+
+    def _log_schreiben(self, index, depotwert):
+        """Schreibt den Depotwert und alle kumulierten Kosten in Zeile `index` des Log-Arrays."""
+        self.log_werte[index] = (
+            depotwert, self.ausgabeaufschlag_summe, self.ruecknahmeabschlag_summe, self.stueckkosten_summe,
+            self.ter_summe, self.serviceentgelt_summe, self.abschlusskosten_summe, self.verwaltungskosten_summe,
+            self.total_tax_paid, self.kumulierte_entnahmen
+        )
+
+
+class SparplanSimulatorMC(SparplanSimulator):
+    """
+    Diese Variante des Simulators rechnet alle Durchläufe einer Monte-Carlo-Simulation
+    gleichzeitig. Statt einer einzelnen Rendite enthält params.annual_return ein Array mit
+    einer zufälligen Rendite je Durchlauf. Die Depot-Arrays bekommen dafür eine zweite
+    Dimension (Posten x Durchläufe), sodass jede Rechnung in einem Schritt für alle
+    Durchläufe erledigt wird. Einzahlungen, Wertentwicklung und Jahreswechsel übernimmt
+    die Basisklasse unverändert; Kosten, Steuern, Rebalancing und Entnahmen werden hier
+    spaltenweise (je Durchlauf) gerechnet. Ein Kosten- oder Rebalancing-Log wird nicht geführt.
+    """
+
+    def _depot_anlegen(self, max_posten):
+        """Legt die Depot-Arrays mit einer Spalte je Durchlauf an."""
+        anzahl_laeufe = len(self.params.annual_return)
+        self.p_value = np.zeros((max_posten, anzahl_laeufe))
+        self.p_amount_invested = np.zeros((max_posten, anzahl_laeufe))
+        self.p_start_of_prev_year_value = np.zeros((max_posten, anzahl_laeufe))
+        self.p_vorab_versteuert = np.zeros((max_posten, anzahl_laeufe))
+        self.depotwert = np.zeros(anzahl_laeufe)  # Ein Depotwert je Durchlauf.
+
+    def _depotwert(self):
+        """Summiert die Posten getrennt für jeden Durchlauf."""
+        return self.p_value[self.depot_start:self.depot_ende].sum(axis=0)
+
+    def _log_schreiben(self, index, depotwert):
+        """Die Monte-Carlo-Simulation braucht kein monatliches Log."""
+        pass
+
+    def _kopf_nachziehen(self):
+        """Entfernt vorne alle Posten, die in sämtlichen Durchläufen vollständig verkauft sind."""
+        # Ein Posten kann in einem Durchlauf schon leer sein und in einem anderen noch nicht. Leere Posten
+        # stehen deshalb auf 0 und fallen erst heraus, wenn sie in allen Durchläufen leer sind.
+        while self.depot_start < self.depot_ende and not self.p_value[self.depot_start].any():
+            self.depot_start += 1
+
+    def _handle_costs(self, month, is_january):
+        """Berechnet die Kosten wie die Basisklasse, aber mit einem Kostenfaktor je Durchlauf."""
+        depotwert = self.depotwert
+        positiv = depotwert > 0  # Kosten werden nur in Durchläufen mit positivem Depotwert verteilt.
+        teiler = np.where(positiv, depotwert, 1.0)
+        faktor = np.ones_like(depotwert)
+        if self.params.versicherung_modus and month < self.beitrags_ende:
+            verwaltungskosten = self.monthly_investment * self.params.verwaltungskosten_monatlich_prozent
+            faktor = np.where(positiv, faktor * (1 - verwaltungskosten / teiler), faktor)
+            self.verwaltungskosten_summe += verwaltungskosten
+
+            abschluss_kosten = self.abschlusskosten_plan[month]
+            if abschluss_kosten:
+                faktor = np.where(positiv, faktor * (1 - abschluss_kosten / teiler), faktor)
+            self.abschlusskosten_summe += abschluss_kosten
+
+        if is_january:
+            fond_kosten = np.where(positiv, depotwert * self.params.ter, 0.0)
+            service_kosten = np.where(positiv, depotwert * self.params.serviceentgelt, 0.0)
+            stueck_kosten = np.where(positiv, self.params.stueckkosten, 0.0)
+            total_kosten = fond_kosten + service_kosten + stueck_kosten
+            faktor = np.where(positiv, faktor * (1 - total_kosten / teiler), faktor)
+
+            self.ter_summe += fond_kosten
+            self.serviceentgelt_summe += service_kosten
+            self.stueckkosten_summe += stueck_kosten
+
+        self.p_value[self.depot_start:self.depot_ende] *= faktor
+        self.depotwert = depotwert * faktor
+
+    def _handle_taxes(self, is_january):
+        """Berechnet die Vorabpauschale für alle Durchläufe gleichzeitig (nur bei Depots)."""
+        if not self.params.versicherung_modus and is_january:
+            a, e = self.depot_start, self.depot_ende
+            if a == e:
+                return
+            start_value = self.p_start_of_prev_year_value[a:e]
+            fiktiver_ertrag = start_value * self.params.basiszins
+            real_ertrag = self.p_value[a:e] - start_value
+            steuerbarer_ertrag = np.minimum(fiktiver_ertrag, real_ertrag) * self.steuerpflichtiger_anteil
+
+            # Wie in der Basisklasse: Der Topf wird in FIFO-Reihenfolge vom Ertrag jedes Postens
+            # verbraucht. Die laufende Summe läuft entlang der Posten, also für jeden Durchlauf getrennt.
+            verbraucht = np.minimum(np.cumsum(np.maximum(steuerbarer_ertrag, 0), axis=0), self.freistellungs_topf)
+            steuerfreibetrag = np.diff(verbraucht, axis=0, prepend=0.0)
+            self.freistellungs_topf = self.freistellungs_topf - verbraucht[-1]
+
+            zu_versteuern = np.maximum(0, steuerbarer_ertrag - steuerfreibetrag)
+            steuer = zu_versteuern * self.params.full_tax_rate
+
+            self.p_value[a:e] -= steuer
+            self.p_vorab_versteuert[a:e] += np.maximum(steuerbarer_ertrag, 0)
+            steuer_summe = steuer.sum(axis=0)
+            self.total_tax_paid += steuer_summe
+            self.depotwert = self.depotwert - steuer_summe
+
+    def _handle_rebalancing(self, current_date, is_december):
+        """Führt das jährliche Rebalancing für alle Durchläufe gleichzeitig durch."""
+        if not self.params.versicherung_modus and is_december and self.params.rebalancing_rate > 0:
+            a, e = self.depot_start, self.depot_ende
+            if a == e:
+                return
+            umzuschichten = self.depotwert * self.params.rebalancing_rate
+            werte = self.p_value[a:e]
+
+            # FIFO: Jeder Posten wird mit dem Betrag verkauft, der nach allen älteren Posten noch offen ist.
+            positive_werte = np.maximum(werte, 0.0)
+            offen = umzuschichten - (np.cumsum(positive_werte, axis=0) - positive_werte)
+            besucht = offen > 1e-9
+            sell_value = np.where(besucht, np.minimum(positive_werte, offen), 0.0)
+            prop = np.divide(sell_value, werte, out=np.zeros_like(werte), where=sell_value > 0)
+            cost_basis = self.p_amount_invested[a:e] * prop
+            gain = sell_value - cost_basis
+            steuerbarer_gewinn = gain * self.steuerpflichtiger_anteil
+            vorab_used = np.minimum(self.p_vorab_versteuert[a:e] * prop, steuerbarer_gewinn)
+            steuerbarer_gewinn = np.maximum(0.0, steuerbarer_gewinn - vorab_used)
+
+            # Der Freistellungstopf wird in derselben FIFO-Reihenfolge aufgebraucht.
+            verbraucht = np.minimum(np.cumsum(steuerbarer_gewinn, axis=0), self.freistellungs_topf)
+            steuerfreibetrag = np.diff(verbraucht, axis=0, prepend=0.0)
+            self.freistellungs_topf = self.freistellungs_topf - verbraucht[-1]
+
+            steuer = np.maximum(0.0, (steuerbarer_gewinn - steuerfreibetrag) * self.effektiver_steuersatz)
+            ruecknahmeabschlag = sell_value * self.params.ruecknahmeabschlag
+            total_verkauf = sell_value.sum(axis=0)
+            total_steuer = steuer.sum(axis=0)
+            total_netto = total_verkauf - total_steuer - ruecknahmeabschlag.sum(axis=0)
+
+            self.total_tax_paid += total_steuer
+            self.ruecknahmeabschlag_summe += ruecknahmeabschlag.sum(axis=0)
+            werte -= sell_value
+            self.p_amount_invested[a:e] -= cost_basis
+            self.p_vorab_versteuert[a:e] = np.maximum(0.0, self.p_vorab_versteuert[a:e] - vorab_used)
+            # Verkaufte Posten ohne nennenswerten Rest werden geleert.
+            werte[besucht & (werte <= 1e-9)] = 0.0
+            self.depotwert = self.depotwert - total_verkauf
+
+            self._kopf_nachziehen()
+            # Die Reinvestition ist ein gemeinsamer neuer Posten; Durchläufe ohne Erlös tragen dort 0 ein.
+            self._posten_anhaengen(current_date, np.where(total_netto > 1e-9, total_netto, 0.0))
+
+    def _handle_withdrawals(self, month):
+        """Verarbeitet die Entnahmen für alle Durchläufe gleichzeitig."""
+        if month >= self.beitrags_ende:
+            if not self.entnahme_intervall or month % self.entnahme_intervall:
+                return
+            entnahme_betrag = np.minimum(self.entnahme_je_intervall, self.depotwert)
+
+            # Entnommen wird wieder ab dem ältesten Posten (FIFO), getrennt für jeden Durchlauf.
+            a, e = self.depot_start, self.depot_ende
+            werte = self.p_value[a:e]
+            offen = entnahme_betrag - (np.cumsum(werte, axis=0) - werte)
+            entnahme = np.where(offen > 1e-9, np.minimum(werte, offen), 0.0)
+            werte -= entnahme
+            werte[(entnahme > 0) & (werte <= 1e-9)] = 0.0
+            entnommen = entnahme.sum(axis=0)
+            self.kumulierte_entnahmen += entnommen
+            self.depotwert = np.where(werte.any(axis=0), self.depotwert - entnommen, 0.0)
+            self._kopf_nachziehen()
 
 
 # === HILFSFUNKTIONEN: Werkzeuge außerhalb der Hauptsimulation ===
 # Diese Funktionen führen Aufgaben aus, die nicht direkt zur monatlichen
 # Simulation gehören, wie z. B. die Auswertung der Ergebnisse, das Erstellen
 # von Grafiken und die Generierung des finalen Berichts.
+def _jahresende_maske(df_kosten: pd.DataFrame) -> np.ndarray:
+    """
+    Legt die Spalte "Jahr" an und markiert die jeweils letzte Zeile jedes Jahres. Da das Log
+    eine Zeile je Monat ab Januar 2025 (plus die Schlusszeile) hat, folgt das Jahr direkt aus
+    der Zeilennummer, ohne die Datumsspalte auszuwerten. Die letzte Zeile eines Jahres ist jede
+    Zeile vor einem Jahreswechsel; das entspricht groupby("Jahr").last(), aber ohne Gruppierung.
+    """
+    jahre = 2025 + np.arange(len(df_kosten)) // 12
+    df_kosten["Jahr"] = jahre
+    return np.diff(jahre, append=jahre[-1] + 1) != 0
+
+
 def auswerten_kosten(df_kosten: pd.DataFrame, params: SparplanParameter, label: str,
                      mc_results: Optional[List[float]] = None) -> pd.DataFrame:
     """
@@ -442,9 +739,9 @@ def auswerten_kosten(df_kosten: pd.DataFrame, params: SparplanParameter, label:
     übersichtlichen jährlichen Tabelle zusammen. Sie kategorisiert die
     Kosten und fügt, falls vorhanden, die Ergebnisse der Monte-Carlo-Simulation hinzu.
     """
-    df_kosten["Jahr"] = pd.to_datetime(df_kosten["Datum"]).dt.year
+    jahresende = _jahresende_maske(df_kosten)
     numerische_spalten = df_kosten.drop(columns=["Datum", "Jahr"]).select_dtypes(include="number").columns
-    kosten_jahr_detail = df_kosten.groupby("Jahr")[numerische_spalten].last().reset_index()
+    kosten_jahr_detail = df_kosten.loc[jahresende, ["Jahr", *numerische_spalten]].reset_index(drop=True)
 
     for spalte in ["Ausgabeaufschlag kum", "Rücknahmeabschlag kum", "Stückkosten kum", "Serviceentgelt kum",
                    "Gesamtfondkosten kum", "Abschlusskosten kum", "Verwaltungskosten kum"]:
@@ -464,10 +761,7 @@ def auswerten_kosten(df_kosten: pd.DataFrame, params: SparplanParameter, label:
         kosten_jahr_detail["Kosten Versicherung"] = kosten_jahr_detail["Serviceentgelt kum"]
 
     if mc_results is not None:
-        mean_value = np.mean(mc_results)
-        median_value = np.median(mc_results)
-        ci_lower = np.percentile(mc_results, 2.5)
-        ci_upper = np.percentile(mc_results, 97.5)
+        mean_value, median_value, ci_lower, ci_upper = mc_kennzahlen(mc_results)
 
         mc_row = pd.DataFrame([{
             "Jahr": "Monte-Carlo",
@@ -483,25 +777,47 @@ def auswerten_kosten(df_kosten: pd.DataFrame, params: SparplanParameter, label:
     return kosten_jahr_detail
 
 
-def plotten_vergleich(df_list, params_list):
+def _plot_achse(fig=None):
+    """
+    Liefert die Zeichenfläche (Achse) für ein Diagramm. Ohne übergebene Figure wird eine neue
+    angelegt. Eine übergebene Figure wird geleert und mit einer frischen Achse wiederverwendet;
+    das spart das teure Anlegen einer neuen Figure für jedes Diagramm. Bewusst wird die ganze
+    Figure geleert und nicht nur die Achse, weil z. B. das pandas-Flächendiagramm sonst Einstellungen
+    wie Achsengrenzen hinterließe. Der zweite Rückgabewert gibt an, ob die Figure neu angelegt wurde.
+    """
+    if fig is None:
+        return plt.subplots(figsize=(14, 8))[1], True
+    fig.clear()
+    # Die Ränder, die tight_layout beim vorigen Diagramm gesetzt hat, auf die Standardwerte zurücksetzen.
+    fig.subplots_adjust(**{k: plt.rcParams[f"figure.subplot.{k}"]
+                           for k in ("left", "right", "bottom", "top", "wspace", "hspace")})
+    return fig.add_subplot(), False
+
+
+def _plot_speichern(ax, dateiname, eigene_figure):
+    """Speichert das Diagramm als Datei und schließt die Figure nur, wenn sie nicht wiederverwendet wird."""
+    ax.figure.tight_layout()
+    ax.figure.savefig(dateiname)
+    if eigene_figure:
+        plt.close(ax.figure)
+
+
+def plotten_vergleich(df_list, params_list, fig=None):
     """Erstellt ein einziges Diagramm, das die Depotentwicklung mehrerer Szenarien miteinander vergleicht."""
-    plt.figure(figsize=(14, 8))
+    ax, eigene_figure = _plot_achse(fig)
     for df, params in zip(df_list, params_list):
-        plt.plot(df['Datum'], df['Depotwert'], label=params.label, linewidth=2)
-    plt.xlabel("Datum")
-    plt.ylabel("Depotwert in Euro")
-    plt.title("Vergleich der Depotentwicklung")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig("vergleich_depotentwicklung.png")
-    plt.close()
-
-
-def plotten_kosten(df_kosten, params):
+        ax.plot(df['Datum'], df['Depotwert'], label=params.label, linewidth=2)
+    ax.set_xlabel("Datum")
+    ax.set_ylabel("Depotwert in Euro")
+    ax.set_title("Vergleich der Depotentwicklung")
+    ax.legend()
+    ax.grid(True)
+    _plot_speichern(ax, "vergleich_depotentwicklung.png", eigene_figure)
+
+
+def plotten_kosten(df_kosten, params, fig=None):
     """Erstellt ein gestapeltes Flächendiagramm, das die kumulierten Kosten pro Jahr visualisiert."""
-    df_kosten["Jahr"] = pd.to_datetime(df_kosten["Datum"]).dt.year
-    df_kum_kosten = df_kosten.groupby("Jahr").last().reset_index()
+    df_kum_kosten = df_kosten.loc[_jahresende_maske(df_kosten)]
 
     kosten_spalten = []
     if params.versicherung_modus:
@@ -513,10 +829,10 @@ def plotten_kosten(df_kosten, params):
     df_kosten_plot = df_kum_kosten[kosten_spalten + ["Jahr"]]
     df_kosten_plot.index = df_kosten_plot["Jahr"]
 
-    plt.figure(figsize=(14, 8))
-    df_kosten_plot[kosten_spalten].plot(kind="area", stacked=True, ax=plt.gca(), legend=False)
+    ax, eigene_figure = _plot_achse(fig)
+    df_kosten_plot[kosten_spalten].plot(kind="area", stacked=True, ax=ax, legend=False)
 
-    handles, labels = plt.gca().get_legend_handles_labels()
+    handles, labels = ax.get_legend_handles_labels()
 
     labels_ger = {
         "Abschlusskosten kum": "Abschlusskosten",
@@ -530,32 +846,56 @@ def plotten_kosten(df_kosten, params):
 
     new_labels = [labels_ger.get(label, label) for label in labels]
 
-    plt.legend(handles, new_labels, title="Kostenarten", bbox_to_anchor=(1.05, 1), loc='upper left')
-    plt.title(f"Kumulierte Kostenaufschlüsselung für {params.label}")
-    plt.xlabel("Jahr")
-    plt.ylabel("Kumulierte Kosten in Euro")
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(f"{params.label}_kosten_aufschluesselung.png")
-    plt.close()
+    ax.legend(handles, new_labels, title="Kostenarten", bbox_to_anchor=(1.05, 1), loc='upper left')
+    ax.set_title(f"Kumulierte Kostenaufschlüsselung für {params.label}")
+    ax.set_xlabel("Jahr")
+    ax.set_ylabel("Kumulierte Kosten in Euro")
+    ax.grid(True)
+    _plot_speichern(ax, f"{params.label}_kosten_aufschluesselung.png", eigene_figure)
 
 
-def plotten_entnahmen(df_kosten, params):
+def plotten_entnahmen(df_kosten, params, fig=None):
     """Erstellt ein Diagramm, das die Entwicklung der kumulierten Entnahmen zeigt."""
-    df_kosten["Jahr"] = pd.to_datetime(df_kosten["Datum"]).dt.year
-    df_kum_entnahmen = df_kosten.groupby("Jahr").last().reset_index()
-
-    plt.figure(figsize=(14, 8))
-    plt.plot(df_kum_entnahmen["Jahr"], df_kum_entnahmen["Kumulierte Entnahmen"], label="Kumulierte Entnahmen",
-             linewidth=2)
-    plt.xlabel("Jahr")
-    plt.ylabel("Kumulierte Entnahmen in Euro")
-    plt.title(f"Entwicklung der kumulierten Entnahmen für {params.label}")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(f"{params.label}_entnahmen_aufschluesselung.png")
-    plt.close()
+    df_kum_entnahmen = df_kosten.loc[_jahresende_maske(df_kosten)]
+
+    ax, eigene_figure = _plot_achse(fig)
+    ax.plot(df_kum_entnahmen["Jahr"].to_numpy(), df_kum_entnahmen["Kumulierte Entnahmen"].to_numpy(),
+            label="Kumulierte Entnahmen", linewidth=2)
+    ax.set_xlabel("Jahr")
+    ax.set_ylabel("Kumulierte Entnahmen in Euro")
+    ax.set_title(f"Entwicklung der kumulierten Entnahmen für {params.label}")
+    ax.legend()
+    ax.grid(True)
+    _plot_speichern(ax, f"{params.label}_entnahmen_aufschluesselung.png", eigene_figure)
+
+
+def irr_newton(cashflows, guess=0.0, tol=1e-12, max_iter=50):
+    """
+    Berechnet den monatlichen IRR mit dem Newton-Verfahren. Ausgehend von einer Schätzung
+    wird der Zinssatz so lange entlang der Steigung des Barwerts korrigiert, bis der Barwert
+    aller Cashflows Null ist. Das ist deutlich schneller als npf.irr, das dafür die Nullstellen
+    eines Polynoms vom Grad "Anzahl der Monate" sucht. Gerechnet wird mit x = ln(1 + r) statt
+    mit dem Zinssatz r selbst, so kann kein Schritt zu einem Zinssatz von -100 % oder weniger
+    führen. Eindeutig ist der IRR nur, wenn das Vorzeichen der Cashflows genau einmal wechselt;
+    sonst, oder wenn das Verfahren nicht zur Ruhe kommt, wird None zurückgegeben.
+    """
+    werte = np.asarray(cashflows, dtype=float)
+    vorzeichen = np.sign(werte[werte != 0])
+    if vorzeichen.size < 2 or np.count_nonzero(vorzeichen[1:] != vorzeichen[:-1]) != 1:
+        return None
+    perioden = np.arange(werte.size)
+    x = np.log1p(guess)
+    for _ in range(max_iter):
+        abgezinst = werte * np.exp(-perioden * x)
+        barwert = abgezinst.sum()
+        ableitung = -(perioden * abgezinst).sum()
+        if ableitung == 0 or not np.isfinite(barwert):
+            return None
+        schritt = barwert / ableitung
+        x -= schritt
+        if abs(schritt) < tol:
+            return float(np.expm1(x))
+    return None
 
 
 def berechne_irr_und_print(cashflows, label):
@@ -565,7 +905,10 @@ def berechne_irr_und_print(cashflows, label):
     genaue Vorstellung davon, wie profitabel der Gesamtplan ist.
     """
     try:
-        irr_monthly = npf.irr(cashflows)
+        # Zuerst das schnelle Newton-Verfahren; nur wenn es keine Lösung findet, die Polynom-Methode von npf.
+        irr_monthly = irr_newton(cashflows)
+        if irr_monthly is None:
+            irr_monthly = npf.irr(cashflows)
         irr_annual = (1 + irr_monthly) ** 12 - 1
         return irr_annual
     except (ValueError, IndexError) as e:
@@ -582,46 +925,52 @@ def exportiere_rebalancing_daten(rebalancing_log, label):
     return None
 
 
-def run_monte_carlo(params, num_runs):
+def mc_kennzahlen(werte):
+    """
+    Berechnet Mittelwert, Median und das 95%-Konfidenzintervall (2,5%- und 97,5%-Quantil) der
+    Monte-Carlo-Ergebnisse. Median und Intervallgrenzen kommen aus einem einzigen Aufruf von np.quantile.
+    """
+    werte = np.asarray(werte, dtype=float)
+    ci_lower, median_value, ci_upper = np.quantile(werte, [0.025, 0.5, 0.975])
+    return werte.mean(), median_value, ci_lower, ci_upper
+
+
+def run_monte_carlo(params, num_runs, seed=None, fig=None):
     """
     Diese Funktion führt eine Monte-Carlo-Simulation durch. Sie simuliert
     den Sparplan mehrfach (z.B. 1000-mal) mit zufälligen, aber realistischen
     Renditen. Dies gibt eine Bandbreite möglicher Ergebnisse, die das
-    Risiko und die Unsicherheit der Kapitalmärkte widerspiegelt.
+    Risiko und die Unsicherheit der Kapitalmärkte widerspiegelt. Mit einem festen
+    `seed` (Zahl oder np.random.SeedSequence) sind die Ergebnisse reproduzierbar.
     """
     print(f"\nStarte Monte-Carlo-Simulation für '{params.label}' mit {num_runs} Durchläufen...")
-    final_values = []
 
     end_of_beitrags_period_index = params.beitragszahldauer * 12
     if end_of_beitrags_period_index >= params.laufzeit * 12:
         end_of_beitrags_period_index = (params.laufzeit * 12) - 1
 
-    for i in range(num_runs):
-        random_annual_return = np.random.normal(params.annual_return, params.annual_std_dev)
-        mc_params = dataclasses.replace(params, annual_return=random_annual_return)
-
-        simulator = SparplanSimulator(mc_params)
-        df_kosten, _, _ = simulator.run_simulation()
-        final_values.append(df_kosten["Depotwert"].iloc[end_of_beitrags_period_index])
+    # Alle Durchläufe werden gemeinsam gerechnet: Zuerst wird für jeden Durchlauf eine zufällige
+    # Jahresrendite gezogen, dann simuliert SparplanSimulatorMC alle Durchläufe in einem einzigen Lauf
+    # (eine Spalte je Durchlauf) und nur bis zum Ende der Einzahlungsphase.
+    # Die Zufallszahlen kommen aus einem eigenen Generator statt aus dem globalen Zustand von np.random.
+    rng = np.random.default_rng(seed)
+    random_annual_returns = rng.normal(params.annual_return, params.annual_std_dev, num_runs)
+    mc_params = dataclasses.replace(params, annual_return=random_annual_returns)
+    final_values = SparplanSimulatorMC(mc_params).depotwert_nach_monat(end_of_beitrags_period_index).tolist()
 
-    mean_value = np.mean(final_values)
-    median_value = np.median(final_values)
-    ci_lower = np.percentile(final_values, 2.5)
-    ci_upper = np.percentile(final_values, 97.5)
+    mean_value, median_value, ci_lower, ci_upper = mc_kennzahlen(final_values)
 
     # Erstellt ein Histogramm, das die Verteilung der Ergebnisse darstellt.
-    plt.figure(figsize=(14, 8))
-    plt.hist(final_values, bins=50, edgecolor='black', alpha=0.7)
-    plt.axvline(mean_value, color='red', linestyle='dashed', linewidth=2, label=f'Mittelwert: {mean_value:,.0f} €')
-    plt.axvline(median_value, color='green', linestyle='dashed', linewidth=2, label=f'Median: {median_value:,.0f} €')
-    plt.title(f"Monte-Carlo-Simulation der Depotwerte für '{params.label}' am Ende der Einzahlungsphase")
-    plt.xlabel("Endwert in Euro")
-    plt.ylabel("Anzahl der Simulationen")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig(f"{params.label}_monte_carlo_histogramm.png")
-    plt.close()
+    ax, eigene_figure = _plot_achse(fig)
+    ax.hist(final_values, bins=50, edgecolor='black', alpha=0.7)
+    ax.axvline(mean_value, color='red', linestyle='dashed', linewidth=2, label=f'Mittelwert: {mean_value:,.0f} €')
+    ax.axvline(median_value, color='green', linestyle='dashed', linewidth=2, label=f'Median: {median_value:,.0f} €')
+    ax.set_title(f"Monte-Carlo-Simulation der Depotwerte für '{params.label}' am Ende der Einzahlungsphase")
+    ax.set_xlabel("Endwert in Euro")
+    ax.set_ylabel("Anzahl der Simulationen")
+    ax.legend()
+    ax.grid(True)
+    _plot_speichern(ax, f"{params.label}_monte_carlo_histogramm.png", eigene_figure)
 
     return final_values, mean_value, median_value, ci_lower, ci_upper
 
@@ -674,6 +1023,35 @@ def erzeuge_report(df_kosten_det, df_rebal, irr_annual, mc_results, params):
     print(f"Report für '{params.label}' in '{md_filename}' erstellt.")
 
 
+def _simuliere_szenario(params, seed):
+    """
+    Führt die vollständige Analyse eines einzelnen Szenarios durch: deterministische Simulation,
+    IRR, Rebalancing-Export, Grafiken, Monte-Carlo-Simulation und Report. Die Funktion steht
+    auf Modulebene, damit sie in einem eigenen Prozess ausgeführt werden kann. Zurückgegeben
+    wird die Kostentabelle, die für das Vergleichsdiagramm aller Szenarien gebraucht wird.
+    """
+    print(f"\n--- Simulation für {params.label} wird gestartet ---")
+
+    # 1. Simulierter Lauf für deterministische Ergebnisse (ohne Zufallsfaktor).
+    simulator = SparplanSimulator(params)
+    df_kosten, rebalancing_log, cashflows = simulator.run_simulation()
+
+    # 2. Auswertung und Plotten der Grafiken. Alle Diagramme des Szenarios teilen sich eine Figure.
+    irr_annual = berechne_irr_und_print(cashflows, params.label)
+    df_rebal = exportiere_rebalancing_daten(rebalancing_log, params.label)
+    fig = plt.figure(figsize=(14, 8))
+    plotten_kosten(df_kosten, params, fig=fig)
+    plotten_entnahmen(df_kosten, params, fig=fig)
+
+    # 3. Durchführung der Monte-Carlo-Simulation, um die Bandbreite der Ergebnisse zu zeigen.
+    mc_results_tuple = run_monte_carlo(params, num_runs=100, seed=seed, fig=fig)
+    plt.close(fig)
+
+    # 4. Erstellung des finalen PDF-Reports mit allen Ergebnissen.
+    erzeuge_report(df_kosten, df_rebal, irr_annual, mc_results_tuple, params)
+    return df_kosten
+
+
 # === HAUPTPROGRAMM: Skript-Ausführung ===
 # Dieser Code-Block wird ausgeführt, wenn das Skript gestartet wird.
 # Er definiert die Szenarien und ruft die Simulationsfunktionen auf.
@@ -799,30 +1177,16 @@ if __name__ == "__main__":
 
     # Liste der zu simulierenden Szenarien
     params_list = [params_depot, params_versicherung, params_diy]
-    df_list = []
-
-    # --- Hauptsimulationsschleife ---
-    # Diese Schleife durchläuft jedes der oben definierten Szenarien
-    # und führt die vollständige Analyse durch.
-    for params in params_list:
-        print(f"\n--- Simulation für {params.label} wird gestartet ---")
-
-        # 1. Simulierter Lauf für deterministische Ergebnisse (ohne Zufallsfaktor).
-        simulator = SparplanSimulator(params)
-        df_kosten, rebalancing_log, cashflows = simulator.run_simulation()
-        df_list.append(df_kosten)
-
-        # 2. Auswertung und Plotten der Grafiken.
-        irr_annual = berechne_irr_und_print(cashflows, params.label)
-        df_rebal = exportiere_rebalancing_daten(rebalancing_log, params.label)
-        plotten_kosten(df_kosten, params)
-        plotten_entnahmen(df_kosten, params)
-
-        # 3. Durchführung der Monte-Carlo-Simulation, um die Bandbreite der Ergebnisse zu zeigen.
-        mc_results_tuple = run_monte_carlo(params, num_runs=100)
-
-        # 4. Erstellung des finalen PDF-Reports mit allen Ergebnissen.
-        erzeuge_report(df_kosten, df_rebal, irr_annual, mc_results_tuple, params)
+
+    # --- Hauptsimulation ---
+    # Die Szenarien sind voneinander unabhängig und werden deshalb parallel in eigenen Prozessen
+    # analysiert (ein Prozess je Szenario, höchstens so viele wie Prozessorkerne vorhanden sind).
+    # Jedes Szenario bekommt für seine Monte-Carlo-Simulation einen eigenen, unabhängigen Seed, abgeleitet
+    # aus einem gemeinsamen Start-Seed. So erben die Prozesse keinen gemeinsamen Zufallszustand und jeder
+    # Programmlauf liefert dieselben Ergebnisse.
+    seeds = np.random.SeedSequence(42).spawn(len(params_list))
+    with ProcessPoolExecutor(max_workers=min(len(params_list), os.cpu_count() or 1)) as executor:
+        df_list = list(executor.map(_simuliere_szenario, params_list, seeds))
 
     # 5. Erstellung des Vergleichsdiagramms, das alle Szenarien nebeneinander zeigt.
     plotten_vergleich(df_list, params_list)
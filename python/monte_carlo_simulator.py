@@ -4,6 +4,7 @@ import matplotlib.pyplot as plt
 import os
 from datetime import datetime
 import warnings
+from functools import lru_cache
 
 # Unterdrückt RuntimeWarnings und FutureWarnings
 warnings.filterwarnings("ignore", category=RuntimeWarning)
@@ -13,6 +14,18 @@ warnings.filterwarnings("ignore", category=FutureWarning)
 def load_and_analyze_data(csv_file, date_column, price_column, inflation_rate):
     """
     Lädt historische Daten, berechnet monatliche Renditen und liefert deren Statistik.
+    Wiederholte Aufrufe mit denselben Argumenten lesen die CSV-Datei nicht erneut ein.
+    """
+    monthly_returns_adj, mean_monthly_return, std_dev_monthly_return = _load_and_analyze_data_cached(
+        csv_file, date_column, price_column, inflation_rate)
+    # Kopie, damit Aufrufer den zwischengespeicherten Renditeverlauf nicht verändern
+    return monthly_returns_adj.copy(), mean_monthly_return, std_dev_monthly_return
+
+
+@lru_cache(maxsize=1)
+def _load_and_analyze_data_cached(csv_file, date_column, price_column, inflation_rate):
+    """
+    Liest und analysiert die CSV-Datei einmal je Argumentkombination (siehe load_and_analyze_data).
     """
     if not os.path.exists(csv_file):
         raise FileNotFoundError(f"Die Datei '{csv_file}' wurde nicht gefunden.")
@@ -46,22 +59,16 @@ def get_worst_3_years_from_simulations(results, years):
     Findet innerhalb der Monte-Carlo-Ergebnisse den Simulationspfad mit
     den schlechtesten aufeinanderfolgenden 3 Jahren.
     """
-    annual_returns = np.zeros((results.shape[0], years))
-    for i in range(results.shape[0]):
-        for y in range(years):
-            start_value = results[i, y * 12]
-            end_value = results[i, (y + 1) * 12]
-            if start_value > 0:
-                annual_returns[i, y] = (end_value / start_value) - 1
-
-    rolling_returns = np.zeros((results.shape[0], years - 2))
-    for i in range(results.shape[0]):
-        for y in range(years - 2):
-            rolling_returns[i, y] = (1 + annual_returns[i, y]) * (1 + annual_returns[i, y + 1]) * (
-                    1 + annual_returns[i, y + 2]) - 1
-
-    worst_path_index = np.argmin(np.min(rolling_returns, axis=1))
-    worst_period_start_year = np.argmin(rolling_returns[worst_path_index, :])
+    # Jahresrenditen aller Pfade aus den Werten zu Jahresbeginn und Jahresende, 0 falls Startwert nicht positiv
+    start_values = results[:, 0:years * 12:12]
+    end_values = results[:, 12:years * 12 + 1:12]
+    annual_returns = np.divide(end_values, start_values, out=np.ones_like(end_values), where=start_values > 0) - 1
+
+    # Rollierende 3-Jahres-Renditen über ein gleitendes Fenster auf der Jahresachse
+    windows = np.lib.stride_tricks.sliding_window_view(1 + annual_returns, window_shape=3, axis=1)
+    rolling_returns = windows.prod(axis=-1) - 1
+
+    worst_path_index, worst_period_start_year = np.unravel_index(np.argmin(rolling_returns), rolling_returns.shape)
 
     # Neue Berechnung der kumulierten Rendite
     worst_period_return = np.min(rolling_returns)
@@ -72,9 +79,7 @@ def get_worst_3_years_from_simulations(results, years):
 
     path_values = results[worst_path_index, worst_period_start_month:worst_period_end_month + 1]
 
-    worst_monthly_returns = np.zeros(36)
-    for i in range(36):
-        worst_monthly_returns[i] = (path_values[i + 1] / path_values[i]) - 1
+    worst_monthly_returns = path_values[1:] / path_values[:-1] - 1
 
     return worst_monthly_returns, worst_period_return
 
@@ -97,89 +102,83 @@ def get_worst_3_years(monthly_returns):
 def run_monte_carlo_simulation(mean_return, std_dev, initial_investment, years, num_simulations, scenario='normal',
                                worst_returns=None, monthly_investment=0, monthly_dynamik_rate=0,
                                dynamik_turnus_monate=12, beitragszahldauer_monate=0, entnahme_plan=None,
-                               death_year=None, ruecknahmeabschlag=0.0):
+                               death_year=None, ruecknahmeabschlag=0.0, rng=None, base_returns=None):
     """
     Führt die Monte-Carlo-Simulation für einen Sparplan durch, wahlweise mit 'Worst-Case'-Szenarien.
+    Alle Pfade werden gemeinsam Monat für Monat als Spalten einer (Simulationen x Monate)-Matrix berechnet.
+    Mit base_returns (Matrix Simulationen x Monate) teilen sich mehrere Szenarien dieselbe Renditeziehung;
+    die Worst-Case-Renditen werden nur in eine Kopie eingesetzt.
     """
     num_months = years * 12
+    rng = np.random if rng is None else rng
 
-    simulation_results = np.zeros((num_simulations, num_months + 1))
     year_intervals = [1, 2, 5, 10, 15, 20, 25]
     if years not in year_intervals:
         year_intervals.append(years)
     year_intervals.sort()
 
-    final_values_at_years = {y: np.zeros(num_simulations) for y in year_intervals}
-    annual_returns_all_sims = np.zeros((num_simulations, years))
-    max_drawdowns = np.zeros(num_simulations)
-
     entnahme_plan = entnahme_plan if entnahme_plan is not None else {}
 
-    for i in range(num_simulations):
-        path = np.zeros(num_months + 1)
-        path[0] = initial_investment
-        current_monthly_investment = monthly_investment
-
-        death_triggered_in_sim = False
-
-        for month in range(num_months):
-            current_year_for_death = (month + 1) // 12
-
-            # NEUE LOGIK FÜR DEN TODESFALL
-            if death_year and current_year_for_death == death_year and not death_triggered_in_sim:
-                # Simuliere steuerfreien Reset im Todesfall
-                depotwert_brutto = path[month]
-                depotwert_nach_abschlag = depotwert_brutto * (1 - ruecknahmeabschlag)
-                path[month + 1] = depotwert_nach_abschlag
-                death_triggered_in_sim = True
-                monthly_return_simulated = 0.0
-            else:
-                # Dynamische Anpassung der Einzahlung
-                if monthly_dynamik_rate > 0 and (month > 0) and (month % dynamik_turnus_monate == 0):
-                    current_monthly_investment *= (1 + monthly_dynamik_rate)
-
-                # Monatliche Einzahlung hinzufügen
-                if month < beitragszahldauer_monate:
-                    path[month + 1] = path[month] + current_monthly_investment
-                else:
-                    path[month + 1] = path[month]
-
-                # Simulation der Rendite
-                # NEUE Logik für das Szenario 'worst_simulated'
-                if scenario == 'start' and worst_returns is not None and month < len(worst_returns):
-                    monthly_return_simulated = worst_returns[month]
-                elif scenario == 'withdrawal' and worst_returns is not None and 19 * 12 <= month < 19 * 12 + len(worst_returns):
-                    monthly_return_simulated = worst_returns[month - 19 * 12]
-                elif scenario == 'worst_simulated' and worst_returns is not None:
-                    # Der Index 'month' wird verwendet, da 'worst_returns' die gesamte Pfadreihe ist
-                    monthly_return_simulated = worst_returns[month]
-                else:
-                    monthly_return_simulated = np.random.normal(mean_return, std_dev)
-
-                path[month + 1] *= (1 + monthly_return_simulated)
-
-            # Korrektur: Jährliche Entnahme abziehen
-            current_year_index = (month + 1) // 12
-            if (month + 1) % 12 == 0 and current_year_index in entnahme_plan:
-                path[month + 1] -= entnahme_plan[current_year_index]
-
-            if (month + 1) % 12 == 0:
-                year_index = (month + 1) // 12 - 1
-                start_of_year_value = path[max(0, (month + 1 - 12))]
-                end_of_year_value = path[month + 1]
-                if start_of_year_value != 0:
-                    annual_return = (end_of_year_value / start_of_year_value) - 1
-                    annual_returns_all_sims[i, year_index] = annual_return
-
-            if (month + 1) in [y * 12 for y in year_intervals]:
-                year = (month + 1) // 12
-                final_values_at_years[year][i] = path[month + 1]
-
-        cumulative_max = np.maximum.accumulate(path)
-        drawdown = (path - cumulative_max) / cumulative_max
-        max_drawdowns[i] = np.min(drawdown)
-
-        simulation_results[i, :] = path
+    # Monat des Todesfalls ist für alle Pfade gleich: erster Monat, nach dem das Todesjahr erreicht ist
+    death_month = death_year * 12 - 1 if death_year and 0 < death_year * 12 <= num_months else None
+
+    # Renditematrix: eine Zeile je Pfad, eine Spalte je Monat; Worst-Case-Renditen überschreiben ganze Spalten
+    if scenario == 'worst_simulated' and worst_returns is not None:
+        # Der Index 'month' wird verwendet, da 'worst_returns' die gesamte Pfadreihe ist
+        growth = np.empty((num_simulations, num_months))
+        growth[:] = 1 + np.asarray(worst_returns[:num_months])
+    else:
+        if base_returns is None:
+            base_returns = rng.normal(mean_return, std_dev, size=(num_simulations, num_months))
+        growth = 1 + base_returns
+        if scenario == 'start' and worst_returns is not None:
+            n = min(len(worst_returns), num_months)
+            growth[:, :n] = 1 + np.asarray(worst_returns[:n])
+        elif scenario == 'withdrawal' and worst_returns is not None:
+            start = 19 * 12
+            n = max(0, min(len(worst_returns), num_months - start))
+            growth[:, start:start + n] = 1 + np.asarray(worst_returns[:n])
+
+    # Einzahlungen je Monat inkl. Dynamik, für alle Pfade gleich; im Todesmonat keine Einzahlung und keine Dynamik
+    contributions = np.zeros(num_months)
+    current_monthly_investment = monthly_investment
+    for month in range(min(num_months, beitragszahldauer_monate)):
+        if month == death_month:
+            continue
+        if monthly_dynamik_rate > 0 and (month > 0) and (month % dynamik_turnus_monate == 0):
+            current_monthly_investment *= (1 + monthly_dynamik_rate)
+        contributions[month] = current_monthly_investment
+
+    # Jährliche Entnahmen jeweils am Jahresende
+    withdrawals = np.zeros(num_months)
+    for year_index, betrag in entnahme_plan.items():
+        if 0 < year_index <= years:
+            withdrawals[year_index * 12 - 1] = betrag
+
+    simulation_results = np.empty((num_simulations, num_months + 1))
+    simulation_results[:, 0] = initial_investment
+    for month in range(num_months):
+        current = simulation_results[:, month]
+        if month == death_month:
+            # Simuliere steuerfreien Reset im Todesfall
+            simulation_results[:, month + 1] = current * (1 - ruecknahmeabschlag)
+        else:
+            np.multiply(current + contributions[month], growth[:, month], out=simulation_results[:, month + 1])
+        if withdrawals[month]:
+            simulation_results[:, month + 1] -= withdrawals[month]
+
+    # Jahresrenditen aus Jahresanfangs- und Jahresendwerten, 0 falls Jahresanfangswert 0
+    start_values = simulation_results[:, 0:num_months:12]
+    end_values = simulation_results[:, 12:num_months + 1:12]
+    annual_returns_all_sims = np.divide(end_values, start_values, out=np.ones_like(end_values),
+                                        where=start_values != 0) - 1
+
+    final_values_at_years = {y: simulation_results[:, y * 12].copy() if y <= years else np.zeros(num_simulations)
+                             for y in year_intervals}
+
+    cumulative_max = np.maximum.accumulate(simulation_results, axis=1)
+    drawdown = (simulation_results - cumulative_max) / cumulative_max
+    max_drawdowns = np.min(drawdown, axis=1)
 
     return simulation_results, final_values_at_years, annual_returns_all_sims, max_drawdowns
 
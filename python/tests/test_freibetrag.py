@@ -0,0 +1,102 @@
+# Regressionstest: Der Freistellungsauftrag wird bei der Vorabpauschale in FIFO-Reihenfolge vom
+# Ertrag jedes Postens verbraucht, nicht nur vom ersten Posten, der Steuer zahlt.
+# Aufruf aus dem Ordner python: python -m unittest discover tests
+import dataclasses
+import importlib.util
+import os
+import unittest
+
+import numpy as np
+
+ORDNER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Drei Posten mit Startwert 10.000 und Wert 10.500: fiktiver Ertrag 255 (Basiszins 2,55 %),
+# nach 30 % Teilfreistellung 178,50 je Posten, zusammen 535,50. Jeder Posten allein bleibt
+# unter dem Topf von 300; die alte Rechnung hat deshalb gar keine Steuer erhoben.
+ANZAHL_POSTEN = 3
+STARTWERT = 10_000.0
+WERT = 10_500.0
+TOPF = 300.0
+ERTRAG_JE_POSTEN = 255.0 * 0.7
+STEUERSATZ = 0.25 * (1 + 0.055 + 0.09)
+ERWARTETE_STEUER = (ANZAHL_POSTEN * ERTRAG_JE_POSTEN - TOPF) * STEUERSATZ
+
+
+def lade_modul(dateiname, name):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ORDNER, dateiname))
+    modul = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modul)
+    return modul
+
+
+def depot_parameter(modul, **abweichungen):
+    params = modul.SparplanParameter(
+        label="Depot", versicherung_modus=False, eintrittsalter=35, initial_investment=0,
+        monthly_investment=0, laufzeit=1, beitragszahldauer=1, monthly_dynamik_rate=0.0,
+        dynamik_turnus_monate=12, sonderzahlung_jahr=0, sonderzahlung_betrag=0,
+        regel_sonderzahlung_betrag=0, regel_sonderzahlung_turnus_jahre=0, annual_withdrawal=0,
+        annual_return=0.06, ausgabeaufschlag=0.0, ruecknahmeabschlag=0.0, ter=0.0, serviceentgelt=0.0,
+        stueckkosten=0, abschlusskosten_einmalig_prozent=0.0, abschlusskosten_monatlich_prozent=0.0,
+        verrechnungsdauer_monate=0, verwaltungskosten_monatlich_prozent=0.0, abgeltungssteuer_rate=0.25,
+        soli_zuschlag_on_abgeltungssteuer=0.055, kirchensteuer_on_abgeltungssteuer=0.09,
+        persoenlicher_steuersatz=0.3, freistellungsauftrag_jahr=TOPF, teilfreistellung=0.3,
+        basiszins=0.0255, rebalancing_rate=0.0, entnahme_modus="jährlich", bewertungsdauer=0)
+    return dataclasses.replace(params, **abweichungen)
+
+
+class VorabpauschaleFreibetragTest(unittest.TestCase):
+
+    def pruefe_simulator(self, simulator):
+        # Depot ohne Einmalanlage vorbereiten und die drei Posten von Hand anlegen
+        simulator._initialisiere_simulation()
+        for _ in range(ANZAHL_POSTEN):
+            simulator._posten_anhaengen(simulator.monatsanfaenge[0], STARTWERT)
+        a, e = simulator.depot_start, simulator.depot_ende
+        simulator.p_value[a:e] = WERT
+        simulator.depotwert = simulator._depotwert()
+
+        simulator._handle_taxes(True)
+
+        np.testing.assert_allclose(simulator.total_tax_paid, ERWARTETE_STEUER)
+        np.testing.assert_allclose(simulator.freistellungs_topf, 0.0, atol=1e-9)
+        np.testing.assert_allclose(simulator.depotwert, ANZAHL_POSTEN * WERT - ERWARTETE_STEUER)
+        # Auch die vom Topf gedeckte Vorabpauschale gilt als versteuert
+        np.testing.assert_allclose(simulator.p_vorab_versteuert[a:e].sum(axis=0), ANZAHL_POSTEN * ERTRAG_JE_POSTEN)
+
+    def test_gutachten250817(self):
+        modul = lade_modul("Gutachten250817.py", "gutachten250817")
+        self.pruefe_simulator(modul.SparplanSimulator(depot_parameter(modul)))
+
+    def test_gutachten250817_monte_carlo(self):
+        modul = lade_modul("Gutachten250817.py", "gutachten250817")
+        params = depot_parameter(modul, annual_return=np.array([0.06, 0.06]))
+        self.pruefe_simulator(modul.SparplanSimulatorMC(params))
+
+    def test_gutachten250817_doc(self):
+        modul = lade_modul("Gutachten250817_doc.py", "gutachten250817_doc")
+        self.pruefe_simulator(modul.SparplanSimulator(depot_parameter(modul)))
+
+    def test_gutachten250817_doc_monte_carlo(self):
+        modul = lade_modul("Gutachten250817_doc.py", "gutachten250817_doc")
+        params = depot_parameter(modul, annual_return=np.array([0.06, 0.06]))
+        self.pruefe_simulator(modul.SparplanSimulatorMC(params))
+
+    def test_250720_final(self):
+        modul = lade_modul("250720_final.py", "final250720")
+        anteile = np.full(ANZAHL_POSTEN, WERT)
+        amount_invested = np.full(ANZAHL_POSTEN, STARTWERT)
+        start_value = np.full(ANZAHL_POSTEN, STARTWERT)
+        vorab_versteuert = np.zeros(ANZAHL_POSTEN)
+
+        topf, steuer = modul.versteuere_vorabpauschale(
+            anteile, amount_invested, start_value, vorab_versteuert, 0, ANZAHL_POSTEN, 1.0,
+            TOPF, 0.0255, 0.7, STEUERSATZ)
+
+        self.assertAlmostEqual(steuer, ERWARTETE_STEUER)
+        self.assertAlmostEqual(topf, 0.0)
+        self.assertAlmostEqual(anteile.sum(), ANZAHL_POSTEN * WERT - ERWARTETE_STEUER)
+        self.assertAlmostEqual(vorab_versteuert.sum(), ANZAHL_POSTEN * 255.0)
+
+
+if __name__ == "__main__":
+    unittest.main()